@@ -0,0 +1,119 @@
+"""
+이벤트 루프 보조 유틸리티
+- run_blocking: 블로킹 작업(SQLite, 파일 파싱, pandas)을 크기 제한 스레드 풀에서 실행
+- EventLoopLagMonitor: 이벤트 루프를 임계값 이상 막는 콜백을 감지해 스택과 함께 로그
+"""
+
+import os
+import sys
+import time
+import asyncio
+import logging
+import threading
+import traceback
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional
+
+logger = logging.getLogger("auto_grader.event_loop")
+
+BLOCKING_IO_WORKERS = int(os.environ.get("BLOCKING_IO_WORKERS", "8"))
+LOOP_LAG_THRESHOLD_MS = float(os.environ.get("LOOP_LAG_THRESHOLD_MS", "100"))
+
+_executor: Optional[ThreadPoolExecutor] = None
+
+
+def get_executor() -> ThreadPoolExecutor:
+    """블로킹 작업용 공용 스레드 풀 (프로세스당 1개)"""
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=BLOCKING_IO_WORKERS,
+            thread_name_prefix="blocking-io"
+        )
+    return _executor
+
+
+async def run_blocking(func: Callable[..., Any], *args, **kwargs) -> Any:
+    """블로킹 함수를 스레드 풀에서 실행하고 결과를 기다림"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        get_executor(),
+        functools.partial(func, *args, **kwargs)
+    )
+
+
+class EventLoopLagMonitor:
+    """
+    이벤트 루프 지연 감시
+
+    루프 안의 heartbeat 코루틴이 interval 마다 시각을 기록하고,
+    별도 감시 스레드가 기록이 threshold 이상 갱신되지 않으면
+    그 순간 루프 스레드의 스택(막고 있는 콜백)을 로그로 남김
+    """
+
+    def __init__(
+        self,
+        threshold_ms: float = LOOP_LAG_THRESHOLD_MS,
+        interval_ms: float = 50.0
+    ):
+        self.threshold = threshold_ms / 1000
+        self.interval = interval_ms / 1000
+        self.max_lag_ms = 0.0
+        self.slow_callbacks = 0
+
+        self._last_beat = time.monotonic()
+        self._loop_thread_id: Optional[int] = None
+        self._reported_beat: Optional[float] = None
+        self._stopped = threading.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        """실행 중인 이벤트 루프에서 감시 시작"""
+        self._loop_thread_id = threading.get_ident()
+        self._last_beat = time.monotonic()
+        self._stopped.clear()
+        self._task = asyncio.get_running_loop().create_task(self._heartbeat())
+        self._thread = threading.Thread(
+            target=self._watch, name="loop-lag-monitor", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        if self._task:
+            self._task.cancel()
+
+    async def _heartbeat(self):
+        while True:
+            expected = time.monotonic() + self.interval
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            lag_ms = (now - expected) * 1000
+            self.max_lag_ms = max(self.max_lag_ms, lag_ms)
+            if lag_ms > self.threshold * 1000:
+                self.slow_callbacks += 1
+                logger.warning("Event loop lag %.0fms (threshold %.0fms)",
+                               lag_ms, self.threshold * 1000)
+            self._last_beat = now
+
+    def _watch(self):
+        while not self._stopped.wait(self.threshold / 2):
+            beat = self._last_beat
+            stalled = time.monotonic() - beat
+            if stalled < self.threshold + self.interval or self._reported_beat == beat:
+                continue
+
+            # 같은 정체 구간은 한 번만 보고
+            self._reported_beat = beat
+            frame = sys._current_frames().get(self._loop_thread_id)
+            stack = "".join(traceback.format_stack(frame)) if frame else "<unavailable>"
+            logger.warning("Event loop blocked for %.0fms by:\n%s", stalled * 1000, stack)
+
+    def stats(self) -> dict:
+        return {
+            "threshold_ms": self.threshold * 1000,
+            "max_lag_ms": round(self.max_lag_ms, 1),
+            "slow_callbacks": self.slow_callbacks,
+        }
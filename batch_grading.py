@@ -0,0 +1,680 @@
+"""
+오프라인 일괄 채점 (JSONL 배치 파이프라인)
+대회 종료 후 대량 채점 시 대화형 지연 대신 비용/처리량을 우선
+
+1. 과제의 미채점 제출물 실행 요청을 JSONL 배치 파일로 작성 → 배치 제출
+2. 실행 결과 수집 → 마스터 평가 요청을 두 번째 배치로 제출
+3. 평가 결과 검증 후 grading_result 를 한 트랜잭션으로 일괄 저장
+
+배치 ID, 대상 제출물, 진행 단계는 batch_runs 테이블에 기록
+API 서버/CLI 가 중단되어도 이미 제출한 배치를 다시 제출하지 않고 결과 수집부터 이어서 실행
+- 제출 전에 제출 키를 기록하고 배치에 같은 키를 붙여 제출
+  배치 ID 를 기록하기 전에 중단되었으면 재개 시 키로 배치를 찾아 이어받음 (중복 과금 방지)
+- 프롬프트 구성/토큰 계산/일관성 점수/결과 검증은 run_blocking 으로 실행 (이벤트 루프를 막지 않음)
+
+배치 백엔드:
+- OpenAIBatchBackend: OpenAI Batch API (/v1/chat/completions, 24h)
+- LocalBatchBackend: 로컬 파일 기반 대체 구현 (테스트용)
+
+사용법:
+    python -m batch_grading --task-id 1
+    python -m batch_grading --task-id 1 --backend local
+    python -m batch_grading --resume             # 중단된 배치 채점 이어서 실행
+"""
+
+import os
+import abc
+import json
+import uuid
+import socket
+import sqlite3
+import asyncio
+import argparse
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+
+from async_utils import run_blocking
+from batch_runs import (
+    BatchRunStore, STAGE_DONE, STAGE_EXECUTING, STAGE_JUDGING, STAGE_PREPARING,
+    STATUS_COMPLETED, STATUS_ERROR
+)
+from db import connect
+from grading_engine import (
+    AsyncGradingEngine, JUDGE_MAX_TOKENS, JUDGE_SYSTEM_PROMPT
+)
+from output_similarity import batch_consistency_scores
+from grading_results import write_grading_result
+from migrations import run_migrations
+from prescreen import prescreen_result, prescreen_submission
+from token_budget import resolve_execution_max_tokens
+
+
+# 환경변수
+DATA_DIR = os.environ.get("DATA_DIR", ".")
+DB_PATH = os.path.join(DATA_DIR, "competition_prd.db")
+OPENAI_API_KEY = os.environ.get("OPENAI_API_KEY")
+GRADING_MODEL = os.environ.get("GRADING_MODEL", "gpt-3.5-turbo")
+BATCH_BACKEND = os.environ.get("BATCH_BACKEND", "openai")
+BATCH_WORK_DIR = os.environ.get("BATCH_WORK_DIR", os.path.join(DATA_DIR, "batches"))
+BATCH_POLL_INTERVAL = float(os.environ.get("BATCH_POLL_INTERVAL", "30"))
+# 배치 채점 기록 lease (이 시간 동안 갱신이 없으면 다른 프로세스가 이어받음)
+BATCH_LEASE_SECONDS = float(os.environ.get("BATCH_LEASE_SECONDS", "300"))
+
+
+# ============================================================================
+# 배치 백엔드
+# ============================================================================
+
+class BatchBackend(abc.ABC):
+    """배치 실행 백엔드 인터페이스"""
+
+    @abc.abstractmethod
+    async def submit(self, requests_path: str, key: str) -> str:
+        """JSONL 요청 파일을 제출 키와 함께 제출 → 배치 ID"""
+
+    @abc.abstractmethod
+    async def find(self, key: str) -> Optional[str]:
+        """제출 키로 이미 제출된 배치 ID 조회 (없으면 None)"""
+
+    @abc.abstractmethod
+    async def status(self, batch_id: str) -> str:
+        """'in_progress' | 'completed' | 'failed'"""
+
+    @abc.abstractmethod
+    async def fetch_results(self, batch_id: str, output_path: str):
+        """결과 JSONL 을 output_path 에 저장"""
+
+
+class OpenAIBatchBackend(BatchBackend):
+    """OpenAI Batch API"""
+
+    def __init__(self, client):
+        self.client = client
+
+    async def submit(self, requests_path: str, key: str) -> str:
+        with open(requests_path, "rb") as f:
+            uploaded = await self.client.files.create(file=f, purpose="batch")
+        batch = await self.client.batches.create(
+            input_file_id=uploaded.id,
+            endpoint="/v1/chat/completions",
+            completion_window="24h",
+            metadata={"grading_key": key}
+        )
+        return batch.id
+
+    async def find(self, key: str) -> Optional[str]:
+        async for batch in self.client.batches.list(limit=100):
+            if (batch.metadata or {}).get("grading_key") == key:
+                return batch.id
+        return None
+
+    async def status(self, batch_id: str) -> str:
+        batch = await self.client.batches.retrieve(batch_id)
+        if batch.status == "completed":
+            return "completed"
+        if batch.status in ("failed", "expired", "cancelled"):
+            return "failed"
+        return "in_progress"
+
+    async def fetch_results(self, batch_id: str, output_path: str):
+        batch = await self.client.batches.retrieve(batch_id)
+        lines = []
+        for file_id in (batch.output_file_id, batch.error_file_id):
+            if file_id:
+                content = await self.client.files.content(file_id)
+                lines.append(content.text.strip())
+        with open(output_path, "w", encoding="utf-8") as f:
+            f.write("\n".join(line for line in lines if line) + "\n")
+
+
+class LocalBatchBackend(BatchBackend):
+    """
+    로컬 파일 기반 배치 (테스트용)
+    제출 즉시 responder 로 각 요청의 응답을 만들어 OpenAI 배치 결과 형식으로 저장
+    """
+
+    def __init__(self, work_dir: str, responder: Optional[Callable[[Dict], List[str]]] = None):
+        self.work_dir = work_dir
+        self.responder = responder or self._default_responder
+        os.makedirs(work_dir, exist_ok=True)
+
+    @staticmethod
+    def _default_responder(body: Dict) -> List[str]:
+        """요청 본문 → choice 내용 목록 (평가 요청이면 유효한 평가 JSON)"""
+        n = body.get("n", 1)
+        if body.get("response_format"):
+            result = {
+                "accuracy_score": 25, "accuracy_feedback": "local batch",
+                "clarity_score": 15, "clarity_feedback": "local batch",
+                "consistency_score": 10, "consistency_feedback": "local batch",
+                "total_score": 50, "overall_feedback": "local batch"
+            }
+            return [json.dumps(result, ensure_ascii=False)] * n
+        prompt = body["messages"][-1]["content"]
+        return [f"[local] {prompt[:200]}"] * n
+
+    def _path(self, batch_id: str) -> str:
+        return os.path.join(self.work_dir, f"{batch_id}.output.jsonl")
+
+    async def submit(self, requests_path: str, key: str) -> str:
+        # 키로 찾을 수 있도록 배치 ID 를 키에서 만듦
+        batch_id = f"local-{key}"
+
+        def run():
+            with open(requests_path, encoding="utf-8") as src, \
+                    open(self._path(batch_id), "w", encoding="utf-8") as dst:
+                for line in src:
+                    if not line.strip():
+                        continue
+                    request = json.loads(line)
+                    contents = self.responder(request["body"])
+                    dst.write(json.dumps({
+                        "id": f"req-{uuid.uuid4().hex[:12]}",
+                        "custom_id": request["custom_id"],
+                        "response": {
+                            "status_code": 200,
+                            "body": {
+                                "choices": [
+                                    {"index": i, "message": {"role": "assistant", "content": content}}
+                                    for i, content in enumerate(contents)
+                                ]
+                            }
+                        },
+                        "error": None
+                    }, ensure_ascii=False) + "\n")
+
+        await run_blocking(run)
+        return batch_id
+
+    async def find(self, key: str) -> Optional[str]:
+        batch_id = f"local-{key}"
+        return batch_id if os.path.exists(self._path(batch_id)) else None
+
+    async def status(self, batch_id: str) -> str:
+        return "completed" if os.path.exists(self._path(batch_id)) else "failed"
+
+    async def fetch_results(self, batch_id: str, output_path: str):
+        if os.path.abspath(output_path) != os.path.abspath(self._path(batch_id)):
+            await run_blocking(_copy_file, self._path(batch_id), output_path)
+
+
+def _copy_file(src: str, dst: str):
+    with open(src, "rb") as f_src, open(dst, "wb") as f_dst:
+        f_dst.write(f_src.read())
+
+
+# ============================================================================
+# 배치 채점 파이프라인
+# ============================================================================
+
+class BatchRunLost(Exception):
+    """다른 프로세스가 배치 채점 기록의 lease 를 가져감 (이 프로세스는 중단)"""
+
+
+class BatchGradingPipeline:
+    """과제 단위 일괄 채점 (실행 배치 → 평가 배치 → 일괄 저장, 단계마다 batch_runs 에 기록)"""
+
+    def __init__(
+        self,
+        db_path: str,
+        engine: AsyncGradingEngine,
+        backend: BatchBackend,
+        work_dir: str = BATCH_WORK_DIR,
+        poll_interval: float = BATCH_POLL_INTERVAL,
+        owner: Optional[str] = None
+    ):
+        self.db_path = db_path
+        self.engine = engine
+        self.backend = backend
+        self.work_dir = work_dir
+        self.poll_interval = poll_interval
+        self.owner = owner or f"{socket.gethostname()}-{os.getpid()}"
+        # lease 는 폴링 간격보다 충분히 길게 (폴링마다 연장)
+        self.runs = BatchRunStore(db_path, lease_seconds=max(BATCH_LEASE_SECONDS, poll_interval * 4))
+        os.makedirs(work_dir, exist_ok=True)
+
+    def _connect(self) -> sqlite3.Connection:
+        return connect(self.db_path)
+
+    # ------------------------------------------------------------------
+    # DB
+    # ------------------------------------------------------------------
+
+    def _load_task(self, task_id: int) -> Tuple[Optional[Dict], List[Dict]]:
+        conn = self._connect()
+        c = conn.cursor()
+        c.execute("SELECT * FROM tasks WHERE id = ?", (task_id,))
+        task = c.fetchone()
+        c.execute("""
+            SELECT id, prompt_text FROM submissions
+            WHERE task_id = ? AND grading_result IS NULL
+            ORDER BY id
+        """, (task_id,))
+        submissions = [dict(row) for row in c.fetchall()]
+        conn.close()
+        return (dict(task) if task else None), submissions
+
+    def _load_submissions(self, submission_ids: List[int]) -> List[Dict]:
+        """배치에 넣은 제출물 (재개 시 기록의 submission_ids 로 다시 조회)"""
+        conn = self._connect()
+        rows = conn.execute(
+            f"SELECT id, prompt_text FROM submissions WHERE id IN ({','.join('?' * len(submission_ids))})",
+            submission_ids
+        ).fetchall()
+        conn.close()
+        by_id = {row["id"]: dict(row) for row in rows}
+        return [by_id[submission_id] for submission_id in submission_ids if submission_id in by_id]
+
+    def _save_results(self, rows: List[Tuple[int, Dict, str]], run_id: Optional[int] = None, **run_fields):
+        """
+        (submission_id, grading_result, graded_at) 목록을 점수 컬럼과 함께 한 트랜잭션으로 저장
+        run_id 가 있으면 배치 채점 기록 갱신도 같은 트랜잭션으로 (재시작 후 중복 저장 방지)
+        """
+        conn = self._connect()
+        try:
+            for submission_id, grading_result, graded_at in rows:
+                write_grading_result(conn, submission_id, grading_result, graded_at)
+            if run_id is not None:
+                BatchRunStore.write(conn, run_id, **run_fields)
+            conn.commit()
+        finally:
+            conn.close()
+
+    # ------------------------------------------------------------------
+    # 배치 실행
+    # ------------------------------------------------------------------
+
+    async def _submit_batch(self, run_id: int, name: str, requests: List[Dict]) -> str:
+        """
+        요청 목록을 JSONL 로 작성해 제출 → 배치 ID
+        제출 전에 제출 키(name)를 기록 (배치 ID 기록 전에 중단되면 재개 시 _find_submitted 로 찾음)
+        """
+        requests_path = os.path.join(self.work_dir, f"{name}.input.jsonl")
+
+        def write():
+            with open(requests_path, "w", encoding="utf-8") as f:
+                for request in requests:
+                    f.write(json.dumps(request, ensure_ascii=False) + "\n")
+
+        await run_blocking(write)
+        await run_blocking(lambda: self.runs.update(run_id, pending_batch=name))
+        batch_id = await self.backend.submit(requests_path, name)
+        print(f"📦 Batch {name} submitted: {batch_id} ({len(requests)} requests)")
+        return batch_id
+
+    async def _find_submitted(self, run: Dict, name: str) -> Optional[str]:
+        """제출 키를 기록한 뒤 중단된 배치를 백엔드에서 찾음 (찾으면 다시 제출하지 않음)"""
+        if run.get("pending_batch") != name:
+            return None
+        batch_id = await self.backend.find(name)
+        if batch_id:
+            print(f"🔁 Batch {name} was already submitted: {batch_id}")
+        return batch_id
+
+    async def _wait_batch(self, run_id: int, name: str, batch_id: str) -> Dict[str, Dict]:
+        """
+        배치가 완료될 때까지 대기 후 결과 수집 (대기 중 기록의 lease 연장)
+
+        Returns:
+            custom_id → 응답 본문 (실패한 요청은 {'error': ...})
+        """
+        output_path = os.path.join(self.work_dir, f"{name}.output.jsonl")
+
+        while True:
+            if not await run_blocking(self.runs.claim, run_id, self.owner):
+                raise BatchRunLost(f"Batch run {run_id} was taken over by another process")
+            status = await self.backend.status(batch_id)
+            if status == "completed":
+                break
+            if status == "failed":
+                raise Exception(f"Batch {batch_id} failed")
+            await asyncio.sleep(self.poll_interval)
+
+        await self.backend.fetch_results(batch_id, output_path)
+
+        def read() -> Dict[str, Dict]:
+            results = {}
+            with open(output_path, encoding="utf-8") as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    item = json.loads(line)
+                    response = item.get("response") or {}
+                    if item.get("error") or response.get("status_code") != 200:
+                        results[item["custom_id"]] = {"error": item.get("error") or response}
+                    else:
+                        results[item["custom_id"]] = response["body"]
+            return results
+
+        return await run_blocking(read)
+
+    def _execution_requests(self, task: Dict, submissions: List[Dict], max_tokens: int) -> List[Dict]:
+        engine = self.engine
+        # 배치는 한 번에 제출하므로 adaptive 과제도 3회 모두 실행
+        use_n = engine._use_multi_sample(task.get("execution_mode") or "auto")
+        requests = []
+        for submission in submissions:
+            prompt = engine._build_execution_prompt(
+                submission["prompt_text"], task.get("input_data"), max_tokens
+            )
+            body = {
+                "model": engine.model,
+                "messages": [{"role": "user", "content": prompt}],
+                "temperature": engine.execution_temperature,
+                "max_tokens": max_tokens,
+            }
+            if use_n:
+                requests.append({
+                    "custom_id": f"exec-{submission['id']}",
+                    "method": "POST",
+                    "url": "/v1/chat/completions",
+                    "body": {**body, "n": 3},
+                })
+            else:
+                for run_index in range(3):
+                    requests.append({
+                        "custom_id": f"exec-{submission['id']}-{run_index}",
+                        "method": "POST",
+                        "url": "/v1/chat/completions",
+                        "body": body,
+                    })
+        return requests
+
+    @staticmethod
+    def _collect_outputs(submission_id: int, results: Dict[str, Dict]) -> Optional[List[str]]:
+        """실행 배치 결과 → 제출물의 결과 3개 (하나라도 없으면 None)"""
+        body = results.get(f"exec-{submission_id}")
+        if body is not None:
+            choices = sorted(body.get("choices", []), key=lambda choice: choice["index"])
+            outputs = [choice["message"]["content"] for choice in choices]
+        else:
+            outputs = []
+            for run_index in range(3):
+                body = results.get(f"exec-{submission_id}-{run_index}") or {}
+                choices = body.get("choices") or [{}]
+                outputs.append((choices[0].get("message") or {}).get("content"))
+
+        if len(outputs) != 3 or any(output is None for output in outputs):
+            return None
+        return outputs
+
+    def _judge_requests(
+        self,
+        task: Dict,
+        submissions: List[Dict],
+        outputs_by_submission: Dict[int, List[str]],
+        consistency: Dict[int, float]
+    ) -> List[Dict]:
+        judge_requests = []
+        for submission in submissions:
+            outputs = outputs_by_submission.get(submission["id"])
+            if outputs is None:
+                continue
+            master_prompt = self.engine._build_master_grading_prompt(
+                submission["prompt_text"],
+                outputs,
+                task.get("golden_output"),
+                task.get("evaluation_notes"),
+                task.get("title") or "Task",
+                include_consistency=not consistency
+            )
+            judge_requests.append({
+                "custom_id": f"judge-{submission['id']}",
+                "method": "POST",
+                "url": "/v1/chat/completions",
+                "body": {
+                    "model": self.engine.model,
+                    "messages": [
+                        {"role": "system", "content": JUDGE_SYSTEM_PROMPT},
+                        {"role": "user", "content": master_prompt},
+                    ],
+                    "temperature": self.engine.grading_temperature,
+                    "max_tokens": JUDGE_MAX_TOKENS,
+                    "response_format": {"type": "json_object"},
+                },
+            })
+        return judge_requests
+
+    def _grading_rows(
+        self,
+        outputs_by_submission: Dict[int, List[str]],
+        judge_results: Dict[str, Dict],
+        consistency: Dict[int, float],
+        failed: Dict[int, str]
+    ) -> List[Tuple[int, Dict, str]]:
+        """평가 배치 결과 검증 → 저장할 행 (실패한 제출물은 failed 에 기록)"""
+        graded_at = datetime.now().isoformat()
+        rows = []
+        for submission_id, outputs in outputs_by_submission.items():
+            body = judge_results.get(f"judge-{submission_id}") or {}
+            try:
+                result = json.loads(body["choices"][0]["message"]["content"])
+            except (KeyError, IndexError, TypeError, ValueError):
+                failed[submission_id] = "Judge failed in batch"
+                continue
+            if isinstance(result, dict) and submission_id in consistency:
+                result = self.engine._apply_consistency(result, consistency[submission_id])
+            result = self.engine._repair_grading_result(result)
+            if result is None or not self.engine._validate_grading_result(result):
+                failed[submission_id] = "Invalid grading result format"
+                continue
+
+            grading_result = {
+                "execution_results": [
+                    {"execution_number": i + 1, "success": True, "output": output, "error": None}
+                    for i, output in enumerate(outputs)
+                ],
+                "grading_mode": "batch",
+                **result
+            }
+            rows.append((submission_id, grading_result, graded_at))
+        return rows
+
+    # ------------------------------------------------------------------
+    # 실행 / 재개
+    # ------------------------------------------------------------------
+
+    def start(self, task_id: int, submission_count: Optional[int] = None) -> int:
+        """배치 채점 기록 생성 (같은 과제의 배치가 실행 중이거나 작업 큐에서 채점 중이면 BatchRunConflict)"""
+        return self.runs.create(task_id, self.owner, submission_count)
+
+    def claim_resumable(self) -> List[Dict]:
+        """소유 프로세스가 중단된 실행 중 기록을 가져옴 (이 프로세스가 lease 를 얻은 기록만)"""
+        return [run for run in self.runs.list_resumable() if self.runs.claim(run["id"], self.owner)]
+
+    async def run_task(self, task_id: int) -> Dict:
+        """
+        과제의 미채점 제출물 전체를 배치로 채점
+
+        Returns:
+            {'task_id', 'graded', 'prescreened', 'failed': {submission_id: 사유}}
+        """
+        run_id = await run_blocking(self.start, task_id)
+        return await self.run(run_id)
+
+    async def run(self, run_id: int) -> Dict:
+        """
+        배치 채점 기록을 저장된 단계부터 이어서 실행 (새 기록이면 처음부터)
+        이미 제출된 배치는 다시 제출하지 않고 결과만 기다려 수집
+
+        Returns:
+            {'task_id', 'graded', 'prescreened', 'failed': {submission_id: 사유}}
+        """
+        run = await run_blocking(self.runs.get, run_id)
+        if run is None:
+            raise Exception(f"Batch run {run_id} not found")
+        try:
+            return await self._advance(run)
+        except BatchRunLost:
+            raise
+        except Exception as e:
+            await run_blocking(
+                self.runs.update, run_id,
+                status=STATUS_ERROR, error=str(e), finished_at=datetime.now().isoformat()
+            )
+            raise
+
+    def _prescreen(self, task: Dict, submissions: List[Dict]) -> Tuple[List[Tuple[int, Dict, str]], List[Dict]]:
+        """사전 검사 → (바로 저장할 결과 행, 배치에 넣을 제출물)"""
+        screened_rows = []
+        remaining = []
+        for submission in submissions:
+            screen = prescreen_submission(
+                submission["prompt_text"], task.get("golden_output"), task.get("description")
+            )
+            if screen:
+                screened_rows.append((submission["id"], prescreen_result(screen), datetime.now().isoformat()))
+            else:
+                remaining.append(submission)
+        return screened_rows, remaining
+
+    async def _advance(self, run: Dict) -> Dict:
+        run_id = run["id"]
+        task_id = run["task_id"]
+        name = run["run_name"]
+        exec_name = f"{name}-exec"
+        judge_name = f"{name}-judge"
+
+        task, submissions = await run_blocking(self._load_task, task_id)
+        if not task:
+            raise Exception(f"Task {task_id} not found")
+
+        if run["stage"] == STAGE_PREPARING and run["submission_ids"] is None:
+            # 사전 검사에 걸린 제출물은 배치에 넣지 않고 바로 저장
+            screened_rows, submissions = await run_blocking(self._prescreen, task, submissions)
+            if not submissions:
+                summary = {"task_id": task_id, "graded": 0, "prescreened": len(screened_rows), "failed": {}}
+                await run_blocking(
+                    self._save_results, screened_rows, run_id,
+                    status=STATUS_COMPLETED, stage=STAGE_DONE, prescreened=len(screened_rows),
+                    summary=summary, finished_at=datetime.now().isoformat()
+                )
+                return summary
+
+            # 응답 토큰 상한은 과제 정답 산출물 길이 기준
+            max_tokens = await run_blocking(
+                resolve_execution_max_tokens,
+                self.db_path,
+                task_id,
+                task.get("golden_output"),
+                self.engine.model,
+                task.get("execution_max_tokens"),
+                task.get("golden_output_hash")
+            )
+            # 사전 검사 결과와 배치 대상을 한 트랜잭션으로 기록 (재개 시 같은 제출물로 이어서 실행)
+            fields = {
+                "submission_ids": [submission["id"] for submission in submissions],
+                "submission_count": len(submissions) + len(screened_rows),
+                "prescreened": len(screened_rows),
+                "max_tokens": max_tokens,
+            }
+            await run_blocking(lambda: self._save_results(screened_rows, run_id, **fields))
+            run.update(fields)
+        elif run["submission_ids"] is not None:
+            submissions = await run_blocking(self._load_submissions, run["submission_ids"])
+
+        # 1단계: 실행 배치 제출 (제출 키를 기록한 뒤 중단되었으면 제출된 배치를 찾아 이어받음)
+        if run["stage"] == STAGE_PREPARING:
+            exec_batch_id = await self._find_submitted(run, exec_name)
+            if exec_batch_id is None:
+                requests = await run_blocking(self._execution_requests, task, submissions, run["max_tokens"])
+                exec_batch_id = await self._submit_batch(run_id, exec_name, requests)
+            fields = {"stage": STAGE_EXECUTING, "exec_batch_id": exec_batch_id, "pending_batch": None}
+            await run_blocking(lambda: self.runs.update(run_id, **fields))
+            run.update(fields)
+
+        # 실행 배치 결과 수집 (재개 시에도 완료된 배치의 결과 파일을 다시 받음)
+        exec_results = await self._wait_batch(run_id, exec_name, run["exec_batch_id"])
+        failed: Dict[int, str] = {}
+        outputs_by_submission = {}
+        for submission in submissions:
+            outputs = self._collect_outputs(submission["id"], exec_results)
+            if outputs is None:
+                failed[submission["id"]] = "Execution failed in batch"
+            else:
+                outputs_by_submission[submission["id"]] = outputs
+
+        # 일관성 점수는 로컬에서 일괄 계산
+        consistency = {}
+        if self.engine.local_consistency and outputs_by_submission:
+            scores = await run_blocking(batch_consistency_scores, list(outputs_by_submission.values()))
+            consistency = dict(zip(outputs_by_submission, scores))
+
+        # 2단계: 평가 배치 제출
+        if run["stage"] == STAGE_EXECUTING:
+            judge_batch_id = await self._find_submitted(run, judge_name)
+            if judge_batch_id is None:
+                judge_requests = await run_blocking(
+                    self._judge_requests, task, submissions, outputs_by_submission, consistency
+                )
+                judge_batch_id = (
+                    await self._submit_batch(run_id, judge_name, judge_requests) if judge_requests else None
+                )
+            fields = {"stage": STAGE_JUDGING, "judge_batch_id": judge_batch_id, "pending_batch": None}
+            await run_blocking(lambda: self.runs.update(run_id, **fields))
+            run.update(fields)
+
+        judge_results = (
+            await self._wait_batch(run_id, judge_name, run["judge_batch_id"])
+            if run["judge_batch_id"] else {}
+        )
+
+        # 3단계: 검증 후 결과와 완료 기록을 한 트랜잭션으로 저장
+        rows = await run_blocking(self._grading_rows, outputs_by_submission, judge_results, consistency, failed)
+        summary = {
+            "task_id": task_id,
+            "graded": len(rows),
+            "prescreened": run["prescreened"] or 0,
+            "failed": failed,
+        }
+        await run_blocking(
+            self._save_results, rows, run_id,
+            status=STATUS_COMPLETED, stage=STAGE_DONE, summary=summary,
+            finished_at=datetime.now().isoformat()
+        )
+        return summary
+
+
+def create_backend(engine: AsyncGradingEngine, name: str = BATCH_BACKEND) -> BatchBackend:
+    """BATCH_BACKEND 설정에 맞는 백엔드 생성"""
+    if name == "local":
+        return LocalBatchBackend(BATCH_WORK_DIR)
+    return OpenAIBatchBackend(engine.client)
+
+
+async def _resume(pipeline: BatchGradingPipeline) -> List[Dict]:
+    """중단된 배치 채점 기록을 모두 이어서 실행"""
+    runs = await run_blocking(pipeline.claim_resumable)
+    summaries = []
+    for run in runs:
+        print(f"🔁 Resuming batch run {run['id']} (task {run['task_id']}, stage {run['stage']})")
+        summaries.append(await pipeline.run(run["id"]))
+    return summaries
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Auto-Grader 배치 채점")
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument("--task-id", type=int, help="채점할 과제 ID")
+    target.add_argument("--resume", action="store_true",
+                        help="중단된 배치 채점 이어서 실행 (이미 제출된 배치는 결과만 수집)")
+    parser.add_argument("--backend", default=BATCH_BACKEND, choices=["openai", "local"],
+                        help="배치 백엔드 (기본: BATCH_BACKEND)")
+    parser.add_argument("--poll-interval", type=float, default=BATCH_POLL_INTERVAL,
+                        help="배치 상태 확인 간격 (초)")
+    args = parser.parse_args()
+
+    run_migrations(DB_PATH)
+    engine = AsyncGradingEngine(api_key=OPENAI_API_KEY, model=GRADING_MODEL)
+    pipeline = BatchGradingPipeline(
+        DB_PATH, engine, create_backend(engine, args.backend), poll_interval=args.poll_interval
+    )
+    if args.resume:
+        summary = asyncio.run(_resume(pipeline))
+    else:
+        summary = asyncio.run(pipeline.run_task(args.task_id))
+    print(json.dumps(summary, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,246 @@
+"""
+배치 채점 실행 기록 (SQLite)
+배치는 완료까지 최대 24시간 걸리므로 배치 ID, 대상 제출물, 진행 단계를 저장하여
+API 서버/CLI 가 재시작되어도 이미 비용을 낸 배치의 결과를 이어서 수집
+
+진행 단계: preparing → executing (실행 배치 제출됨) → judging (평가 배치 제출됨) → done
+상태: running → completed / error
+
+- 실행 중인 기록은 소유자(owner)와 lease_until 을 가짐
+  여러 프로세스가 같은 기록을 동시에 이어받아 평가 배치를 중복 제출하지 않도록
+  lease 가 만료된 기록만 다른 프로세스가 가져감
+- 배치 제출 전에 제출 키(pending_batch)를 먼저 기록
+  제출 직후 배치 ID 를 기록하기 전에 중단되면 재개 시 같은 키로 제출된 배치를 찾아 이어받음
+- 실행 중인 배치 채점이 있는 과제의 제출물은 작업 큐에 등록하지 않고 (job_queue.enqueue_many),
+  작업 큐에서 채점 중인 제출물이 있는 과제는 배치 채점을 시작하지 않음
+"""
+
+import json
+import time
+import sqlite3
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from db import connect
+from job_queue import ACTIVE_STATES
+
+STAGE_PREPARING = "preparing"
+STAGE_EXECUTING = "executing"
+STAGE_JUDGING = "judging"
+STAGE_DONE = "done"
+
+STATUS_RUNNING = "running"
+STATUS_COMPLETED = "completed"
+STATUS_ERROR = "error"
+
+# 기록에서 갱신할 수 있는 컬럼
+_UPDATABLE = (
+    "status", "stage", "submission_ids", "submission_count", "prescreened", "max_tokens",
+    "exec_batch_id", "judge_batch_id", "pending_batch", "summary", "error", "finished_at",
+)
+
+
+class BatchRunConflict(Exception):
+    """같은 과제의 배치 채점이 실행 중이거나 작업 큐에서 채점 중인 제출물이 있음"""
+
+
+class BatchRunStore:
+    """batch_runs 테이블 접근"""
+
+    def __init__(self, db_path: str, lease_seconds: float = 300.0):
+        self.db_path = db_path
+        self.lease_seconds = lease_seconds
+
+    def _connect(self) -> sqlite3.Connection:
+        return connect(self.db_path)
+
+    @staticmethod
+    def create_schema(conn: sqlite3.Connection):
+        """batch_runs 테이블과 인덱스 (migrations.py 에서 실행)"""
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS batch_runs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                task_id INTEGER NOT NULL,
+                run_name TEXT NOT NULL,
+                status TEXT NOT NULL DEFAULT 'running',
+                stage TEXT NOT NULL DEFAULT 'preparing',
+                submission_ids TEXT,
+                submission_count INTEGER,
+                prescreened INTEGER DEFAULT 0,
+                max_tokens INTEGER,
+                exec_batch_id TEXT,
+                judge_batch_id TEXT,
+                pending_batch TEXT,
+                summary TEXT,
+                error TEXT,
+                owner TEXT,
+                lease_until REAL,
+                started_at TEXT,
+                updated_at REAL,
+                finished_at TEXT
+            )
+        """)
+        conn.execute("""
+            CREATE INDEX IF NOT EXISTS idx_batch_runs_task
+            ON batch_runs (task_id, id)
+        """)
+        conn.execute("""
+            CREATE INDEX IF NOT EXISTS idx_batch_runs_status
+            ON batch_runs (status, lease_until)
+        """)
+
+    @staticmethod
+    def _row(row: Optional[sqlite3.Row]) -> Optional[Dict]:
+        if row is None:
+            return None
+        run = dict(row)
+        run["submission_ids"] = json.loads(run["submission_ids"]) if run["submission_ids"] else None
+        run["summary"] = json.loads(run["summary"]) if run["summary"] else None
+        return run
+
+    # ------------------------------------------------------------------
+    # 등록 / 갱신
+    # ------------------------------------------------------------------
+
+    def create(self, task_id: int, owner: str, submission_count: Optional[int] = None) -> int:
+        """
+        과제의 배치 채점 기록 생성 (owner 가 lease 를 가진 상태)
+
+        Returns:
+            기록 ID
+
+        Raises:
+            BatchRunConflict: 같은 과제의 배치가 이미 실행 중이거나 작업 큐에 진행 중인 작업이 있음
+        """
+        now = time.time()
+        conn = connect(self.db_path, isolation_level=None)
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            running = conn.execute(
+                "SELECT id FROM batch_runs WHERE task_id = ? AND status = ?",
+                (task_id, STATUS_RUNNING)
+            ).fetchone()
+            if running:
+                raise BatchRunConflict(f"Task {task_id} batch grading is already running (run {running['id']})")
+            active_jobs = conn.execute(f"""
+                SELECT COUNT(*) FROM grading_jobs j
+                JOIN submissions s ON s.id = j.submission_id
+                WHERE s.task_id = ? AND j.state IN ({','.join('?' * len(ACTIVE_STATES))})
+            """, (task_id, *ACTIVE_STATES)).fetchone()[0]
+            if active_jobs:
+                raise BatchRunConflict(f"Task {task_id} has {active_jobs} grading jobs in the queue")
+            cur = conn.execute("""
+                INSERT INTO batch_runs
+                    (task_id, run_name, status, stage, submission_count,
+                     owner, lease_until, started_at, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, (
+                task_id, f"task{task_id}-{int(now)}", STATUS_RUNNING, STAGE_PREPARING,
+                submission_count, owner, now + self.lease_seconds,
+                datetime.now().isoformat(), now
+            ))
+            conn.execute("COMMIT")
+            return cur.lastrowid
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+    def update(self, run_id: int, **fields):
+        """기록 갱신 (submission_ids/summary 는 JSON 으로 저장)"""
+        conn = self._connect()
+        try:
+            self.write(conn, run_id, **fields)
+            conn.commit()
+        finally:
+            conn.close()
+
+    @staticmethod
+    def write(conn: sqlite3.Connection, run_id: int, **fields):
+        """기록 갱신 (주어진 연결에서 실행, 결과 저장과 같은 트랜잭션에 묶을 때 사용)"""
+        unknown = set(fields) - set(_UPDATABLE)
+        if unknown:
+            raise ValueError(f"Unknown batch run fields: {sorted(unknown)}")
+        for key in ("submission_ids", "summary"):
+            if fields.get(key) is not None:
+                fields[key] = json.dumps(fields[key], ensure_ascii=False)
+        assignments = ", ".join(f"{column} = ?" for column in fields)
+        conn.execute(
+            f"UPDATE batch_runs SET {assignments}, updated_at = ? WHERE id = ?",
+            (*fields.values(), time.time(), run_id)
+        )
+
+    def claim(self, run_id: int, owner: str) -> bool:
+        """실행 중인 기록의 lease 획득/연장 (다른 프로세스가 lease 를 가지고 있으면 False)"""
+        now = time.time()
+        conn = self._connect()
+        try:
+            cur = conn.execute("""
+                UPDATE batch_runs SET owner = ?, lease_until = ?, updated_at = ?
+                WHERE id = ? AND status = ?
+                  AND (owner IS NULL OR owner = ? OR lease_until IS NULL OR lease_until < ?)
+            """, (owner, now + self.lease_seconds, now, run_id, STATUS_RUNNING, owner, now))
+            conn.commit()
+            return cur.rowcount > 0
+        finally:
+            conn.close()
+
+    def release(self, owner: str):
+        """종료 시 owner 의 lease 반납 (다음 시작 시 바로 이어받을 수 있도록)"""
+        conn = self._connect()
+        try:
+            conn.execute("""
+                UPDATE batch_runs SET lease_until = NULL, updated_at = ?
+                WHERE owner = ? AND status = ?
+            """, (time.time(), owner, STATUS_RUNNING))
+            conn.commit()
+        finally:
+            conn.close()
+
+    # ------------------------------------------------------------------
+    # 조회
+    # ------------------------------------------------------------------
+
+    def get(self, run_id: int) -> Optional[Dict]:
+        conn = self._connect()
+        row = conn.execute("SELECT * FROM batch_runs WHERE id = ?", (run_id,)).fetchone()
+        conn.close()
+        return self._row(row)
+
+    def latest_for_task(self, task_id: int) -> Optional[Dict]:
+        """과제의 가장 최근 배치 채점 기록"""
+        conn = self._connect()
+        row = conn.execute("""
+            SELECT * FROM batch_runs WHERE task_id = ?
+            ORDER BY id DESC LIMIT 1
+        """, (task_id,)).fetchone()
+        conn.close()
+        return self._row(row)
+
+    def list_resumable(self) -> List[Dict]:
+        """lease 가 만료된(소유 프로세스가 중단된) 실행 중 기록"""
+        conn = self._connect()
+        rows = conn.execute("""
+            SELECT * FROM batch_runs
+            WHERE status = ? AND (lease_until IS NULL OR lease_until < ?)
+            ORDER BY id
+        """, (STATUS_RUNNING, time.time())).fetchall()
+        conn.close()
+        return [self._row(row) for row in rows]
+
+    @staticmethod
+    def status_view(run: Dict) -> Dict:
+        """/tasks/{task_id}/batch-status 응답"""
+        return {
+            "run_id": run["id"],
+            "status": run["status"],
+            "stage": run["stage"],
+            "submission_count": run["submission_count"],
+            "exec_batch_id": run["exec_batch_id"],
+            "judge_batch_id": run["judge_batch_id"],
+            "started_at": run["started_at"],
+            "finished_at": run["finished_at"],
+            **({"error": run["error"]} if run["error"] else {}),
+            **(run["summary"] or {}),
+        }
@@ -8,6 +8,8 @@ import os
 import sqlite3
 from datetime import datetime
 
+from migrations import run_migrations
+
 # 데이터베이스 경로
 DATA_DIR = os.environ.get("DATA_DIR", ".")
 DB_PATH = os.path.join(DATA_DIR, "competition_prd.db")
@@ -627,49 +629,8 @@ KPI:
 }
 
 def init_database():
-    """데이터베이스 초기화"""
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    c = conn.cursor()
-    
-    # 테이블 생성
-    c.execute("""
-    CREATE TABLE IF NOT EXISTS practitioners (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        name TEXT NOT NULL,
-        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-    )
-    """)
-    
-    c.execute("""
-    CREATE TABLE IF NOT EXISTS tasks (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        title TEXT NOT NULL,
-        description TEXT,
-        input_data TEXT,
-        golden_output TEXT,
-        evaluation_notes TEXT,
-        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-    )
-    """)
-    
-    c.execute("""
-    CREATE TABLE IF NOT EXISTS submissions (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        task_id INTEGER NOT NULL,
-        practitioner_id INTEGER NOT NULL,
-        prompt_text TEXT NOT NULL,
-        status TEXT DEFAULT 'submitted',
-        grading_result TEXT,
-        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-        graded_at TIMESTAMP,
-        FOREIGN KEY (task_id) REFERENCES tasks(id),
-        FOREIGN KEY (practitioner_id) REFERENCES practitioners(id)
-    )
-    """)
-    
-    conn.commit()
-    conn.close()
+    """데이터베이스 초기화 (스키마는 migrations.py 로 생성)"""
+    run_migrations(DB_PATH)
 
 
 def create_demo_data():
@@ -0,0 +1,274 @@
+"""
+SQLite 연결 관리
+요청마다 새 연결을 열고 닫는 대신 DB 파일별 연결 풀을 사용하고
+모든 연결에 같은 PRAGMA 를 적용 (채점 쓰기와 대시보드 읽기가 겹쳐도 잠금 최소화)
+
+- journal_mode=WAL: 쓰기 중에도 읽기 가능
+- busy_timeout: 잠금 시 즉시 실패하지 않고 대기
+- synchronous=NORMAL: WAL 에서 안전한 범위의 fsync 감소
+- cache_size / mmap_size: 페이지 캐시, 메모리 맵 읽기
+- foreign_keys=ON
+
+풀 연결의 close() 는 연결을 닫지 않고 풀에 반환
+풀이 가득 차면 풀 밖의 임시 연결을 SQLITE_POOL_MAX_OVERFLOW 개까지만 열고, 그 이상은 PoolTimeout
+close() 없이 버려진 연결(예외로 빠져나간 핸들러)도 가비지 컬렉션 시 풀에 회수
+"""
+
+import os
+import time
+import weakref
+import asyncio
+import sqlite3
+import threading
+from typing import Dict, List
+
+SQLITE_BUSY_TIMEOUT_MS = int(os.environ.get("SQLITE_BUSY_TIMEOUT_MS", "30000"))
+SQLITE_CACHE_SIZE_KB = int(os.environ.get("SQLITE_CACHE_SIZE_KB", "65536"))
+SQLITE_MMAP_SIZE_MB = int(os.environ.get("SQLITE_MMAP_SIZE_MB", "256"))
+
+# 풀 크기, 풀이 가득 찼을 때 반환을 기다리는 시간(초)
+SQLITE_POOL_SIZE = int(os.environ.get("SQLITE_POOL_SIZE", "8"))
+SQLITE_POOL_TIMEOUT = float(os.environ.get("SQLITE_POOL_TIMEOUT", "1.0"))
+# 풀이 가득 찼을 때 동시에 열 수 있는 임시 연결 수 (풀 크기 + 이 값이 DB 파일별 연결 상한)
+SQLITE_POOL_MAX_OVERFLOW = int(os.environ.get("SQLITE_POOL_MAX_OVERFLOW", "8"))
+
+
+class PoolTimeout(sqlite3.OperationalError):
+    """연결 상한(풀 + 임시 연결)에 도달해 연결을 받지 못함"""
+
+
+def apply_pragmas(conn: sqlite3.Connection):
+    """연결 설정 (journal_mode 는 DB 파일에 저장되고 나머지는 연결마다 적용)"""
+    conn.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    # 음수: KiB 단위
+    conn.execute(f"PRAGMA cache_size=-{SQLITE_CACHE_SIZE_KB}")
+    conn.execute(f"PRAGMA mmap_size={SQLITE_MMAP_SIZE_MB * 1024 * 1024}")
+    conn.execute("PRAGMA foreign_keys=ON")
+
+
+def connect(db_path: str, **kwargs) -> sqlite3.Connection:
+    """PRAGMA 를 적용한 새 연결 (풀을 쓰지 않는 작업 큐/캐시/워커용)"""
+    kwargs.setdefault("timeout", SQLITE_BUSY_TIMEOUT_MS / 1000)
+    conn = sqlite3.connect(db_path, **kwargs)
+    conn.row_factory = sqlite3.Row
+    apply_pragmas(conn)
+    return conn
+
+
+def _in_event_loop() -> bool:
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return False
+    return True
+
+
+class PooledConnection:
+    """
+    풀에서 꺼낸 연결 핸들 (sqlite3.Connection 메서드는 그대로 위임)
+    close() 시 풀에 반환, close() 없이 참조가 사라지면 weakref.finalize 로 회수
+    """
+
+    def __init__(self, pool: "ConnectionPool", conn: sqlite3.Connection, overflow: bool):
+        self._conn = conn
+        self._pool = pool
+        self.overflow = overflow
+        self._finalizer = weakref.finalize(self, pool.reclaim, conn, overflow)
+        self._finalizer.atexit = False
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+    @property
+    def checked_out(self) -> bool:
+        return self._finalizer.alive
+
+    def close(self):
+        # 이미 반환된 연결의 중복 close() 는 무시
+        if self._finalizer.detach() is not None:
+            self._pool.release(self._conn, self.overflow)
+
+    def discard(self):
+        """풀에 반환하지 않고 실제로 닫음"""
+        if self._finalizer.detach() is not None:
+            self._pool.release(self._conn, self.overflow, reusable=False)
+
+
+class ConnectionPool:
+    """DB 파일 하나에 대한 연결 풀 (스레드 안전, 이벤트 루프와 run_blocking 스레드에서 공용)"""
+
+    def __init__(
+        self,
+        db_path: str,
+        size: int = SQLITE_POOL_SIZE,
+        timeout: float = SQLITE_POOL_TIMEOUT,
+        max_overflow: int = SQLITE_POOL_MAX_OVERFLOW
+    ):
+        self.db_path = db_path
+        self.size = max(1, size)
+        self.timeout = timeout
+        self.max_overflow = max(0, max_overflow)
+
+        self._idle: List[sqlite3.Connection] = []
+        self._in_use = 0
+        self._open = 0
+        self._overflow_open = 0
+        self._cond = threading.Condition()
+
+        # 통계
+        self.created = 0
+        self.acquired = 0
+        self.waits = 0
+        self.total_wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+        self.overflow = 0
+        self.max_in_use = 0
+        self.reclaimed = 0
+        self.timeouts = 0
+
+    def _create(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(
+            self.db_path,
+            timeout=SQLITE_BUSY_TIMEOUT_MS / 1000,
+            check_same_thread=False
+        )
+        apply_pragmas(conn)
+        with self._cond:
+            self.created += 1
+        return conn
+
+    def acquire(self) -> PooledConnection:
+        """
+        유휴 연결을 꺼내거나 새로 만듦
+        풀이 가득 차면 timeout 동안 반환을 기다리고, 그래도 없으면 풀 밖의 임시 연결 사용
+        임시 연결도 max_overflow 개가 모두 사용 중이면 timeout 동안 더 기다린 뒤 PoolTimeout
+        이벤트 루프 스레드에서는 기다리지 않음 (루프를 막지 않도록 바로 임시 연결 또는 PoolTimeout)
+        """
+        started = time.monotonic()
+        overflow = False
+        with self._cond:
+            if not self._idle and self._open >= self.size and not _in_event_loop():
+                self.waits += 1
+                self._cond.wait_for(lambda: self._idle or self._open < self.size, self.timeout)
+                if not self._idle and self._open >= self.size and self._overflow_open >= self.max_overflow:
+                    self._cond.wait_for(
+                        lambda: self._idle or self._open < self.size or self._overflow_open < self.max_overflow,
+                        self.timeout
+                    )
+                waited = time.monotonic() - started
+                self.total_wait_seconds += waited
+                self.max_wait_seconds = max(self.max_wait_seconds, waited)
+
+            if self._idle:
+                conn = self._idle.pop()
+            elif self._open < self.size:
+                conn = None
+                self._open += 1
+            elif self._overflow_open < self.max_overflow:
+                conn = None
+                overflow = True
+                self._overflow_open += 1
+                self.overflow += 1
+            else:
+                self.timeouts += 1
+                raise PoolTimeout(
+                    f"SQLite connection limit reached ({self.size} pooled + "
+                    f"{self.max_overflow} overflow in use): {self.db_path}"
+                )
+
+            self.acquired += 1
+            self._in_use += 1
+            self.max_in_use = max(self.max_in_use, self._in_use)
+
+        if conn is None:
+            try:
+                conn = self._create()
+            except Exception:
+                with self._cond:
+                    self._in_use -= 1
+                    if overflow:
+                        self._overflow_open -= 1
+                    else:
+                        self._open -= 1
+                    self._cond.notify()
+                raise
+        conn.row_factory = sqlite3.Row
+        return PooledConnection(self, conn, overflow)
+
+    def release(self, conn: sqlite3.Connection, overflow: bool = False, reusable: bool = True):
+        """연결 반환 (커밋하지 않은 트랜잭션은 롤백, 기존 close() 와 같은 동작)"""
+        reusable = reusable and not overflow
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+        except sqlite3.Error:
+            reusable = False
+
+        with self._cond:
+            self._in_use -= 1
+            if reusable:
+                self._idle.append(conn)
+            elif overflow:
+                self._overflow_open -= 1
+            else:
+                self._open -= 1
+            self._cond.notify()
+        if not reusable:
+            conn.close()
+
+    def reclaim(self, conn: sqlite3.Connection, overflow: bool):
+        """close() 없이 버려진 핸들의 연결 회수 (weakref.finalize 콜백)"""
+        with self._cond:
+            self.reclaimed += 1
+        print(f"⚠️  SQLite connection reclaimed without close() ({self.db_path})")
+        self.release(conn, overflow)
+
+    def close_all(self):
+        """유휴 연결 모두 닫기 (사용 중인 연결은 반환될 때 다시 풀에 들어감)"""
+        with self._cond:
+            idle, self._idle = self._idle, []
+            self._open -= len(idle)
+        for conn in idle:
+            conn.close()
+
+    def stats(self) -> Dict:
+        with self._cond:
+            return {
+                "db_path": self.db_path,
+                "size": self.size,
+                "open": self._open,
+                "idle": len(self._idle),
+                "in_use": self._in_use,
+                "max_in_use": self.max_in_use,
+                "created": self.created,
+                "acquired": self.acquired,
+                "waits": self.waits,
+                "total_wait_ms": round(self.total_wait_seconds * 1000, 1),
+                "max_wait_ms": round(self.max_wait_seconds * 1000, 1),
+                "overflow": self.overflow,
+                "overflow_open": self._overflow_open,
+                "max_overflow": self.max_overflow,
+                "timeouts": self.timeouts,
+                "reclaimed": self.reclaimed,
+            }
+
+
+_pools: Dict[str, ConnectionPool] = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(db_path: str) -> ConnectionPool:
+    """DB 파일별 프로세스 전역 풀"""
+    with _pools_lock:
+        pool = _pools.get(db_path)
+        if pool is None:
+            pool = _pools[db_path] = ConnectionPool(db_path)
+        return pool
+
+
+def pool_stats() -> List[Dict]:
+    with _pools_lock:
+        pools = list(_pools.values())
+    return [pool.stats() for pool in pools]
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+SQLite 연결 풀 테스트
+- 풀 크기 + max_overflow 가 DB 파일별 연결 상한 (이벤트 루프/스레드 모두)
+- 이벤트 루프에서는 기다리지 않고 바로 PoolTimeout
+- 임시 연결을 반환하면 다시 열 수 있음
+
+실행: python db_test.py  (또는 pytest db_test.py)
+"""
+
+import os
+import time
+import asyncio
+import tempfile
+
+from db import ConnectionPool, PoolTimeout
+
+
+def _pool(tmp: str, **kwargs) -> ConnectionPool:
+    return ConnectionPool(os.path.join(tmp, "pool.db"), **kwargs)
+
+
+def test_overflow_is_capped_off_loop():
+    with tempfile.TemporaryDirectory() as tmp:
+        pool = _pool(tmp, size=1, timeout=0.05, max_overflow=1)
+        pooled = pool.acquire()
+        overflow = pool.acquire()
+        assert not pooled.overflow and overflow.overflow
+
+        started = time.monotonic()
+        try:
+            pool.acquire()
+        except PoolTimeout:
+            pass
+        else:
+            raise AssertionError("연결 상한을 넘어 연결을 열었음")
+        assert time.monotonic() - started >= 0.1
+
+        overflow.close()
+        again = pool.acquire()
+        assert again.overflow
+        stats = pool.stats()
+        assert stats["overflow_open"] == 1 and stats["timeouts"] == 1 and stats["in_use"] == 2
+
+        again.close()
+        pooled.close()
+        pool.close_all()
+
+
+def test_event_loop_acquire_does_not_wait_past_cap():
+    with tempfile.TemporaryDirectory() as tmp:
+        pool = _pool(tmp, size=1, timeout=5, max_overflow=1)
+
+        async def run():
+            held = [pool.acquire(), pool.acquire()]
+            started = time.monotonic()
+            try:
+                pool.acquire()
+            except PoolTimeout:
+                waited = time.monotonic() - started
+            else:
+                raise AssertionError("이벤트 루프에서 연결 상한을 넘어 연결을 열었음")
+            for conn in held:
+                conn.close()
+            return waited
+
+        assert asyncio.run(run()) < 1
+        stats = pool.stats()
+        assert stats["overflow_open"] == 0 and stats["in_use"] == 0 and stats["idle"] == 1
+        pool.close_all()
+
+
+if __name__ == "__main__":
+    for test in (
+        test_overflow_is_capped_off_loop,
+        test_event_loop_acquire_does_not_wait_past_cap,
+    ):
+        test()
+        print(f"✅ {test.__name__}")
@@ -0,0 +1,262 @@
+"""
+SQLite 단일 쓰기 큐 (프로세스당 하나)
+채점 결과 저장, 일괄 업로드, 진행 상황 갱신이 각각 연결을 열고 커밋하면
+SQLite 쓰기 잠금에서 줄을 서고 커밋마다 fsync 비용이 들므로
+전용 쓰기 작업(task)이 몇 ms 동안 모인 쓰기를 한 트랜잭션으로 커밋 (group commit)
+
+- 쓰기 작업은 sqlite3.Connection 을 받는 동기 함수 (commit 하지 않음)
+- 작업마다 SAVEPOINT 로 감싸 한 작업의 실패가 같은 배치의 다른 작업에 영향을 주지 않음
+- 호출자는 await 로 완료(반환값/예외)를 받음
+- 같은 key 로 아직 커밋되지 않은 작업이 있으면 마지막 작업만 실행 (진행 상황 갱신 등)
+- 대기 작업이 high_water 이상이면 backpressure: write() 는 줄어들 때까지 대기
+- 연결 실패 등 배치 전체가 실패하면 그 배치의 모든 호출자에게 예외를 전달하고 쓰기 작업은 계속 실행
+  (다음 배치에서 연결을 다시 염)
+"""
+
+import os
+import time
+import sqlite3
+import asyncio
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Hashable, List, Optional, Tuple
+
+from async_utils import run_blocking
+from db import connect
+
+DB_WRITER_BATCH_MS = float(os.environ.get("DB_WRITER_BATCH_MS", "5"))
+DB_WRITER_MAX_BATCH = int(os.environ.get("DB_WRITER_MAX_BATCH", "200"))
+DB_WRITER_HIGH_WATER = int(os.environ.get("DB_WRITER_HIGH_WATER", "1000"))
+
+WriteFn = Callable[[sqlite3.Connection], Any]
+
+
+class _WriteOp:
+    __slots__ = ("fn", "future", "key")
+
+    def __init__(self, fn: WriteFn, future: asyncio.Future, key: Optional[Hashable]):
+        self.fn = fn
+        self.future = future
+        self.key = key
+
+
+class DatabaseWriter:
+    """쓰기 작업을 모아 주기적으로 한 번에 커밋하는 asyncio 작업"""
+
+    def __init__(
+        self,
+        db_path: str,
+        batch_ms: float = DB_WRITER_BATCH_MS,
+        max_batch: int = DB_WRITER_MAX_BATCH,
+        high_water: int = DB_WRITER_HIGH_WATER
+    ):
+        self.db_path = db_path
+        self.batch_interval = batch_ms / 1000
+        self.max_batch = max(1, max_batch)
+        self.high_water = max(1, high_water)
+
+        self._ops: Deque[_WriteOp] = deque()
+        self._keyed: Dict[Hashable, _WriteOp] = {}
+        self._conn: Optional[sqlite3.Connection] = None
+        self._task: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._drained: Optional[asyncio.Event] = None
+        self._closing = False
+
+        # 통계
+        self.submitted = 0
+        self.coalesced = 0
+        self.batches = 0
+        self.committed = 0
+        self.failed = 0
+        self.max_pending = 0
+        self.backpressure_waits = 0
+        self.total_commit_seconds = 0.0
+
+    # ------------------------------------------------------------------
+    # 수명 주기
+    # ------------------------------------------------------------------
+
+    def start(self):
+        """현재 이벤트 루프에서 쓰기 작업 시작"""
+        if self._task is not None:
+            return
+        self._closing = False
+        self._wakeup = asyncio.Event()
+        self._drained = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """남은 쓰기를 모두 커밋한 뒤 종료"""
+        if self._task is None:
+            return
+        self._closing = True
+        self._wakeup.set()
+        try:
+            await self._task
+        finally:
+            self._task = None
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None
+
+    # ------------------------------------------------------------------
+    # 쓰기 요청
+    # ------------------------------------------------------------------
+
+    @property
+    def pending(self) -> int:
+        return len(self._ops)
+
+    @property
+    def backpressure(self) -> bool:
+        """대기 작업이 high_water 이상이면 True (호출자는 쓰기를 늦추거나 거절)"""
+        return self.pending >= self.high_water
+
+    def submit(self, fn: WriteFn, key: Optional[Hashable] = None) -> asyncio.Future:
+        """쓰기 작업 등록 (커밋되면 완료되는 future 반환)"""
+        if self._task is None or self._closing:
+            raise RuntimeError("DatabaseWriter is not running")
+
+        if key is not None and key in self._keyed:
+            op = self._keyed[key]
+            op.fn = fn
+            self.coalesced += 1
+            return op.future
+
+        op = _WriteOp(fn, asyncio.get_running_loop().create_future(), key)
+        self._ops.append(op)
+        if key is not None:
+            self._keyed[key] = op
+        self.submitted += 1
+        self.max_pending = max(self.max_pending, len(self._ops))
+        self._wakeup.set()
+        return op.future
+
+    async def write(self, fn: WriteFn, key: Optional[Hashable] = None) -> Any:
+        """쓰기 작업을 등록하고 커밋될 때까지 대기 (backpressure 상태면 먼저 대기)"""
+        if self.backpressure:
+            self.backpressure_waits += 1
+            while self.backpressure:
+                self._drained.clear()
+                await self._drained.wait()
+        return await self.submit(fn, key)
+
+    def write_nowait(self, fn: WriteFn, key: Optional[Hashable] = None) -> asyncio.Future:
+        """결과를 기다리지 않는 쓰기 (실패는 로그만 남김)"""
+        future = self.submit(fn, key)
+        future.add_done_callback(self._log_failure)
+        return future
+
+    @staticmethod
+    def _log_failure(future: asyncio.Future):
+        if not future.cancelled() and future.exception() is not None:
+            print(f"⚠️  Background DB write failed: {future.exception()}")
+
+    # ------------------------------------------------------------------
+    # 쓰기 작업
+    # ------------------------------------------------------------------
+
+    async def _run(self):
+        while True:
+            if not self._ops:
+                if self._closing:
+                    return
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+
+            # 첫 작업이 들어오면 잠시 기다려 같이 커밋할 작업을 모음
+            if len(self._ops) < self.max_batch and not self._closing:
+                await asyncio.sleep(self.batch_interval)
+
+            batch: List[_WriteOp] = []
+            while self._ops and len(batch) < self.max_batch:
+                op = self._ops.popleft()
+                if op.key is not None and self._keyed.get(op.key) is op:
+                    del self._keyed[op.key]
+                if not op.future.cancelled():
+                    batch.append(op)
+
+            if batch:
+                try:
+                    results = await run_blocking(self._commit, [op.fn for op in batch])
+                except Exception as e:
+                    # 쓰기 작업이 종료되면 대기 중인 호출자가 모두 멈추므로 배치만 실패 처리
+                    print(f"⚠️  DB write batch failed: {e}")
+                    results = [(False, e)] * len(batch)
+                for op, (ok, value) in zip(batch, results):
+                    if op.future.done():
+                        continue
+                    if ok:
+                        op.future.set_result(value)
+                    else:
+                        op.future.set_exception(value)
+            self._drained.set()
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            # BEGIN/COMMIT 을 직접 제어, run_blocking 스레드가 바뀌어도 순차 사용
+            self._conn = connect(self.db_path, isolation_level=None, check_same_thread=False)
+        return self._conn
+
+    def _reset_connection(self, conn: Optional[sqlite3.Connection]):
+        """배치 실패 후 롤백, 롤백할 수 없는 연결은 닫고 다음 배치에서 다시 연결"""
+        if conn is None:
+            return
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+        except sqlite3.Error:
+            conn.close()
+            self._conn = None
+
+    def _commit(self, fns: List[WriteFn]) -> List[Tuple[bool, Any]]:
+        """배치 1건을 한 트랜잭션으로 실행 (블로킹)"""
+        started = time.monotonic()
+        results: List[Tuple[bool, Any]] = []
+        conn = None
+        try:
+            conn = self._connection()
+            conn.execute("BEGIN IMMEDIATE")
+            for fn in fns:
+                conn.execute("SAVEPOINT write_op")
+                try:
+                    value = fn(conn)
+                except Exception as e:
+                    conn.execute("ROLLBACK TO write_op")
+                    conn.execute("RELEASE write_op")
+                    results.append((False, e))
+                else:
+                    conn.execute("RELEASE write_op")
+                    results.append((True, value))
+            conn.execute("COMMIT")
+        except Exception as e:
+            self._reset_connection(conn)
+            results = [(False, e)] * len(fns)
+
+        self.batches += 1
+        self.committed += sum(1 for ok, _ in results if ok)
+        self.failed += sum(1 for ok, _ in results if not ok)
+        self.total_commit_seconds += time.monotonic() - started
+        return results
+
+    def stats(self) -> Dict:
+        return {
+            "running": self.running,
+            "pending": self.pending,
+            "backpressure": self.backpressure,
+            "high_water": self.high_water,
+            "submitted": self.submitted,
+            "coalesced": self.coalesced,
+            "batches": self.batches,
+            "committed": self.committed,
+            "failed": self.failed,
+            "avg_batch_size": round((self.committed + self.failed) / self.batches, 2) if self.batches else 0,
+            "avg_commit_ms": round(self.total_commit_seconds / self.batches * 1000, 2) if self.batches else 0,
+            "max_pending": self.max_pending,
+            "backpressure_waits": self.backpressure_waits,
+        }
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+DatabaseWriter 테스트
+- 한 작업의 실패는 같은 배치의 다른 작업에 영향을 주지 않음 (SAVEPOINT)
+- 연결 실패로 배치 전체가 실패해도 호출자는 예외를 받고 쓰기 작업은 계속 실행
+
+실행: python db_writer_test.py  (또는 pytest db_writer_test.py)
+"""
+
+import os
+import sqlite3
+import asyncio
+import tempfile
+
+import db_writer
+from db_writer import DatabaseWriter
+
+
+def _create_table(db_path: str):
+    conn = sqlite3.connect(db_path)
+    conn.execute("CREATE TABLE items (id INTEGER PRIMARY KEY, name TEXT NOT NULL)")
+    conn.commit()
+    conn.close()
+
+
+def _names(db_path: str):
+    conn = sqlite3.connect(db_path)
+    try:
+        return [row[0] for row in conn.execute("SELECT name FROM items ORDER BY id")]
+    finally:
+        conn.close()
+
+
+def _insert(name):
+    return lambda conn: conn.execute("INSERT INTO items (name) VALUES (?)", (name,)).lastrowid
+
+
+def test_failed_op_does_not_roll_back_batch():
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "writer.db")
+        _create_table(db_path)
+
+        async def run():
+            writer = DatabaseWriter(db_path, batch_ms=20)
+            writer.start()
+            try:
+                return await asyncio.gather(
+                    writer.write(_insert("a")),
+                    writer.write(_insert(None)),
+                    writer.write(_insert("b")),
+                    return_exceptions=True
+                )
+            finally:
+                await writer.stop()
+
+        first, failed, second = asyncio.run(run())
+        assert isinstance(first, int) and isinstance(second, int)
+        assert isinstance(failed, sqlite3.IntegrityError)
+        assert _names(db_path) == ["a", "b"]
+
+
+def test_connect_failure_fails_batch_and_keeps_running():
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "writer.db")
+        _create_table(db_path)
+
+        real_connect = db_writer.connect
+        attempts = []
+
+        def flaky_connect(*args, **kwargs):
+            attempts.append(1)
+            if len(attempts) == 1:
+                raise sqlite3.OperationalError("unable to open database file")
+            return real_connect(*args, **kwargs)
+
+        async def run():
+            writer = DatabaseWriter(db_path, batch_ms=1)
+            writer.start()
+            try:
+                try:
+                    await asyncio.wait_for(writer.write(_insert("lost")), timeout=5)
+                except sqlite3.OperationalError:
+                    pass
+                else:
+                    raise AssertionError("연결 실패가 호출자에게 전달되지 않음")
+                # 쓰기 작업이 계속 실행되어 다음 쓰기는 다시 연결해 커밋
+                await asyncio.wait_for(writer.write(_insert("saved")), timeout=5)
+                return writer.running, writer.stats()
+            finally:
+                await writer.stop()
+
+        db_writer.connect = flaky_connect
+        try:
+            running, stats = asyncio.run(run())
+        finally:
+            db_writer.connect = real_connect
+
+        assert running
+        assert stats["failed"] == 1 and stats["committed"] == 1
+        assert len(attempts) == 2
+        assert _names(db_path) == ["saved"]
+
+
+if __name__ == "__main__":
+    for test in (
+        test_failed_op_does_not_roll_back_batch,
+        test_connect_failure_fails_batch_and_keeps_running,
+    ):
+        test()
+        print(f"✅ {test.__name__}")
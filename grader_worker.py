@@ -0,0 +1,327 @@
+"""
+채점 워커 프로세스
+API 서버(uvicorn)와 분리된 프로세스에서 작업 큐의 채점 작업을 처리
+
+사용법:
+    python -m grader_worker                      # 1개 프로세스, 동시 4건
+    python -m grader_worker --concurrency 8      # 프로세스당 동시 8건
+    python -m grader_worker --processes 4        # 4개 프로세스 (멀티코어 활용)
+
+API 서버는 GRADING_WORKER_MODE=external 로 실행하면 자체 워커를 띄우지 않음
+"""
+
+import os
+import signal
+import socket
+import sqlite3
+import asyncio
+import argparse
+import multiprocessing
+from datetime import datetime
+from typing import Dict, Optional
+
+from async_utils import EventLoopLagMonitor, run_blocking
+from db import connect
+from db_writer import DatabaseWriter
+from llm_clients import EngineRegistry
+from grading_checkpoints import GradingCheckpointStore, SubmissionCheckpoint
+from grading_results import write_grading_result
+from hedging import get_hedger
+from job_queue import GradingJobStore, run_worker_loop
+from llm_cache import ExecutionCache, JudgeCache
+from migrations import run_migrations
+from prescreen import prescreen_result, prescreen_submission
+from rate_limiter import get_scheduler
+from token_budget import resolve_execution_max_tokens
+
+# 환경변수
+DATA_DIR = os.environ.get("DATA_DIR", ".")
+DB_PATH = os.path.join(DATA_DIR, "competition_prd.db")
+OPENAI_API_KEY = os.environ.get("OPENAI_API_KEY")
+GRADING_MODEL = os.environ.get("GRADING_MODEL", "gpt-3.5-turbo")
+GRADER_CONCURRENCY = int(os.environ.get("GRADER_CONCURRENCY", "4"))
+GRADING_LEASE_SECONDS = float(os.environ.get("GRADING_LEASE_SECONDS", "300"))
+WORKER_STATUS_INTERVAL = float(os.environ.get("WORKER_STATUS_INTERVAL", "5"))
+
+
+class GradingWorker:
+    """작업 큐에서 채점 작업을 가져와 GradingEngine 으로 처리"""
+
+    def __init__(
+        self,
+        store: GradingJobStore,
+        db_path: str,
+        api_key: Optional[str],
+        loop_monitor: Optional[EventLoopLagMonitor] = None,
+        engines: Optional[EngineRegistry] = None,
+        writer: Optional[DatabaseWriter] = None
+    ):
+        self.store = store
+        self.db_path = db_path
+        self.loop_monitor = loop_monitor
+        # 프로세스 전역 엔진/클라이언트 (연결 풀 재사용)
+        self._owns_engines = engines is None
+        self.engines = engines or EngineRegistry(
+            api_key, ExecutionCache(db_path), JudgeCache(db_path)
+        )
+        self.execution_cache = self.engines.execution_cache
+        self.judge_cache = self.engines.judge_cache
+        self.checkpoints = GradingCheckpointStore(db_path)
+        # 결과 저장/진행 상황 갱신은 단일 쓰기 큐로 모아서 커밋 (API 와 같은 프로세스면 공유)
+        self._owns_writer = writer is None
+        self.writer = writer or DatabaseWriter(db_path)
+
+    def _connect(self) -> sqlite3.Connection:
+        return connect(self.db_path)
+
+    def _load_submission(self, submission_id: int) -> Optional[Dict]:
+        conn = self._connect()
+        c = conn.cursor()
+        c.execute("""
+            SELECT s.*, t.title as task_title, t.description as task_description,
+                   t.input_data, t.golden_output, t.evaluation_notes, t.execution_mode,
+                   t.execution_max_tokens, t.golden_output_hash
+            FROM submissions s
+            JOIN tasks t ON s.task_id = t.id
+            WHERE s.id = ?
+        """, (submission_id,))
+        row = c.fetchone()
+        conn.close()
+        return dict(row) if row else None
+
+    async def _save_result(self, job: Dict, grading_result: Dict) -> bool:
+        """
+        작업 완료 처리(lease 확인), 채점 결과(JSON + 점수/상태 컬럼) 저장, 체크포인트 삭제를 한 트랜잭션으로 실행
+        (쓰기 큐에서 커밋될 때까지 대기, lease 를 잃었으면 LeaseLost 로 저장하지 않음)
+        """
+        submission_id = job['submission_id']
+        graded_at = datetime.now().isoformat()
+
+        def write(conn):
+            self.store.finish(conn, job['id'], job['worker_id'])
+            write_grading_result(conn, submission_id, grading_result, graded_at)
+            self.checkpoints.delete_stages(conn, submission_id)
+
+        await self.writer.write(write)
+        return True
+
+    async def handle_job(self, job: Dict) -> bool:
+        """채점 작업 처리 (실패 시 예외 → 작업 큐에서 재시도, 결과와 함께 완료 처리하므로 True 반환)"""
+
+        job_id = job['id']
+        submission_id = job['submission_id']
+
+        # SQLite 호출은 스레드 풀에서 실행 (이벤트 루프 블로킹 방지)
+        submission = await run_blocking(self._load_submission, submission_id)
+        if not submission:
+            raise Exception("제출물을 찾을 수 없습니다")
+
+        force = bool(job['payload'].get('force'))
+
+        # 사전 검사: 빈 값/자리표시자/복사본은 LLM 호출 없이 처리 (강제 재채점은 제외)
+        if not force:
+            screen = prescreen_submission(
+                submission['prompt_text'],
+                submission['golden_output'],
+                submission.get('task_description')
+            )
+            if screen:
+                return await self._save_result(job, prescreen_result(screen))
+
+        def on_stage(stage: str):
+            # 같은 작업의 커밋 전 진행 상황은 마지막 값만 기록
+            if stage == 'step1':
+                step, progress = '프롬프트 실행 중 (3회 동시)...', 10
+            elif stage == 'step2':
+                step, progress = '종합 평가 중...', 70
+            else:
+                return
+            self.writer.write_nowait(
+                lambda conn: self.store.write_progress(conn, job_id, step, progress),
+                key=('progress', job_id)
+            )
+
+        # 단계별 체크포인트: 이전 시도에서 완료된 실행/평가는 건너뜀
+        # 강제 재채점의 첫 시도는 이전 체크포인트를 쓰지 않음
+        if force and job['attempts'] <= 1:
+            await run_blocking(self.checkpoints.clear, submission_id)
+        checkpoint = SubmissionCheckpoint(self.checkpoints, submission_id)
+
+        engine = self.engines.get(GRADING_MODEL)
+
+        # 실행 응답 토큰 상한: 정답 산출물 길이 기준 (과제에 캐시, 정답이 바뀌면 재계산)
+        max_tokens = await run_blocking(
+            resolve_execution_max_tokens,
+            self.db_path,
+            submission['task_id'],
+            submission['golden_output'],
+            engine.model,
+            submission.get('execution_max_tokens'),
+            submission.get('golden_output_hash')
+        )
+
+        # 1단계: 프롬프트 3회 동시 실행 → 2단계: 마스터 평가
+        success, result, outputs, error = await engine.grade_submission(
+            submission['prompt_text'],
+            submission['input_data'],
+            submission['golden_output'],
+            submission.get('evaluation_notes'),
+            submission.get('task_title') or "Task",
+            on_stage=on_stage,
+            force=force,
+            execution_mode=submission.get('execution_mode') or 'auto',
+            checkpoint=checkpoint,
+            max_tokens=max_tokens
+        )
+
+        if not success:
+            raise Exception(f"평가 실패: {error}")
+
+        execution_results = [
+            {
+                'execution_number': i + 1,
+                'success': True,
+                'output': output,
+                'error': None
+            }
+            for i, output in enumerate(outputs)
+        ]
+
+        # 채점 결과 저장
+        grading_result = {
+            'execution_results': execution_results,
+            **result
+        }
+        return await self._save_result(job, grading_result)
+
+    def collect_status(self) -> Dict:
+        """워커 상태 (API 의 /grading/rate-limits 에서 조회)"""
+        status = {
+            'pid': os.getpid(),
+            'rate_limits': get_scheduler().snapshot(),
+            'hedging': get_hedger().stats(),
+            'db_writer': self.writer.stats(),
+            'cache': {
+                'execution': self.execution_cache.stats(),
+                'judge': self.judge_cache.stats(),
+            },
+        }
+        if self.loop_monitor:
+            status['event_loop'] = self.loop_monitor.stats()
+        return status
+
+    async def _publish_status(self, worker_id: str):
+        while True:
+            try:
+                # collect_status 도 캐시 통계 조회(SQLite)를 포함하므로 스레드 풀에서 실행
+                await run_blocking(
+                    lambda: self.store.publish_worker_status(worker_id, self.collect_status())
+                )
+            except Exception as e:
+                print(f"⚠️  Worker status publish failed: {e}")
+            await asyncio.sleep(WORKER_STATUS_INTERVAL)
+
+    async def run(
+        self,
+        worker_id: str,
+        concurrency: int = GRADER_CONCURRENCY,
+        poll_interval: float = 1.0,
+        stop_event: Optional[asyncio.Event] = None
+    ):
+        """워커 루프 실행"""
+        self.writer.start()
+        publisher = asyncio.create_task(self._publish_status(worker_id))
+        try:
+            await run_worker_loop(
+                self.store,
+                self.handle_job,
+                worker_id=worker_id,
+                concurrency=concurrency,
+                poll_interval=poll_interval,
+                stop_event=stop_event
+            )
+        finally:
+            publisher.cancel()
+            if self._owns_writer:
+                await self.writer.stop()
+            if self._owns_engines:
+                await self.engines.aclose()
+
+
+async def _serve(concurrency: int, poll_interval: float, lease_seconds: float):
+    """단일 워커 프로세스 본체 (SIGTERM/SIGINT 시 진행 중인 작업을 마치고 종료)"""
+    run_migrations(DB_PATH)
+    store = GradingJobStore(DB_PATH, lease_seconds=lease_seconds)
+
+    stop_event = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        try:
+            loop.add_signal_handler(sig, stop_event.set)
+        except NotImplementedError:
+            pass
+
+    worker_id = f"{socket.gethostname()}-{os.getpid()}"
+    print(f"✅ Grading worker {worker_id} started (concurrency={concurrency}, db={DB_PATH})")
+
+    loop_monitor = EventLoopLagMonitor()
+    loop_monitor.start()
+
+    worker = GradingWorker(store, DB_PATH, OPENAI_API_KEY, loop_monitor)
+    await worker.run(worker_id, concurrency, poll_interval, stop_event)
+    loop_monitor.stop()
+
+    print(f"👋 Grading worker {worker_id} stopped")
+
+
+def _run_process(concurrency: int, poll_interval: float, lease_seconds: float):
+    asyncio.run(_serve(concurrency, poll_interval, lease_seconds))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Auto-Grader 채점 워커")
+    parser.add_argument("--concurrency", type=int, default=GRADER_CONCURRENCY,
+                        help="프로세스당 동시 채점 수 (기본: GRADER_CONCURRENCY)")
+    parser.add_argument("--processes", type=int, default=1,
+                        help="워커 프로세스 수")
+    parser.add_argument("--poll-interval", type=float, default=1.0,
+                        help="대기 작업이 없을 때 폴링 간격 (초)")
+    parser.add_argument("--lease-seconds", type=float, default=GRADING_LEASE_SECONDS,
+                        help="작업 lease 시간 (초)")
+    args = parser.parse_args()
+
+    if not OPENAI_API_KEY:
+        print("⚠️  OPENAI_API_KEY not set")
+
+    worker_args = (args.concurrency, args.poll_interval, args.lease_seconds)
+
+    # 프로세스마다 속도 제한 예산을 나눠 가짐
+    if args.processes > 1 and "LLM_BUDGET_SHARE" not in os.environ:
+        os.environ["LLM_BUDGET_SHARE"] = str(1.0 / args.processes)
+
+    if args.processes <= 1:
+        _run_process(*worker_args)
+        return
+
+    processes = [
+        multiprocessing.Process(target=_run_process, args=worker_args)
+        for _ in range(args.processes)
+    ]
+    for p in processes:
+        p.start()
+
+    # 부모 프로세스로 들어온 종료 신호를 자식 프로세스에 전달
+    def forward(signum, frame):
+        for p in processes:
+            if p.is_alive():
+                os.kill(p.pid, signum)
+
+    signal.signal(signal.SIGTERM, forward)
+    signal.signal(signal.SIGINT, forward)
+
+    for p in processes:
+        p.join()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+채점 단계별 체크포인트 (SQLite)
+실행 1/2/3, 평가(judge) 결과를 완료 즉시 저장하여
+재시도/재시작 시 처음 비어 있는 단계부터 이어서 채점
+
+- fingerprint: 단계 입력값의 해시 (실행/평가 캐시 키와 동일)
+  제출물이나 과제가 수정되면 fingerprint 가 달라져 이전 결과를 쓰지 않음
+- 채점 결과가 저장되면 해당 제출물의 체크포인트는 삭제
+"""
+
+import time
+import sqlite3
+from typing import Optional
+
+from db import connect
+
+EXECUTION_STAGES = ("execution_1", "execution_2", "execution_3")
+JUDGE_STAGE = "judge"
+
+
+class GradingCheckpointStore:
+    """grading_stages 테이블 접근"""
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+
+    def _connect(self) -> sqlite3.Connection:
+        return connect(self.db_path)
+
+    @staticmethod
+    def create_schema(conn: sqlite3.Connection):
+        """grading_stages 테이블 (migrations.py 에서 실행)"""
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS grading_stages (
+                submission_id INTEGER NOT NULL,
+                stage TEXT NOT NULL,
+                fingerprint TEXT NOT NULL,
+                output TEXT NOT NULL,
+                created_at REAL,
+                PRIMARY KEY (submission_id, stage)
+            )
+        """)
+
+    def get(self, submission_id: int, stage: str, fingerprint: str) -> Optional[str]:
+        """fingerprint 가 일치하는 단계 결과 (없으면 None)"""
+        conn = self._connect()
+        row = conn.execute("""
+            SELECT output FROM grading_stages
+            WHERE submission_id = ? AND stage = ? AND fingerprint = ?
+        """, (submission_id, stage, fingerprint)).fetchone()
+        conn.close()
+        return row["output"] if row else None
+
+    def save(self, submission_id: int, stage: str, fingerprint: str, output: str):
+        """단계 결과 저장 (같은 단계의 이전 결과는 덮어씀)"""
+        conn = self._connect()
+        conn.execute("""
+            INSERT OR REPLACE INTO grading_stages
+                (submission_id, stage, fingerprint, output, created_at)
+            VALUES (?, ?, ?, ?, ?)
+        """, (submission_id, stage, fingerprint, output, time.time()))
+        conn.commit()
+        conn.close()
+
+    def clear(self, submission_id: int):
+        """채점 완료 후 체크포인트 삭제"""
+        conn = self._connect()
+        self.delete_stages(conn, submission_id)
+        conn.commit()
+        conn.close()
+
+    @staticmethod
+    def delete_stages(conn: sqlite3.Connection, submission_id: int):
+        """체크포인트 삭제 (주어진 연결에서 실행, 결과 저장과 같은 트랜잭션용)"""
+        conn.execute("DELETE FROM grading_stages WHERE submission_id = ?", (submission_id,))
+
+
+class SubmissionCheckpoint:
+    """제출물 하나에 묶인 체크포인트 (채점 엔진에 전달)"""
+
+    def __init__(self, store: GradingCheckpointStore, submission_id: int):
+        self.store = store
+        self.submission_id = submission_id
+
+    def get(self, stage: str, fingerprint: str) -> Optional[str]:
+        return self.store.get(self.submission_id, stage, fingerprint)
+
+    def save(self, stage: str, fingerprint: str, output: str):
+        self.store.save(self.submission_id, stage, fingerprint, output)
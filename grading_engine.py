@@ -5,13 +5,270 @@ PRD 준수 채점 엔진
 """
 
 import os
+import re
 import json
 import time
-from typing import Dict, List, Tuple, Optional
-from openai import OpenAI
+import asyncio
+from typing import Callable, Dict, List, Tuple, Optional
+from openai import OpenAI, AsyncOpenAI, BadRequestError, RateLimitError
 
+from async_utils import run_blocking
+from grading_checkpoints import EXECUTION_STAGES, JUDGE_STAGE, SubmissionCheckpoint
+from hedging import RequestHedger, get_hedger
+from llm_cache import ExecutionCache, JudgeCache
+from output_similarity import compact_outputs, consistency_score, similarity
+from rate_limiter import RateLimitScheduler, get_scheduler, parse_retry_after
+from token_budget import (
+    allocate_budget, context_window, count_chat_tokens, count_tokens,
+    fit_to_tokens, record_usage, start_usage_log, summarize_usage, truncate_to_tokens
+)
 
-class GradingEngine:
+
+# n 파라미터(한 요청에서 여러 결과 생성)를 지원하지 않는 모델
+MULTI_SAMPLE_UNSUPPORTED_PREFIXES = ("o1", "o3", "o4")
+EXECUTION_MODES = ('auto', 'multi_sample', 'parallel', 'adaptive')
+
+# adaptive 모드: 1·2회 결과 유사도가 이 값 이상이면 3회차 실행 생략
+ADAPTIVE_SAMPLING_THRESHOLD = float(os.environ.get("ADAPTIVE_SAMPLING_THRESHOLD", "0.95"))
+
+# 응답 최대 토큰
+EXECUTION_MAX_TOKENS = 2000
+JUDGE_MAX_TOKENS = 2000
+
+# 토큰 예산
+# - 입력 데이터: 실행 프롬프트에 붙는 [Input Data] 최대 토큰 (컨텍스트 길이로도 제한)
+# - 평가 구간: 마스터 평가 프롬프트의 실행 결과 + 정답 산출물 합계 토큰
+# - 템플릿 여유분: 평가 기준/출력 형식 등 고정 문구
+EXECUTION_INPUT_MAX_TOKENS = int(os.environ.get("EXECUTION_INPUT_MAX_TOKENS", "12000"))
+JUDGE_SECTION_MAX_TOKENS = int(os.environ.get("JUDGE_SECTION_MAX_TOKENS", "6000"))
+
+# 항목별 만점 (PRD R2)
+SCORE_LIMITS = {
+    "accuracy_score": 50,
+    "clarity_score": 30,
+    "consistency_score": 20,
+}
+FEEDBACK_KEYS = {
+    "accuracy_score": "accuracy_feedback",
+    "clarity_score": "clarity_feedback",
+    "consistency_score": "consistency_feedback",
+}
+
+# 일관성(20점)을 평가 모델 대신 실행 결과 유사도로 계산 (output_similarity.consistency_score)
+LOCAL_CONSISTENCY_SCORING = os.environ.get("LOCAL_CONSISTENCY_SCORING", "1") == "1"
+PROMPT_TEMPLATE_RESERVE_TOKENS = 1000
+
+JUDGE_SYSTEM_PROMPT = "You are a professional evaluator for prompt engineering competitions. Evaluate submissions objectively and consistently according to the rubric."
+
+
+class GradingPrompts:
+    """
+    실행/평가 프롬프트 구성과 n 파라미터 사용 여부 판단
+    API 클라이언트가 필요 없으므로 비용 예측(grading_estimate)에서 엔진 없이 사용
+    """
+    
+    # 일관성 점수를 로컬에서 계산
+    local_consistency = LOCAL_CONSISTENCY_SCORING
+    
+    # 실행 중 n 파라미터를 거부한 모델 (프로세스 전역)
+    _multi_sample_unsupported: set = set()
+    
+    def __init__(self, model: str = "gpt-3.5-turbo", execution_mode: str = "auto"):
+        self.model = model
+        self.execution_mode = execution_mode
+    
+    def _build_master_grading_prompt(
+        self,
+        participant_prompt: str,
+        execution_outputs: List[str],
+        golden_output: Optional[str],
+        requirements: Optional[str],
+        assignment_name: str,
+        include_consistency: bool = True
+    ) -> str:
+        """
+        마스터 평가 프롬프트 생성
+        PRD R2: 항목별 점수 구간 (정확성 50, 명확성 30, 일관성 20)
+        include_consistency=False 이면 일관성은 로컬에서 계산하므로 평가 기준/출력 형식에서 제외
+        동일한 실행 결과는 한 번만, 거의 같은 결과는 diff 로 포함 (output_similarity)
+        실행 결과와 정답 산출물은 토큰 예산 안에서 잘라서 포함
+        """
+        compacted = compact_outputs(execution_outputs)
+        sections = compacted['sections']
+        section_texts, golden_output = self._fit_judge_sections(
+            participant_prompt,
+            [section['text'] for section in sections],
+            golden_output,
+            requirements
+        )
+        similarity_summary = ", ".join(
+            f"{pair}: {ratio:.3f}" for pair, ratio in compacted['similarity'].items()
+        )
+        
+        prompt = f"""# Prompt Engineering Competition Evaluation
+
+## Assignment: {assignment_name}
+
+## Participant's Prompt:
+```
+{participant_prompt}
+```
+
+## Execution Results ({len(execution_outputs)} runs with temperature=0.1):
+
+Identical outputs are shown once; near-identical outputs are shown as a unified diff against the first output.
+Pairwise similarity (1.000 = identical): {similarity_summary or 'n/a'}
+"""
+        
+        for section, text in zip(sections, section_texts):
+            fence = "```diff" if section['kind'] == 'diff' else "```"
+            prompt += f"""
+### {section['title']}:
+{fence}
+{text}
+```
+"""
+        
+        if golden_output:
+            prompt += f"""
+## Golden Output (Expected Result):
+```
+{golden_output}
+```
+"""
+        
+        if requirements:
+            prompt += f"""
+## Requirements & Rubric:
+{requirements}
+"""
+        
+        prompt += """
+## Evaluation Criteria:
+
+### 1. 정확성 (Prompt Accuracy) - 50점
+- 50점: 프롬프트 실행 결과가 목표 산출물과 내용/형식 모두 일치
+- 30점: 핵심 내용은 일치하나, 일부 누락 요소가 있거나 형식이 불일치
+- 20점 이하: 주요 내용이 누락���거나 구조 자체가 다름
+
+### 2. 명확성 (Prompt Clarity) - 30점
+- 30점: 명확한 역할 지시(예: '너는 데이터 분석가') + 단계별 수행 지침 + 논리적이고 직관적
+- 20점: 이해 가능하지만 일부 모호한 표현이 포함됨
+- 10점 이하: 구조나 지시문이 애매하거나 모순적
+"""
+        
+        if include_consistency:
+            prompt += """
+### 3. 구성 및 검증 (Prompt Validation & Consistency) - 20점
+- 20점: 재실행 시 동일한 결과가 나오며 편차가 없음
+- 10점: 경미한 편차가 있으나 핵심 내용은 유지됨
+- 10점 이하: 매 실행마다 크게 다른 결과가 나옴
+
+## Output Format (JSON):
+{
+  "accuracy_score": 50,
+  "accuracy_feedback": "Detailed explanation...",
+  "clarity_score": 30,
+  "clarity_feedback": "Detailed explanation...",
+  "consistency_score": 20,
+  "consistency_feedback": "Detailed explanation with output comparison...",
+  "total_score": 100,
+  "overall_feedback": "Summary of strengths and areas for improvement..."
+}
+"""
+        else:
+            prompt += """
+(Consistency across runs is scored separately; do not score it.)
+
+## Output Format (JSON):
+{
+  "accuracy_score": 50,
+  "accuracy_feedback": "Detailed explanation...",
+  "clarity_score": 30,
+  "clarity_feedback": "Detailed explanation...",
+  "overall_feedback": "Summary of strengths and areas for improvement..."
+}
+"""
+        
+        prompt += """
+Evaluate objectively and provide constructive feedback in Korean.
+"""
+        
+        return prompt
+    
+    def _fit_judge_sections(
+        self,
+        participant_prompt: str,
+        section_texts: List[str],
+        golden_output: Optional[str],
+        requirements: Optional[str]
+    ) -> Tuple[List[str], Optional[str]]:
+        """
+        실행 결과 구간(전체 또는 diff)/정답 산출물에 토큰 예산 배분
+        짧은 구간은 그대로 두고 남은 예산을 긴 구간끼리 나눠 토큰 경계에서 자름
+        
+        Returns:
+            (잘린 실행 결과 구간 리스트, 잘린 정답 산출물)
+        """
+        available = (
+            context_window(self.model)
+            - JUDGE_MAX_TOKENS
+            - PROMPT_TEMPLATE_RESERVE_TOKENS
+            - count_tokens(participant_prompt, self.model)
+            - count_tokens(requirements, self.model)
+        )
+        budget = min(JUDGE_SECTION_MAX_TOKENS, available)
+        
+        sections = {f"output_{i}": text for i, text in enumerate(section_texts)}
+        if golden_output:
+            sections["golden"] = golden_output
+        allocation = allocate_budget(
+            {name: count_tokens(text, self.model) for name, text in sections.items()},
+            budget
+        )
+        fitted = {
+            name: truncate_to_tokens(text, allocation[name], self.model)
+            for name, text in sections.items()
+        }
+        
+        outputs = [fitted[f"output_{i}"] for i in range(len(section_texts))]
+        return outputs, fitted.get("golden", golden_output)
+    
+    def _build_execution_prompt(
+        self,
+        participant_prompt: str,
+        input_file_content: Optional[str],
+        max_tokens: int = EXECUTION_MAX_TOKENS
+    ) -> str:
+        """
+        실행 프롬프트 구성 (참가자 프롬프트 + [Input Data])
+        입력 데이터가 토큰 예산(컨텍스트 - 응답 토큰 상한)을 넘으면 공백 압축 후 토큰 경계에서 자름
+        """
+        if not input_file_content:
+            return participant_prompt
+        
+        available = (
+            context_window(self.model)
+            - max_tokens
+            - count_tokens(participant_prompt, self.model)
+            - 20  # [Input Data] 구분자 및 메시지 형식 오버헤드
+        )
+        budget = min(EXECUTION_INPUT_MAX_TOKENS, available)
+        input_data = fit_to_tokens(input_file_content, max(0, budget), self.model)
+        return f"{participant_prompt}\n\n[Input Data]\n{input_data}"
+    
+    def _use_multi_sample(self, mode: str) -> bool:
+        """n 파라미터 사용 여부"""
+        if mode == 'parallel':
+            return False
+        if self.model in self._multi_sample_unsupported:
+            return False
+        if mode in ('auto', 'adaptive'):
+            return not self.model.startswith(MULTI_SAMPLE_UNSUPPORTED_PREFIXES)
+        return True
+
+
+class GradingEngine(GradingPrompts):
     """PRD 준수 자동 채점 엔진"""
     
     def __init__(self, api_key: str, model: str = "gpt-3.5-turbo"):
@@ -49,10 +306,7 @@ class GradingEngine:
         outputs = []
         
         # 입력 프롬프트 구성
-        if input_file_content:
-            full_prompt = f"{participant_prompt}\n\n[Input Data]\n{input_file_content}"
-        else:
-            full_prompt = participant_prompt
+        full_prompt = self._build_execution_prompt(participant_prompt, input_file_content)
         
         for attempt in range(3):
             success, output, error = self._execute_single_prompt(
@@ -87,7 +341,7 @@ class GradingEngine:
                         {"role": "user", "content": prompt}
                     ],
                     temperature=self.execution_temperature,
-                    max_tokens=2000
+                    max_tokens=EXECUTION_MAX_TOKENS
                 )
                 
                 output = response.choices[0].message.content
@@ -142,7 +396,7 @@ class GradingEngine:
                     messages=[
                         {
                             "role": "system", 
-                            "content": "You are a professional evaluator for prompt engineering competitions. Evaluate submissions objectively and consistently according to the rubric."
+                            "content": JUDGE_SYSTEM_PROMPT
                         },
                         {
                             "role": "user", 
@@ -150,7 +404,7 @@ class GradingEngine:
                         }
                     ],
                     temperature=self.grading_temperature,
-                    max_tokens=2000,
+                    max_tokens=JUDGE_MAX_TOKENS,
                     response_format={"type": "json_object"}
                 )
                 
@@ -172,94 +426,110 @@ class GradingEngine:
         
         return False, {}, "Max retries exceeded"
     
-    def _build_master_grading_prompt(
-        self,
-        participant_prompt: str,
-        execution_outputs: List[str],
-        golden_output: Optional[str],
-        requirements: Optional[str],
-        assignment_name: str
-    ) -> str:
+    @staticmethod
+    def _apply_consistency(result: Dict, consistency: Dict) -> Dict:
+        """로컬 일관성 점수를 평가 결과에 반영하고 총점 재계산"""
+        result = {**result, **consistency}
+        if isinstance(result.get("accuracy_score"), (int, float)) and \
+                isinstance(result.get("clarity_score"), (int, float)):
+            result["total_score"] = (
+                result["accuracy_score"] + result["clarity_score"] + result["consistency_score"]
+            )
+        return result
+    
+    def _repair_grading_result(self, result) -> Optional[Dict]:
         """
-        마스터 평가 프롬프트 생성
-        PRD R2: 항목별 점수 구간 (정확성 50, 명확성 30, 일관성 20)
+        평가 결과의 복구 가능한 오류를 로컬에서 수정
+        - 점수 문자열("45", "45점", "45/50") → 숫자, 범위 밖 점수는 만점/0점으로 보정
+        - 점수 하나가 빠졌고 총점이 있으면 총점에서 역산
+        - 빠진 피드백은 다른 피드백으로 채움
+        - 총점은 항목 점수 합으로 다시 계산
+        수정한 경우 repaired=True 와 수정 내역(repairs) 추가
+        
+        Returns:
+            복구된 결과 (점수를 알 수 없는 경우 None)
         """
+        if not isinstance(result, dict):
+            return None
+        result = dict(result)
+        repairs = []
         
-        prompt = f"""# Prompt Engineering Competition Evaluation
-
-## Assignment: {assignment_name}
-
-## Participant's Prompt:
-```
-{participant_prompt}
-```
-
-## Execution Results (3 runs with temperature=0.1):
-
-### Output 1:
-```
-{execution_outputs[0][:1500]}{'...' if len(execution_outputs[0]) > 1500 else ''}
-```
-
-### Output 2:
-```
-{execution_outputs[1][:1500]}{'...' if len(execution_outputs[1]) > 1500 else ''}
-```
-
-### Output 3:
-```
-{execution_outputs[2][:1500]}{'...' if len(execution_outputs[2]) > 1500 else ''}
-```
-"""
+        def number(value) -> Optional[float]:
+            if isinstance(value, bool):
+                return None
+            if isinstance(value, (int, float)):
+                return value
+            if isinstance(value, str):
+                match = re.match(r"\s*(-?\d+(?:\.\d+)?)", value)
+                if match:
+                    parsed = float(match.group(1))
+                    return int(parsed) if parsed.is_integer() else parsed
+            return None
         
-        if golden_output:
-            prompt += f"""
-## Golden Output (Expected Result):
-```
-{golden_output[:1500]}{'...' if len(golden_output) > 1500 else ''}
-```
-"""
+        scores = {key: number(result.get(key)) for key in SCORE_LIMITS}
+        for key, value in scores.items():
+            if key in result and value is not None and value != result[key]:
+                repairs.append(f"{key}: {result[key]!r} → {value}")
         
-        if requirements:
-            prompt += f"""
-## Requirements & Rubric:
-{requirements}
-"""
+        missing = [key for key, value in scores.items() if value is None]
+        total = number(result.get("total_score"))
+        if len(missing) == 1 and total is not None:
+            key = missing[0]
+            scores[key] = total - sum(value for k, value in scores.items() if k != key)
+            repairs.append(f"{key}: 총점에서 역산")
+        elif missing:
+            return None
         
-        prompt += """
-## Evaluation Criteria:
-
-### 1. 정확성 (Prompt Accuracy) - 50점
-- 50점: 프롬프트 실행 결과가 목표 산출물과 내용/형식 모두 일치
-- 30점: 핵심 내용은 일치하나, 일부 누락 요소가 있거나 형식이 불일치
-- 20점 이하: 주요 내용이 누락���거나 구조 자체가 다름
-
-### 2. 명확성 (Prompt Clarity) - 30점
-- 30점: 명확한 역할 지시(예: '너는 데이터 분석가') + 단계별 수행 지침 + 논리적이고 직관적
-- 20점: 이해 가능하지만 일부 모호한 표현이 포함됨
-- 10점 이하: 구조나 지시문이 애매하거나 모순적
-
-### 3. 구성 및 검증 (Prompt Validation & Consistency) - 20점
-- 20점: 재실행 시 동일한 결과가 나오며 편차가 없음
-- 10점: 경미한 편차가 있으나 핵심 내용은 유지됨
-- 10점 이하: 매 실행마다 크게 다른 결과가 나옴
-
-## Output Format (JSON):
-{
-  "accuracy_score": 50,
-  "accuracy_feedback": "Detailed explanation...",
-  "clarity_score": 30,
-  "clarity_feedback": "Detailed explanation...",
-  "consistency_score": 20,
-  "consistency_feedback": "Detailed explanation with output comparison...",
-  "total_score": 100,
-  "overall_feedback": "Summary of strengths and areas for improvement..."
-}
-
-Evaluate objectively and provide constructive feedback in Korean.
-"""
+        for key, limit in SCORE_LIMITS.items():
+            clamped = min(max(scores[key], 0), limit)
+            if clamped != scores[key]:
+                repairs.append(f"{key}: {scores[key]} → {clamped} (0~{limit})")
+            result[key] = clamped
         
-        return prompt
+        expected_total = sum(result[key] for key in SCORE_LIMITS)
+        if total is None or abs(total - expected_total) > 0.1:
+            repairs.append(f"total_score: {result.get('total_score')!r} → {expected_total}")
+        result["total_score"] = expected_total
+        
+        feedback_keys = list(FEEDBACK_KEYS.values()) + ["overall_feedback"]
+        present = {
+            key: result[key] for key in feedback_keys
+            if isinstance(result.get(key), str) and result[key].strip()
+        }
+        fallback = present.get("overall_feedback") or " ".join(present.values())
+        for key in feedback_keys:
+            if key not in present:
+                result[key] = fallback
+                repairs.append(f"{key}: 누락되어 다른 피드백으로 채움")
+        
+        if repairs:
+            result["repaired"] = True
+            result["repairs"] = repairs
+        return result
+    
+    @staticmethod
+    def _grading_response_schema(include_consistency: bool = True) -> Dict:
+        """structured output 용 평가 결과 JSON schema"""
+        keys = ["accuracy_score", "accuracy_feedback", "clarity_score", "clarity_feedback"]
+        if include_consistency:
+            keys += ["consistency_score", "consistency_feedback", "total_score"]
+        keys.append("overall_feedback")
+        return {
+            "type": "json_schema",
+            "json_schema": {
+                "name": "grading_result",
+                "strict": True,
+                "schema": {
+                    "type": "object",
+                    "properties": {
+                        key: {"type": "string"} if key.endswith("feedback") else {"type": "number"}
+                        for key in keys
+                    },
+                    "required": keys,
+                    "additionalProperties": False,
+                },
+            },
+        }
     
     def _validate_grading_result(self, result: Dict) -> bool:
         """평가 결과 검증"""
@@ -332,6 +602,579 @@ Evaluate objectively and provide constructive feedback in Korean.
         return True, grading_result, outputs, None
 
 
+class AsyncGradingEngine(GradingEngine):
+    """
+    비동기 채점 엔진
+    AsyncOpenAI 클라이언트로 3회 실행을 동시에 요청하여
+    제출물당 소요 시간을 (실행 1회 + 평가 1회) 수준으로 단축
+    
+    모든 호출은 프로세스 전역 RateLimitScheduler 를 거쳐 전송되며,
+    429 재시도는 SDK 내부 재시도 대신 스케줄러가 조율
+    """
+    
+    # 429 응답은 일반 재시도 횟수와 별도로 이 횟수까지 재시도
+    max_rate_limit_retries = 5
+    
+    # json_schema 응답 형식을 거부한 모델 (프로세스 전역)
+    _structured_output_unsupported: set = set()
+    
+    def __init__(
+        self,
+        api_key: str,
+        model: str = "gpt-3.5-turbo",
+        scheduler: Optional[RateLimitScheduler] = None,
+        execution_cache: Optional[ExecutionCache] = None,
+        judge_cache: Optional[JudgeCache] = None,
+        execution_mode: str = "auto",
+        client: Optional[AsyncOpenAI] = None,
+        hedger: Optional[RequestHedger] = None
+    ):
+        # 공유 클라이언트가 없으면 새로 생성 (연결 풀/타임아웃/프록시 설정은 llm_clients 참고)
+        if client is None:
+            from llm_clients import create_async_client
+            client = create_async_client(api_key)
+        
+        self.client = client
+        self.model = model
+        self.scheduler = scheduler or get_scheduler()
+        self.hedger = hedger or get_hedger()
+        self.execution_cache = execution_cache
+        self.judge_cache = judge_cache
+        self.execution_mode = execution_mode
+        
+        self.execution_temperature = 0.1  # 프롬프트 실행 시
+        self.grading_temperature = 0.0    # 평가 시
+    
+    async def _chat_completion(
+        self,
+        messages: List[Dict],
+        max_tokens: int,
+        purpose: str = "execution",
+        **kwargs
+    ):
+        """
+        스케줄러로 예산을 확보한 뒤 chat completion 호출
+        응답 헤더의 x-ratelimit-* 값으로 스케줄러를 동기화하고
+        호출별 토큰 사용량/지연 시간을 기록 (token_budget.record_usage)
+        
+        헤징이 켜져 있으면 p95 지연 시간 안에 응답이 없을 때 같은 요청을 한 번 더 보냄
+        (중복 요청도 스케줄러 예산을 확보한 뒤 전송)
+        """
+        # 토큰화는 CPU 작업이므로 스레드 풀에서 실행
+        prompt_tokens = await run_blocking(count_chat_tokens, messages, self.model)
+        # 출력 토큰은 n개 결과 모두에 대해 계산
+        estimated = prompt_tokens + max_tokens * kwargs.get("n", 1)
+        await self.scheduler.acquire(self.model, estimated)
+        
+        async def send():
+            return await self.client.chat.completions.with_raw_response.create(
+                model=self.model,
+                messages=messages,
+                max_tokens=max_tokens,
+                **kwargs
+            )
+        
+        async def send_hedge():
+            await self.scheduler.acquire(self.model, estimated)
+            return await send()
+        
+        started = time.monotonic()
+        try:
+            raw = await self.hedger.run(f"{self.model}:{purpose}", send, send_hedge)
+        except RateLimitError as e:
+            headers = e.response.headers if e.response is not None else {}
+            self.scheduler.update_from_headers(self.model, headers)
+            # Retry-After 는 초 또는 HTTP-date (해석할 수 없으면 기본 대기)
+            self.scheduler.penalize(self.model, parse_retry_after(headers.get("retry-after")))
+            raise
+        
+        self.scheduler.update_from_headers(self.model, raw.headers)
+        response = raw.parse()
+        usage = response.usage
+        if usage:
+            self.scheduler.record_usage(self.model, estimated, usage.total_tokens)
+        
+        record_usage({
+            "purpose": purpose,
+            "model": self.model,
+            "n": kwargs.get("n", 1),
+            "counted_prompt_tokens": prompt_tokens,
+            "prompt_tokens": usage.prompt_tokens if usage else prompt_tokens,
+            "completion_tokens": usage.completion_tokens if usage else None,
+            "max_tokens": max_tokens,
+            "latency_ms": round((time.monotonic() - started) * 1000),
+        })
+        return response
+    
+    async def execute_prompt_3_times(
+        self, 
+        participant_prompt: str, 
+        input_file_content: Optional[str] = None,
+        max_retries: int = 2,
+        execution_mode: Optional[str] = None,
+        checkpoint: Optional[SubmissionCheckpoint] = None,
+        max_tokens: Optional[int] = None
+    ) -> Tuple[bool, List[str], Optional[str]]:
+        """
+        PRD F3.3: 참가자 프롬프트를 3회 실행
+        체크포인트/실행 캐시에 있는 실행 번호는 재사용하고 비어 있는 실행만 요청
+        
+        Args:
+            execution_mode: 'auto' | 'multi_sample' | 'parallel' | 'adaptive' (기본: self.execution_mode)
+                - multi_sample: n 파라미터로 한 번의 요청에서 여러 결과 생성
+                  (프롬프트/입력 데이터 토큰을 한 번만 전송)
+                - parallel: 실행마다 별도 요청을 동시에 전송
+                - auto: 모델이 n 을 지원하면 multi_sample, 아니면 parallel
+                - adaptive: 2회 먼저 실행하고 두 결과의 유사도가
+                  ADAPTIVE_SAMPLING_THRESHOLD 미만일 때만 3회차 실행
+            checkpoint: 제출물 체크포인트 (실행 결과를 완료 즉시 저장)
+            max_tokens: 실행 응답 토큰 상한 (기본: EXECUTION_MAX_TOKENS, 과제별 값은
+                token_budget.resolve_execution_max_tokens)
+        
+        Returns:
+            (성공 여부, [결과1, 결과2, 결과3], 에러 메시지)
+            adaptive 모드에서 3회차를 생략하면 결과는 2개
+        """
+        mode = execution_mode or self.execution_mode
+        max_tokens = max_tokens or EXECUTION_MAX_TOKENS
+        
+        # 입력 데이터 토큰화/절단은 CPU 작업이므로 스레드 풀에서 실행
+        full_prompt = await run_blocking(
+            self._build_execution_prompt, participant_prompt, input_file_content, max_tokens
+        )
+        
+        # 실제 전송되는 (예산 적용 후) 프롬프트 기준 캐시 키
+        cache_keys = [
+            ExecutionCache.key_for(
+                self.model, self.execution_temperature,
+                full_prompt, None, run_index, max_tokens
+            )
+            for run_index in range(3)
+        ]
+        
+        outputs: List[Optional[str]] = list(await asyncio.gather(*[
+            self._lookup_output(run_index, key, checkpoint)
+            for run_index, key in enumerate(cache_keys)
+        ]))
+        # adaptive: 3회차가 저장되어 있지 않으면 1·2회차만 먼저 실행
+        adaptive = mode == 'adaptive' and outputs[2] is None
+        runs = 2 if adaptive else 3
+        
+        error = await self._fill_outputs(
+            full_prompt, outputs, [i for i in range(runs) if outputs[i] is None],
+            cache_keys, mode, max_retries, checkpoint, max_tokens
+        )
+        if error:
+            return False, [], error
+        
+        if adaptive:
+            if await run_blocking(similarity, outputs[0], outputs[1]) >= ADAPTIVE_SAMPLING_THRESHOLD:
+                return True, outputs[:2], None
+            error = await self._fill_outputs(
+                full_prompt, outputs, [2], cache_keys, mode, max_retries, checkpoint, max_tokens
+            )
+            if error:
+                return False, [], error
+        
+        return True, outputs, None
+    
+    async def _fill_outputs(
+        self,
+        full_prompt: str,
+        outputs: List[Optional[str]],
+        missing: List[int],
+        cache_keys: List[str],
+        mode: str,
+        max_retries: int,
+        checkpoint: Optional[SubmissionCheckpoint],
+        max_tokens: int = EXECUTION_MAX_TOKENS
+    ) -> Optional[str]:
+        """
+        outputs 의 missing 위치를 실행 결과로 채움
+        
+        Returns:
+            에러 메시지 (성공 시 None)
+        """
+        # 한 번의 요청으로 남은 실행 결과를 모두 생성 (실패 시 개별 호출로 대체)
+        if len(missing) > 1 and self._use_multi_sample(mode):
+            success, samples, _ = await self._execute_multi_sample(
+                full_prompt, len(missing), max_retries, max_tokens
+            )
+            if success:
+                for i, sample in zip(missing, samples):
+                    outputs[i] = sample
+                    await self._store_output(i, cache_keys[i], sample, checkpoint)
+                return None
+        
+        # 실행마다 완료 즉시 저장 (하나가 실패해도 성공한 실행은 다음 시도에서 재사용)
+        async def run(i: int) -> Optional[str]:
+            success, output, error = await self._execute_single_prompt(
+                full_prompt, max_retries, max_tokens
+            )
+            if not success:
+                return error
+            outputs[i] = output
+            await self._store_output(i, cache_keys[i], output, checkpoint)
+            return None
+        
+        errors = await asyncio.gather(*[run(i) for i in missing])
+        for i, error in zip(missing, errors):
+            if outputs[i] is None:
+                return f"Execution {i+1} failed: {error}"
+        return None
+    
+    async def _lookup_output(
+        self,
+        run_index: int,
+        cache_key: str,
+        checkpoint: Optional[SubmissionCheckpoint]
+    ) -> Optional[str]:
+        """체크포인트 → 실행 캐시 순으로 저장된 실행 결과 조회"""
+        if checkpoint is not None:
+            output = await run_blocking(checkpoint.get, EXECUTION_STAGES[run_index], cache_key)
+            if output is not None:
+                return output
+        if self.execution_cache is not None:
+            output = await run_blocking(self.execution_cache.get, cache_key)
+            if output is not None and checkpoint is not None:
+                await run_blocking(checkpoint.save, EXECUTION_STAGES[run_index], cache_key, output)
+            return output
+        return None
+    
+    async def _store_output(
+        self,
+        run_index: int,
+        cache_key: str,
+        output: Optional[str],
+        checkpoint: Optional[SubmissionCheckpoint]
+    ):
+        """실행 결과를 체크포인트와 실행 캐시에 저장"""
+        if output is None:
+            return
+        if checkpoint is not None:
+            await run_blocking(checkpoint.save, EXECUTION_STAGES[run_index], cache_key, output)
+        if self.execution_cache is not None:
+            await run_blocking(self.execution_cache.put, cache_key, output, self.model)
+    
+    async def _complete_with_retries(
+        self,
+        messages: List[Dict],
+        max_retries: int,
+        raise_bad_request: bool = False,
+        **kwargs
+    ) -> Tuple[bool, object, Optional[str]]:
+        """
+        chat completion 호출 (재시도 포함, 비동기 backoff)
+        raise_bad_request=True 이면 BadRequestError 를 그대로 전달 (호출자가 거부된 파라미터 확인)
+        
+        Returns:
+            (성공 여부, 응답 객체, 에러 메시지)
+        """
+        retry = 0
+        rate_limited = 0
+        while True:
+            try:
+                response = await self._chat_completion(messages, **kwargs)
+                return True, response, None
+                
+            except RateLimitError as e:
+                # 대기는 스케줄러가 담당 (retry-after 까지 모델 전체 대기)
+                rate_limited += 1
+                if rate_limited > self.max_rate_limit_retries:
+                    return False, None, str(e)
+                
+            except BadRequestError as e:
+                # 요청 자체가 잘못된 경우 재시도하지 않음
+                if raise_bad_request:
+                    raise
+                return False, None, str(e)
+                
+            except Exception as e:
+                error_msg = str(e)
+                if retry < max_retries:
+                    await asyncio.sleep(2 ** retry)  # Exponential backoff
+                    retry += 1
+                else:
+                    return False, None, error_msg
+    
+    async def _execute_single_prompt(
+        self, 
+        prompt: str, 
+        max_retries: int = 2,
+        max_tokens: int = EXECUTION_MAX_TOKENS
+    ) -> Tuple[bool, str, Optional[str]]:
+        """
+        단일 프롬프트 실행 (재시도 포함, 비동기 backoff)
+        
+        Returns:
+            (성공 여부, 결과 텍스트, 에러 메시지)
+        """
+        success, response, error = await self._complete_with_retries(
+            [{"role": "user", "content": prompt}],
+            max_retries,
+            max_tokens=max_tokens,
+            temperature=self.execution_temperature
+        )
+        if not success:
+            return False, "", error
+        
+        return True, response.choices[0].message.content, None
+    
+    async def _execute_multi_sample(
+        self,
+        prompt: str,
+        n: int,
+        max_retries: int = 2,
+        max_tokens: int = EXECUTION_MAX_TOKENS
+    ) -> Tuple[bool, List[str], Optional[str]]:
+        """
+        n 파라미터로 한 번의 요청에서 n개 결과 생성
+        모델이 n 을 거부하면 이후 이 모델은 병렬 호출만 사용
+        
+        Returns:
+            (성공 여부, 결과 리스트, 에러 메시지)
+        """
+        try:
+            success, response, error = await self._complete_with_retries(
+                [{"role": "user", "content": prompt}],
+                max_retries,
+                raise_bad_request=True,
+                max_tokens=max_tokens,
+                temperature=self.execution_temperature,
+                n=n
+            )
+        except BadRequestError as e:
+            # 모델이 n 파라미터를 거부한 경우 기억
+            if getattr(e, "param", None) == "n":
+                self._multi_sample_unsupported.add(self.model)
+            return False, [], str(e)
+        if not success:
+            return False, [], error
+        
+        choices = sorted(response.choices, key=lambda choice: choice.index)
+        samples = [choice.message.content for choice in choices]
+        if len(samples) != n or any(sample is None for sample in samples):
+            return False, [], f"Expected {n} choices, got {len(samples)}"
+        
+        return True, samples, None
+    
+    @staticmethod
+    def _rejects_response_format(error: BadRequestError) -> bool:
+        """400 응답이 response_format(json_schema) 을 거부한 것인지 (error.param / error.code 기준)"""
+        return any(
+            isinstance(value, str) and ("response_format" in value or "json_schema" in value)
+            for value in (getattr(error, "param", None), getattr(error, "code", None))
+        )
+    
+    async def evaluate_outputs(
+        self,
+        participant_prompt: str,
+        execution_outputs: List[str],
+        golden_output: Optional[str] = None,
+        requirements: Optional[str] = None,
+        assignment_name: str = "Task",
+        force: bool = False,
+        precomputed_consistency: Optional[Dict] = None,
+        checkpoint: Optional[SubmissionCheckpoint] = None
+    ) -> Tuple[bool, Dict, Optional[str]]:
+        """
+        PRD F3.4: 마스터 평가 프롬프트로 평가 (1회, T=0)
+        체크포인트/평가 캐시에 같은 마스터 프롬프트의 평가 결과가 있으면 재사용
+        
+        Args:
+            force: True 이면 평가 캐시를 무시하고 다시 평가 (결과는 캐시에 덮어씀)
+            precomputed_consistency: 로컬 일관성 점수 (consistency_score 결과)
+                있으면 평가 모델은 정확성/명확성만 채점하고 일관성 점수와 총점은 이 값으로 계산
+            checkpoint: 제출물 체크포인트 (평가 결과를 완료 즉시 저장)
+        
+        Returns:
+            (성공 여부, 평가 결과 dict, 에러 메시지)
+        """
+        # 결과 압축(difflib)과 구간별 토큰 예산 배분은 CPU 작업이므로 스레드 풀에서 실행
+        master_prompt = await run_blocking(
+            self._build_master_grading_prompt,
+            participant_prompt,
+            execution_outputs,
+            golden_output,
+            requirements,
+            assignment_name,
+            include_consistency=precomputed_consistency is None
+        )
+        
+        cache_key = JudgeCache.key_for(
+            self.model, self.grading_temperature, JUDGE_SYSTEM_PROMPT, master_prompt
+        )
+        if checkpoint is not None:
+            saved = await run_blocking(checkpoint.get, JUDGE_STAGE, cache_key)
+            if saved is not None:
+                return True, json.loads(saved), None
+        if self.judge_cache is not None and not force:
+            cached = await run_blocking(self.judge_cache.get, cache_key)
+            if cached is not None:
+                return True, json.loads(cached), None
+        
+        json_format = {"type": "json_object"}
+        response_format = json_format
+        retry = 0
+        rate_limited = 0
+        while True:
+            try:
+                response = await self._chat_completion(
+                    [
+                        {
+                            "role": "system", 
+                            "content": JUDGE_SYSTEM_PROMPT
+                        },
+                        {
+                            "role": "user", 
+                            "content": master_prompt
+                        }
+                    ],
+                    max_tokens=JUDGE_MAX_TOKENS,
+                    purpose="judge",
+                    temperature=self.grading_temperature,
+                    response_format=response_format
+                )
+                
+                result_text = response.choices[0].message.content
+                try:
+                    result = json.loads(result_text)
+                except (TypeError, ValueError):
+                    result = None
+                if isinstance(result, dict) and precomputed_consistency is not None:
+                    result = self._apply_consistency(result, precomputed_consistency)
+                result = self._repair_grading_result(result)
+                
+                # 복구할 수 없는 응답만 다시 요청 (가능하면 JSON schema 로 형식 강제)
+                if result is None or not self._validate_grading_result(result):
+                    if retry >= 2:
+                        return False, {}, "Invalid grading result format"
+                    retry += 1
+                    if self.model not in self._structured_output_unsupported:
+                        response_format = self._grading_response_schema(
+                            include_consistency=precomputed_consistency is None
+                        )
+                    continue
+                
+                result_json = json.dumps(result, ensure_ascii=False)
+                if checkpoint is not None:
+                    await run_blocking(checkpoint.save, JUDGE_STAGE, cache_key, result_json)
+                if self.judge_cache is not None:
+                    await run_blocking(self.judge_cache.put, cache_key, result_json, self.model)
+                
+                return True, result, None
+                
+            except RateLimitError as e:
+                rate_limited += 1
+                if rate_limited > self.max_rate_limit_retries:
+                    return False, {}, f"Grading failed: {str(e)}"
+                
+            except BadRequestError as e:
+                # structured output 을 지원하지 않는 모델이면 json_object 로 다시 요청
+                # (컨텍스트 길이/콘텐츠 정책 등 다른 400 은 모델을 기록하지 않고 실패)
+                if response_format is not json_format and self._rejects_response_format(e):
+                    self._structured_output_unsupported.add(self.model)
+                    response_format = json_format
+                    continue
+                return False, {}, f"Grading failed: {str(e)}"
+                
+            except Exception as e:
+                if retry < 2:
+                    await asyncio.sleep(2 ** retry)
+                    retry += 1
+                else:
+                    return False, {}, f"Grading failed: {str(e)}"
+    
+    async def grade_submission(
+        self,
+        participant_prompt: str,
+        input_file_content: Optional[str] = None,
+        golden_output: Optional[str] = None,
+        requirements: Optional[str] = None,
+        assignment_name: str = "Task",
+        on_stage: Optional[Callable[[str], None]] = None,
+        force: bool = False,
+        execution_mode: Optional[str] = None,
+        checkpoint: Optional[SubmissionCheckpoint] = None,
+        max_tokens: Optional[int] = None
+    ) -> Tuple[bool, Dict, List[str], Optional[str]]:
+        """
+        전체 채점 프로세스 실행 (비동기)
+        
+        Args:
+            on_stage: 단계 전환 시 호출되는 콜백 ('step1' -> 'step2')
+            force: 평가 캐시를 무시하고 다시 평가
+            execution_mode: 과제별 실행 방식 (기본: self.execution_mode)
+            checkpoint: 제출물 체크포인트 (있으면 처음 비어 있는 단계부터 이어서 채점)
+            max_tokens: 과제별 실행 응답 토큰 상한
+        
+        Returns:
+            (성공 여부, 평가 결과, 실행 결과 리스트, 에러 메시지)
+            평가 결과에는 호출별 토큰 사용량(token_usage)이 포함됨
+        """
+        usage_log = start_usage_log()
+        
+        # 1단계: 프롬프트 3회 동시 실행
+        if on_stage:
+            on_stage('step1')
+        success, outputs, error = await self.execute_prompt_3_times(
+            participant_prompt,
+            input_file_content,
+            execution_mode=execution_mode,
+            checkpoint=checkpoint,
+            max_tokens=max_tokens
+        )
+        
+        if not success:
+            return False, {}, [], error
+        
+        sampling = None
+        if (execution_mode or self.execution_mode) == 'adaptive':
+            sampling = await run_blocking(self._sampling_decision, outputs)
+        
+        consistency = None
+        if self.local_consistency:
+            # n-gram Jaccard/편집 비율 계산은 CPU 작업이므로 스레드 풀에서 실행
+            consistency = await run_blocking(consistency_score, outputs)
+            if sampling and sampling['skipped_runs']:
+                consistency['consistency_feedback'] += (
+                    f" (적응형 샘플링: 1·2회 결과 유사도 {sampling['similarity_1_2']:.3f}"
+                    f" ≥ {sampling['threshold']} 으로 3회차 실행 생략)"
+                )
+        
+        # 2단계: 마스터 평가 프롬프트로 평가 (일관성은 로컬 계산)
+        if on_stage:
+            on_stage('step2')
+        success, grading_result, error = await self.evaluate_outputs(
+            participant_prompt,
+            outputs,
+            golden_output,
+            requirements,
+            assignment_name,
+            force=force,
+            precomputed_consistency=consistency,
+            checkpoint=checkpoint
+        )
+        
+        if not success:
+            return False, {}, outputs, error
+        
+        if sampling:
+            grading_result['sampling'] = sampling
+        grading_result['token_usage'] = summarize_usage(usage_log)
+        return True, grading_result, outputs, None
+    
+    @staticmethod
+    def _sampling_decision(outputs: List[str]) -> Dict:
+        """adaptive 모드의 3회차 생략 여부 기록 (일관성 점수 설명용)"""
+        return {
+            'mode': 'adaptive',
+            'executed_runs': len(outputs),
+            'skipped_runs': [3] if len(outputs) < 3 else [],
+            'similarity_1_2': round(similarity(outputs[0], outputs[1]), 4),
+            'threshold': ADAPTIVE_SAMPLING_THRESHOLD,
+        }
+
 # 테스트 코드
 if __name__ == "__main__":
     import os
@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+"""
+AsyncGradingEngine 평가 결과 처리 테스트 (OpenAI API 호출 없이 가짜 클라이언트 사용)
+- 복구 가능한 평가 결과는 다시 요청하지 않고 로컬에서 수정
+- 복구할 수 없는 평가 결과는 JSON schema 로 다시 요청하고, 계속 실패하면 실패 처리
+- response_format(json_schema) 을 거부한 400 은 json_object 로 다시 요청하고 모델 기록
+- 다른 400 (컨텍스트 길이 등) 은 모델을 기록하지 않고 실패
+
+실행: python grading_engine_test.py  (또는 pytest grading_engine_test.py)
+"""
+
+import json
+import asyncio
+from types import SimpleNamespace
+
+import httpx
+from openai import BadRequestError
+
+from grading_engine import AsyncGradingEngine
+from hedging import RequestHedger
+from rate_limiter import RateLimitScheduler
+
+MODEL = "gpt-4o-mini"
+
+VALID_RESULT = {
+    "accuracy_score": 40,
+    "accuracy_feedback": "정답과 대부분 일치",
+    "clarity_score": 25,
+    "clarity_feedback": "지시가 명확함",
+    "consistency_score": 18,
+    "consistency_feedback": "결과가 안정적",
+    "total_score": 83,
+    "overall_feedback": "좋은 프롬프트",
+}
+
+
+class FakeCompletions:
+    """chat.completions.with_raw_response.create 대역 (responder 가 요청마다 응답 본문 또는 예외 반환)"""
+
+    def __init__(self, responder):
+        self.responder = responder
+        self.calls = []
+        self.with_raw_response = self
+
+    async def create(self, **kwargs):
+        self.calls.append(kwargs)
+        content = self.responder(kwargs)
+        if isinstance(content, Exception):
+            raise content
+        response = SimpleNamespace(
+            choices=[SimpleNamespace(index=0, message=SimpleNamespace(content=content), finish_reason="stop")],
+            usage=SimpleNamespace(prompt_tokens=100, completion_tokens=50, total_tokens=150),
+            model=kwargs["model"],
+        )
+        return SimpleNamespace(headers={}, parse=lambda: response)
+
+
+def _engine(responder):
+    completions = FakeCompletions(responder)
+    client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+    engine = AsyncGradingEngine(
+        api_key="test",
+        model=MODEL,
+        scheduler=RateLimitScheduler(),
+        hedger=RequestHedger(),
+        client=client
+    )
+    AsyncGradingEngine._structured_output_unsupported.discard(MODEL)
+    return engine, completions
+
+
+def _evaluate(engine):
+    return asyncio.run(engine.evaluate_outputs(
+        "다음 데이터를 세 줄로 요약해 주세요", ["요약"] * 3, "요약", None, "Task A", force=True
+    ))
+
+
+def _bad_request(message: str, param=None, code=None) -> BadRequestError:
+    request = httpx.Request("POST", "https://api.openai.com/v1/chat/completions")
+    return BadRequestError(
+        message,
+        response=httpx.Response(400, request=request),
+        body={"message": message, "type": "invalid_request_error", "param": param, "code": code}
+    )
+
+
+def _response_types(completions):
+    return [call["response_format"]["type"] for call in completions.calls]
+
+
+def test_recoverable_result_is_repaired_without_retry():
+    payload = {
+        **VALID_RESULT,
+        "accuracy_score": "45/50",
+        "clarity_score": "32점",
+        "total_score": 90,
+    }
+    del payload["consistency_score"], payload["clarity_feedback"]
+    engine, completions = _engine(lambda kwargs: json.dumps(payload, ensure_ascii=False))
+
+    success, result, error = _evaluate(engine)
+
+    assert success and error is None
+    assert len(completions.calls) == 1
+    # 점수 문자열 변환, 범위 보정(32 → 30), 빠진 일관성 점수는 총점에서 역산 (90 - 45 - 32)
+    assert result["accuracy_score"] == 45
+    assert result["clarity_score"] == 30
+    assert result["consistency_score"] == 13
+    assert result["total_score"] == 88
+    assert result["clarity_feedback"]
+    assert result["repaired"] is True and result["repairs"]
+
+
+def test_unrecoverable_result_retries_with_schema_then_fails():
+    # 점수가 두 개 빠지면 총점이 있어도 복구 불가
+    payload = {"accuracy_score": 40, "total_score": 83, "overall_feedback": "좋음"}
+    engine, completions = _engine(lambda kwargs: json.dumps(payload))
+
+    success, result, error = _evaluate(engine)
+
+    assert not success and result == {}
+    assert error == "Invalid grading result format"
+    assert _response_types(completions) == ["json_object", "json_schema", "json_schema"]
+
+
+def test_unrecoverable_result_recovers_on_schema_retry():
+    def responder(kwargs):
+        if kwargs["response_format"]["type"] == "json_object":
+            return "채점 결과: 83점"
+        return json.dumps(VALID_RESULT)
+
+    engine, completions = _engine(responder)
+
+    success, result, error = _evaluate(engine)
+
+    assert success and error is None
+    assert result["total_score"] == 83 and "repaired" not in result
+    assert _response_types(completions) == ["json_object", "json_schema"]
+
+
+def test_response_format_rejection_falls_back_to_json_object():
+    def responder(kwargs):
+        if kwargs["response_format"]["type"] == "json_schema":
+            return _bad_request("Invalid schema for response_format", param="response_format")
+        if len(completions.calls) == 1:
+            return "not json"
+        return json.dumps(VALID_RESULT)
+
+    engine, completions = _engine(responder)
+
+    success, result, error = _evaluate(engine)
+
+    assert success and error is None and result["total_score"] == 83
+    assert _response_types(completions) == ["json_object", "json_schema", "json_object"]
+    assert MODEL in AsyncGradingEngine._structured_output_unsupported
+
+    # 기록된 모델은 다음 평가부터 json_schema 를 요청하지 않음
+    state = {"calls": 0}
+
+    def second_responder(kwargs):
+        state["calls"] += 1
+        return "not json" if state["calls"] == 1 else json.dumps(VALID_RESULT)
+
+    engine.client.chat.completions.responder = second_responder
+    completions.calls.clear()
+    success, _, _ = asyncio.run(engine.evaluate_outputs(
+        "다른 프롬프트", ["요약"] * 3, "요약", None, "Task A", force=True
+    ))
+    assert success
+    assert _response_types(completions) == ["json_object", "json_object"]
+    AsyncGradingEngine._structured_output_unsupported.discard(MODEL)
+
+
+def test_other_bad_request_does_not_record_model():
+    def responder(kwargs):
+        if kwargs["response_format"]["type"] == "json_schema":
+            return _bad_request(
+                "This model's maximum context length is 128000 tokens",
+                param="messages",
+                code="context_length_exceeded"
+            )
+        return "not json"
+
+    engine, completions = _engine(responder)
+
+    success, result, error = _evaluate(engine)
+
+    assert not success and result == {}
+    assert error.startswith("Grading failed:")
+    assert _response_types(completions) == ["json_object", "json_schema"]
+    assert MODEL not in AsyncGradingEngine._structured_output_unsupported
+
+
+if __name__ == "__main__":
+    for test in (
+        test_recoverable_result_is_repaired_without_retry,
+        test_unrecoverable_result_retries_with_schema_then_fails,
+        test_unrecoverable_result_recovers_on_schema_retry,
+        test_response_format_rejection_falls_back_to_json_object,
+        test_other_bad_request_does_not_record_model,
+    ):
+        test()
+        print(f"✅ {test.__name__}")
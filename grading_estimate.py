@@ -0,0 +1,257 @@
+"""
+과제 일괄 채점 비용/소요 시간 예측
+grade_all 실행 전에 미채점 제출물의 예상 토큰, 비용(USD), 소요 시간을 계산
+
+- 토큰: 제출물별 실제 실행 프롬프트와 예상 마스터 평가 프롬프트를 토큰화
+- 응답 토큰/지연 시간: 이전 채점 결과의 token_usage 기록 (없으면 기본값)
+- 소요 시간: 동시 처리 수와 RPM/TPM 한도 중 더 느린 쪽 기준
+"""
+
+import json
+import math
+import sqlite3
+from typing import Dict, List, Optional, Tuple
+
+from db import connect
+from grading_engine import GradingPrompts, JUDGE_SYSTEM_PROMPT
+from prescreen import prescreen_submission
+from rate_limiter import get_scheduler
+from token_budget import count_chat_tokens, count_tokens, execution_token_cap, is_exact
+
+
+# 모델별 가격 (USD / 100만 토큰: 입력, 출력)
+MODEL_PRICES: Dict[str, Tuple[float, float]] = {
+    "gpt-3.5-turbo": (0.50, 1.50),
+    "gpt-4o-mini": (0.15, 0.60),
+    "gpt-4o": (2.50, 10.00),
+    "gpt-4.1-mini": (0.40, 1.60),
+    "gpt-4.1": (2.00, 8.00),
+}
+# Batch API 할인율
+BATCH_PRICE_RATIO = 0.5
+
+# 이전 기록이 없을 때 사용하는 기본값
+DEFAULT_JUDGE_COMPLETION_TOKENS = 600
+DEFAULT_OUTPUT_TOKENS_PER_SECOND = 50.0
+DEFAULT_REQUEST_OVERHEAD_SECONDS = 1.0
+
+# 이전 기록 조회 범위 (최근 채점 결과 수)
+HISTORY_LIMIT = 200
+
+
+def model_price(model: str) -> Optional[Tuple[float, float]]:
+    """모델 가격 (접두사 일치, 모르는 모델은 None)"""
+    for name in sorted(MODEL_PRICES, key=len, reverse=True):
+        if model.startswith(name):
+            return MODEL_PRICES[name]
+    return None
+
+
+def _load_history(conn: sqlite3.Connection, task_id: int) -> List[Dict]:
+    """최근 채점 결과의 호출별 토큰 사용량 (과제 기록이 없으면 전체 과제 기록)"""
+    for where, params in (("AND task_id = ?", (task_id,)), ("", ())):
+        rows = conn.execute(f"""
+            SELECT grading_result FROM submissions
+            WHERE grading_result IS NOT NULL {where}
+            ORDER BY graded_at DESC
+            LIMIT {HISTORY_LIMIT}
+        """, params).fetchall()
+
+        calls = []
+        for row in rows:
+            try:
+                usage = json.loads(row[0]).get('token_usage') or {}
+            except (ValueError, AttributeError):
+                continue
+            calls.extend(usage.get('by_call') or [])
+        if calls:
+            return calls
+    return []
+
+
+def _summarize_history(calls: List[Dict]) -> Dict:
+    """기록 → 실행 1회당/평가 1회당 평균 응답 토큰, 호출당 평균 지연 시간(초)"""
+    summary = {}
+    for purpose in ("execution", "judge"):
+        matched = [call for call in calls if call.get('purpose') == purpose]
+        completions = [
+            call['completion_tokens'] / (call.get('n') or 1)
+            for call in matched if call.get('completion_tokens') is not None
+        ]
+        latencies = [call['latency_ms'] / 1000 for call in matched if call.get('latency_ms') is not None]
+        summary[purpose] = {
+            'samples': len(matched),
+            'completion_tokens': sum(completions) / len(completions) if completions else None,
+            'latency_seconds': sum(latencies) / len(latencies) if latencies else None,
+        }
+    return summary
+
+
+def _default_latency(completion_tokens: float) -> float:
+    return DEFAULT_REQUEST_OVERHEAD_SECONDS + completion_tokens / DEFAULT_OUTPUT_TOKENS_PER_SECOND
+
+
+def _execution_calls(runs: int, use_n: bool, adaptive: bool) -> int:
+    """실행 runs 회에 필요한 요청 수 (adaptive 는 1·2회를 먼저 요청하고 3회차를 따로 요청)"""
+    if not use_n:
+        return runs
+    return 2 if adaptive and runs == 3 else 1
+
+
+def estimate_task(
+    db_path: str,
+    prompts: GradingPrompts,
+    task_id: int,
+    concurrency: int
+) -> Optional[Dict]:
+    """
+    과제의 미채점 제출물 일괄 채점 예측 (블로킹, run_blocking 으로 호출)
+    캐시 적중은 고려하지 않으므로 최대치 기준
+    adaptive 모드는 3회차 생략 여부를 미리 알 수 없으므로 실행 2~3회 범위(range)를 함께 반환
+    프롬프트 구성만 필요하므로 API 클라이언트(OPENAI_API_KEY) 없이 계산
+
+    Returns:
+        예측 결과 dict (과제가 없으면 None)
+    """
+    conn = connect(db_path)
+    task = conn.execute("SELECT * FROM tasks WHERE id = ?", (task_id,)).fetchone()
+    if not task:
+        conn.close()
+        return None
+    task = dict(task)
+    submissions = conn.execute("""
+        SELECT id, prompt_text FROM submissions
+        WHERE task_id = ? AND grading_result IS NULL
+        ORDER BY id
+    """, (task_id,)).fetchall()
+    history = _summarize_history(_load_history(conn, task_id))
+    conn.close()
+
+    model = prompts.model
+    golden_output = task.get('golden_output') or ""
+    mode = task.get('execution_mode') or prompts.execution_mode
+    use_n = prompts._use_multi_sample(mode)
+    # adaptive: 1·2회 결과가 비슷하면 3회차를 생략하므로 실행 2~3회 범위로 예측
+    adaptive = mode == 'adaptive'
+    run_counts = (2, 3) if adaptive else (3,)
+
+    # 응답 토큰: 기록 평균, 없으면 실행 결과는 정답 산출물 길이로 가정 (과제 응답 토큰 상한 이하)
+    max_tokens = execution_token_cap(golden_output, model)
+    execution_completion = history['execution']['completion_tokens'] or min(
+        count_tokens(golden_output, model) or max_tokens // 4, max_tokens
+    )
+    judge_completion = history['judge']['completion_tokens'] or DEFAULT_JUDGE_COMPLETION_TOKENS
+
+    # 사전 검사에 걸리는 제출물은 LLM 호출이 없으므로 제외
+    prescreened = 0
+    remaining = []
+    for submission in submissions:
+        if prescreen_submission(submission['prompt_text'], golden_output, task.get('description')):
+            prescreened += 1
+        else:
+            remaining.append(submission)
+    submissions = remaining
+
+    totals = {runs: {"prompt": 0, "completion": 0, "requests": 0} for runs in run_counts}
+    for submission in submissions:
+        execution_prompt = prompts._build_execution_prompt(
+            submission['prompt_text'], task.get('input_data'), max_tokens
+        )
+        execution_tokens = count_chat_tokens([{"role": "user", "content": execution_prompt}], model)
+
+        for runs, total in totals.items():
+            # 평가 프롬프트는 실행 결과 자리에 정답 산출물 길이의 결과가 들어간다고 가정
+            master_prompt = prompts._build_master_grading_prompt(
+                submission['prompt_text'],
+                [golden_output] * runs,
+                golden_output,
+                task.get('evaluation_notes'),
+                task.get('title') or "Task",
+                include_consistency=not prompts.local_consistency
+            )
+            judge_tokens = count_chat_tokens([
+                {"role": "system", "content": JUDGE_SYSTEM_PROMPT},
+                {"role": "user", "content": master_prompt},
+            ], model)
+
+            execution_calls = _execution_calls(runs, use_n, adaptive)
+            total["prompt"] += execution_tokens * execution_calls + judge_tokens
+            total["completion"] += round(execution_completion * runs + judge_completion)
+            total["requests"] += execution_calls + 1
+
+    # 제출물 1건 소요 시간: 실행(동시 요청) 1회 + 평가 1회 (adaptive 3회차는 실행 1회 추가)
+    execution_latency = history['execution']['latency_seconds'] or _default_latency(execution_completion)
+    judge_latency = history['judge']['latency_seconds'] or _default_latency(judge_completion)
+    per_submission = {
+        runs: execution_latency * (2 if adaptive and runs == 3 else 1) + judge_latency
+        for runs in run_counts
+    }
+
+    concurrency = max(1, concurrency)
+    rpm, tpm = get_scheduler().account_limits(model)
+    price = model_price(model)
+
+    def _bounds(runs: int) -> Dict:
+        total = totals[runs]
+        concurrency_bound = math.ceil(len(submissions) / concurrency) * per_submission[runs]
+        rpm_bound = total["requests"] / rpm * 60 if rpm else 0.0
+        tpm_bound = (total["prompt"] + total["completion"]) / tpm * 60 if tpm else 0.0
+        cost = None
+        if price:
+            cost = (total["prompt"] * price[0] + total["completion"] * price[1]) / 1_000_000
+        return {
+            **total,
+            "cost": cost,
+            "per_submission": per_submission[runs],
+            "wall_clock": max(concurrency_bound, rpm_bound, tpm_bound),
+            "bottleneck": max(
+                (("concurrency", concurrency_bound), ("rpm", rpm_bound), ("tpm", tpm_bound)),
+                key=lambda item: item[1]
+            )[0],
+        }
+
+    # 단일 값 필드는 최대치(실행 3회) 기준, range 는 [최소, 최대]
+    lowest = _bounds(min(run_counts))
+    estimate = _bounds(max(run_counts))
+    prompt_tokens = estimate["prompt"]
+    completion_tokens = estimate["completion"]
+    cost = estimate["cost"]
+
+    return {
+        "task_id": task_id,
+        "model": model,
+        "pending_submissions": len(submissions) + prescreened,
+        "prescreened_submissions": prescreened,
+        "execution_mode": "adaptive" if adaptive else ("multi_sample" if use_n else "parallel"),
+        "execution_runs": {"min": min(run_counts), "max": max(run_counts)},
+        "requests": estimate["requests"],
+        "tokens": {
+            "prompt": prompt_tokens,
+            "completion": completion_tokens,
+            "total": prompt_tokens + completion_tokens,
+            "exact": is_exact(),
+        },
+        "cost_usd": round(cost, 4) if cost is not None else None,
+        "batch_cost_usd": round(cost * BATCH_PRICE_RATIO, 4) if cost is not None else None,
+        "duration": {
+            "concurrency": concurrency,
+            "per_submission_seconds": round(estimate["per_submission"], 2),
+            "wall_clock_seconds": round(estimate["wall_clock"]),
+            "bottleneck": estimate["bottleneck"],
+        },
+        "range": {
+            "requests": [lowest["requests"], estimate["requests"]],
+            "tokens": [
+                lowest["prompt"] + lowest["completion"],
+                estimate["prompt"] + estimate["completion"],
+            ],
+            "cost_usd": [
+                round(lowest["cost"], 4), round(cost, 4)
+            ] if cost is not None else None,
+            "wall_clock_seconds": [round(lowest["wall_clock"]), round(estimate["wall_clock"])],
+        },
+        "history": {
+            "execution_samples": history['execution']['samples'],
+            "judge_samples": history['judge']['samples'],
+        },
+    }
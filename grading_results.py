@@ -0,0 +1,126 @@
+"""
+채점 결과 저장 (submissions 테이블)
+grading_result JSON 의 점수/상태를 인덱스가 있는 컬럼으로도 저장하여
+리더보드/통계가 JSON 을 파싱하지 않고 인덱스로 조회
+
+- total_score, accuracy_score, clarity_score, consistency_score, status, graded_at
+- JSON 과 컬럼은 같은 UPDATE 문으로 함께 기록
+- 이전 형식(overall_score) 결과는 total_score 로 옮김
+"""
+
+import json
+import sqlite3
+from datetime import datetime
+from typing import Dict, Optional
+
+# submissions.status 값 (static/index.html 의 상태 표시와 동일)
+STATUS_SUBMITTED = "submitted"
+STATUS_COMPLETED = "completed"
+STATUS_MANUAL_REVIEW = "manual_review"
+
+SCORE_COLUMNS = ("total_score", "accuracy_score", "clarity_score", "consistency_score")
+
+# 기존 DB 에 추가하는 컬럼 (컬럼명, 정의)
+RESULT_COLUMNS = (
+    ("total_score", "REAL"),
+    ("accuracy_score", "REAL"),
+    ("clarity_score", "REAL"),
+    ("consistency_score", "REAL"),
+    ("status", f"TEXT DEFAULT '{STATUS_SUBMITTED}'"),
+    ("graded_at", "TEXT"),
+)
+
+# 리더보드: 과제별/전체 점수 내림차순 (동점이면 먼저 채점된 순)
+RESULT_INDEXES = (
+    "CREATE INDEX IF NOT EXISTS idx_submissions_task_total_score "
+    "ON submissions (task_id, total_score DESC, graded_at)",
+    "CREATE INDEX IF NOT EXISTS idx_submissions_total_score "
+    "ON submissions (total_score DESC, graded_at)",
+)
+
+
+def _number(value) -> Optional[float]:
+    if value is None or isinstance(value, bool):
+        return None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def result_columns(grading_result: Dict) -> Dict:
+    """grading_result → 컬럼 값 (수동 검토 결과는 점수 없음)"""
+    if grading_result.get("status") == STATUS_MANUAL_REVIEW:
+        return {**{column: None for column in SCORE_COLUMNS}, "status": STATUS_MANUAL_REVIEW}
+
+    columns = {column: _number(grading_result.get(column)) for column in SCORE_COLUMNS}
+    if columns["total_score"] is None:
+        columns["total_score"] = _number(grading_result.get("overall_score"))
+    columns["status"] = STATUS_COMPLETED
+    return columns
+
+
+def write_grading_result(
+    conn: sqlite3.Connection,
+    submission_id: int,
+    grading_result: Dict,
+    graded_at: Optional[str] = None
+):
+    """채점 결과 JSON 과 점수 컬럼을 한 번에 저장 (커밋은 호출자)"""
+    columns = result_columns(grading_result)
+    conn.execute("""
+        UPDATE submissions
+        SET grading_result = ?, graded_at = ?,
+            total_score = ?, accuracy_score = ?, clarity_score = ?, consistency_score = ?,
+            status = ?
+        WHERE id = ?
+    """, (
+        json.dumps(grading_result, ensure_ascii=False),
+        graded_at or datetime.now().isoformat(),
+        columns["total_score"],
+        columns["accuracy_score"],
+        columns["clarity_score"],
+        columns["consistency_score"],
+        columns["status"],
+        submission_id
+    ))
+
+
+def backfill_result_columns(conn: sqlite3.Connection) -> int:
+    """
+    점수 컬럼이 비어 있는 기존 채점 결과를 JSON 에서 채움 (커밋은 호출자)
+
+    Returns:
+        갱신한 행 수
+    """
+    rows = conn.execute("""
+        SELECT id, grading_result FROM submissions
+        WHERE grading_result IS NOT NULL AND total_score IS NULL
+          AND (status IS NULL OR status != ?)
+    """, (STATUS_MANUAL_REVIEW,)).fetchall()
+
+    updates = []
+    for submission_id, result_json in rows:
+        try:
+            grading_result = json.loads(result_json)
+        except ValueError:
+            continue
+        if not isinstance(grading_result, dict):
+            continue
+        columns = result_columns(grading_result)
+        updates.append((
+            columns["total_score"],
+            columns["accuracy_score"],
+            columns["clarity_score"],
+            columns["consistency_score"],
+            columns["status"],
+            submission_id
+        ))
+
+    conn.executemany("""
+        UPDATE submissions
+        SET total_score = ?, accuracy_score = ?, clarity_score = ?, consistency_score = ?,
+            status = ?
+        WHERE id = ?
+    """, updates)
+    return len(updates)
@@ -0,0 +1,165 @@
+"""
+LLM 요청 헤징 (프로세스 전역)
+대량 채점 중 일부 호출이 수십 초씩 응답하지 않아 전체 작업 시간을 끌어올리므로
+모델의 p95 지연 시간이 지나도 응답이 없으면 같은 요청을 한 번 더 보내고 먼저 온 응답을 사용
+
+- 지연 시간은 모델·호출 종류(실행/평가)별 최근 기록으로 p95 계산
+- 헤지 요청 수는 전체 요청의 LLM_HEDGE_BUDGET_PERCENT % 이내로 제한
+- 기본 비활성화 (LLM_HEDGE_ENABLED=1 로 사용)
+"""
+
+import os
+import math
+import time
+import asyncio
+from collections import deque
+from typing import Awaitable, Callable, Deque, Dict, Optional, TypeVar
+
+T = TypeVar("T")
+
+# 지연 시간 기록 수 (모델·호출 종류별)
+LATENCY_WINDOW = 200
+# 이 수 이상 기록된 뒤부터 헤징
+HEDGE_MIN_SAMPLES = int(os.environ.get("LLM_HEDGE_MIN_SAMPLES", "20"))
+# p95 가 아무리 짧아도 이 시간(초)은 기다림
+HEDGE_MIN_DELAY_SECONDS = float(os.environ.get("LLM_HEDGE_MIN_DELAY_SECONDS", "1.0"))
+HEDGE_PERCENTILE = 0.95
+
+
+class LatencyTracker:
+    """키별 최근 지연 시간 분포"""
+
+    def __init__(self, window: int = LATENCY_WINDOW):
+        self.window = window
+        self._samples: Dict[str, Deque[float]] = {}
+
+    def record(self, key: str, seconds: float):
+        self._samples.setdefault(key, deque(maxlen=self.window)).append(seconds)
+
+    def count(self, key: str) -> int:
+        return len(self._samples.get(key) or ())
+
+    def percentile(self, key: str, q: float = HEDGE_PERCENTILE) -> Optional[float]:
+        """nearest-rank 백분위 (기록이 없으면 None)"""
+        samples = self._samples.get(key)
+        if not samples:
+            return None
+        ordered = sorted(samples)
+        return ordered[min(len(ordered) - 1, max(0, math.ceil(q * len(ordered)) - 1))]
+
+    def snapshot(self) -> Dict:
+        return {
+            key: {
+                "samples": len(samples),
+                "p50_ms": round(self.percentile(key, 0.5) * 1000),
+                "p95_ms": round(self.percentile(key) * 1000),
+            }
+            for key, samples in self._samples.items()
+        }
+
+
+class RequestHedger:
+    """p95 지연 후 중복 요청을 보내고 먼저 끝난 응답 사용"""
+
+    def __init__(
+        self,
+        enabled: bool = False,
+        budget_percent: float = 5.0,
+        min_samples: int = HEDGE_MIN_SAMPLES,
+        min_delay: float = HEDGE_MIN_DELAY_SECONDS
+    ):
+        self.enabled = enabled
+        self.budget_percent = budget_percent
+        self.min_samples = min_samples
+        self.min_delay = min_delay
+        self.latency = LatencyTracker()
+
+        # 지표
+        self.requests = 0
+        self.hedges_issued = 0
+        self.hedges_won = 0
+        self.budget_exhausted = 0
+
+    def hedge_delay(self, key: str) -> Optional[float]:
+        """헤지 요청까지 기다릴 시간 (기록이 부족하거나 비활성화면 None)"""
+        if not self.enabled or self.latency.count(key) < max(1, self.min_samples):
+            return None
+        return max(self.min_delay, self.latency.percentile(key))
+
+    def _within_budget(self) -> bool:
+        return self.hedges_issued < self.requests * self.budget_percent / 100
+
+    async def _timed(self, key: str, call: Callable[[], Awaitable[T]]) -> T:
+        """호출 1건 실행 (성공한 호출만 지연 시간 기록)"""
+        started = time.monotonic()
+        result = await call()
+        self.latency.record(key, time.monotonic() - started)
+        return result
+
+    async def run(
+        self,
+        key: str,
+        call: Callable[[], Awaitable[T]],
+        hedge_call: Optional[Callable[[], Awaitable[T]]] = None
+    ) -> T:
+        """
+        call 을 실행하고 hedge_delay 안에 끝나지 않으면 hedge_call(기본: call)을 추가로 실행
+        먼저 성공한 결과를 반환하고 나머지는 취소, 둘 다 실패하면 먼저 실패한 예외를 전달
+        """
+        self.requests += 1
+        delay = self.hedge_delay(key)
+        primary = asyncio.ensure_future(self._timed(key, call))
+        if delay is None:
+            return await primary
+
+        pending = {primary}
+        try:
+            done, pending = await asyncio.wait(pending, timeout=delay)
+            if done:
+                return primary.result()
+            if not self._within_budget():
+                self.budget_exhausted += 1
+                return await primary
+
+            self.hedges_issued += 1
+            hedge = asyncio.ensure_future(self._timed(key, hedge_call or call))
+            pending = {primary, hedge}
+            error: Optional[BaseException] = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is hedge:
+                            self.hedges_won += 1
+                        return task.result()
+                    error = error or task.exception()
+            raise error
+        finally:
+            # 늦게 끝난 요청(또는 호출자 취소 시 남은 요청) 취소
+            for task in pending:
+                task.cancel()
+
+    def stats(self) -> Dict:
+        return {
+            "enabled": self.enabled,
+            "budget_percent": self.budget_percent,
+            "requests": self.requests,
+            "hedges_issued": self.hedges_issued,
+            "hedges_won": self.hedges_won,
+            "budget_exhausted": self.budget_exhausted,
+            "latency": self.latency.snapshot(),
+        }
+
+
+_hedger: Optional[RequestHedger] = None
+
+
+def get_hedger() -> RequestHedger:
+    """프로세스 전역 헤징 설정/지표"""
+    global _hedger
+    if _hedger is None:
+        _hedger = RequestHedger(
+            enabled=os.environ.get("LLM_HEDGE_ENABLED", "0") == "1",
+            budget_percent=float(os.environ.get("LLM_HEDGE_BUDGET_PERCENT", "5"))
+        )
+    return _hedger
@@ -0,0 +1,476 @@
+"""
+채점 작업 큐 (SQLite 영속 저장)
+서버 재시작/재배포 후에도 대기 중인 채점 작업을 이어서 처리
+
+작업 상태: queued → leased → running → done / failed
+- leased/running 상태의 작업은 lease_until 이 지나면 다시 가져갈 수 있음
+- 실패 시 attempts < max_attempts 이면 queued 로 되돌림
+- 상태 전이(running/heartbeat/done/실패)는 lease 를 가진 워커만 가능
+  lease 가 만료되어 다른 워커가 가져간 작업은 이전 워커가 결과를 저장하지 않음
+- 채점 결과 저장과 done 전환은 같은 트랜잭션 (finish)
+  저장 후 완료 전에 중단되어 같은 제출물을 다시 채점하는 일이 없음
+"""
+
+import json
+import time
+import sqlite3
+import asyncio
+from datetime import datetime
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from async_utils import run_blocking
+from db import connect
+
+
+JOB_STATES = ('queued', 'leased', 'running', 'done', 'failed')
+ACTIVE_STATES = ('queued', 'leased', 'running')
+LEASED_STATES = ('leased', 'running')
+
+
+class LeaseLost(Exception):
+    """lease 가 만료되어 다른 워커가 작업을 가져감 (결과를 저장하지 않고 중단)"""
+
+
+class GradingJobStore:
+    """grading_jobs 테이블 기반 채점 작업 저장소"""
+
+    def __init__(
+        self,
+        db_path: str,
+        lease_seconds: float = 300.0,
+        max_attempts: int = 3
+    ):
+        self.db_path = db_path
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+
+    def _connect(self) -> sqlite3.Connection:
+        # isolation_level=None: BEGIN/COMMIT 을 직접 제어
+        return connect(self.db_path, isolation_level=None)
+
+    @staticmethod
+    def create_schema(conn: sqlite3.Connection):
+        """grading_jobs / grading_workers 테이블과 인덱스 (migrations.py 에서 실행)"""
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS grading_jobs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                submission_id INTEGER NOT NULL,
+                state TEXT NOT NULL DEFAULT 'queued',
+                attempts INTEGER NOT NULL DEFAULT 0,
+                max_attempts INTEGER NOT NULL DEFAULT 3,
+                payload TEXT,
+                worker_id TEXT,
+                lease_until REAL,
+                current_step TEXT,
+                progress INTEGER DEFAULT 0,
+                last_error TEXT,
+                created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+                started_at REAL,
+                updated_at REAL,
+                finished_at REAL
+            )
+        """)
+        conn.execute("""
+            CREATE INDEX IF NOT EXISTS idx_grading_jobs_state
+            ON grading_jobs (state, lease_until)
+        """)
+        conn.execute("""
+            CREATE INDEX IF NOT EXISTS idx_grading_jobs_submission
+            ON grading_jobs (submission_id, id)
+        """)
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS grading_workers (
+                worker_id TEXT PRIMARY KEY,
+                status TEXT,
+                updated_at REAL
+            )
+        """)
+
+    # ------------------------------------------------------------------
+    # 등록
+    # ------------------------------------------------------------------
+
+    def enqueue(self, submission_id: int, payload: Optional[Dict] = None) -> Optional[int]:
+        """
+        채점 작업 등록
+
+        Returns:
+            새 작업 ID (이미 진행 중인 작업이 있거나 과제가 배치 채점 중이면 None)
+        """
+        ids = self.enqueue_many([submission_id], payload)
+        return ids[0] if ids else None
+
+    def enqueue_many(
+        self,
+        submission_ids: List[int],
+        payload: Optional[Dict] = None
+    ) -> List[int]:
+        """
+        여러 제출물의 채점 작업을 한 트랜잭션으로 등록
+        진행 중인 작업이 있거나 과제가 배치 채점 중(batch_runs)인 제출물은 건너뜀
+        """
+        now = time.time()
+        payload_json = json.dumps(payload, ensure_ascii=False) if payload else None
+
+        conn = self._connect()
+        job_ids = []
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            for submission_id in submission_ids:
+                active = conn.execute(
+                    f"""
+                    SELECT id FROM grading_jobs
+                    WHERE submission_id = ? AND state IN ({','.join('?' * len(ACTIVE_STATES))})
+                    """,
+                    (submission_id, *ACTIVE_STATES)
+                ).fetchone()
+                if active:
+                    continue
+                batch_running = conn.execute("""
+                    SELECT b.id FROM submissions s
+                    JOIN batch_runs b ON b.task_id = s.task_id
+                    WHERE s.id = ? AND b.status = 'running'
+                """, (submission_id,)).fetchone()
+                if batch_running:
+                    continue
+
+                cur = conn.execute("""
+                    INSERT INTO grading_jobs
+                        (submission_id, state, max_attempts, payload, current_step,
+                         progress, created_at, updated_at)
+                    VALUES (?, 'queued', ?, ?, '채점 대기 중...', 0, ?, ?)
+                """, (
+                    submission_id, self.max_attempts, payload_json,
+                    datetime.now().isoformat(), now
+                ))
+                job_ids.append(cur.lastrowid)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+        return job_ids
+
+    # ------------------------------------------------------------------
+    # 작업 가져오기 / 상태 전이
+    # ------------------------------------------------------------------
+
+    def claim(self, worker_id: str) -> Optional[Dict]:
+        """
+        대기 중이거나 lease 가 만료된 작업 1건을 가져옴 (leased 상태로 전환)
+
+        Returns:
+            작업 dict 또는 None
+        """
+        now = time.time()
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+
+            # 시도 횟수를 모두 소진한 채 lease 가 만료된 작업은 실패 처리
+            conn.execute("""
+                UPDATE grading_jobs
+                SET state = 'failed',
+                    last_error = COALESCE(last_error, 'Lease expired'),
+                    updated_at = ?, finished_at = ?
+                WHERE state IN ('leased', 'running')
+                  AND lease_until < ?
+                  AND attempts >= max_attempts
+            """, (now, now, now))
+
+            row = conn.execute("""
+                SELECT * FROM grading_jobs
+                WHERE state = 'queued'
+                   OR (state IN ('leased', 'running') AND lease_until < ?)
+                ORDER BY id
+                LIMIT 1
+            """, (now,)).fetchone()
+
+            if not row:
+                conn.execute("COMMIT")
+                return None
+
+            conn.execute("""
+                UPDATE grading_jobs
+                SET state = 'leased', worker_id = ?, lease_until = ?,
+                    attempts = attempts + 1, updated_at = ?
+                WHERE id = ?
+            """, (worker_id, now + self.lease_seconds, now, row['id']))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+        job = dict(row)
+        job['state'] = 'leased'
+        job['worker_id'] = worker_id
+        job['attempts'] += 1
+        job['payload'] = json.loads(job['payload']) if job['payload'] else {}
+        return job
+
+    def mark_running(self, job_id: int, worker_id: str) -> bool:
+        """작업 실행 시작 (lease 를 잃었으면 False)"""
+        now = time.time()
+        return self._execute("""
+            UPDATE grading_jobs
+            SET state = 'running', started_at = COALESCE(started_at, ?),
+                lease_until = ?, updated_at = ?
+            WHERE id = ? AND worker_id = ? AND state IN ('leased', 'running')
+        """, (now, now + self.lease_seconds, now, job_id, worker_id)) > 0
+
+    def heartbeat(self, job_id: int, worker_id: str) -> bool:
+        """lease 연장 (lease 를 잃었으면 False)"""
+        conn = self._connect()
+        try:
+            return self.renew_lease(conn, job_id, worker_id, self.lease_seconds)
+        finally:
+            conn.close()
+
+    @staticmethod
+    def renew_lease(conn: sqlite3.Connection, job_id: int, worker_id: str, lease_seconds: float) -> bool:
+        """lease 연장 (주어진 연결에서 실행, lease 를 잃었으면 False)"""
+        now = time.time()
+        return conn.execute("""
+            UPDATE grading_jobs SET lease_until = ?, updated_at = ?
+            WHERE id = ? AND worker_id = ? AND state IN ('leased', 'running')
+        """, (now + lease_seconds, now, job_id, worker_id)).rowcount > 0
+
+    def update_progress(self, job_id: int, current_step: str, progress: int):
+        """진행 상황 갱신"""
+        conn = self._connect()
+        try:
+            self.write_progress(conn, job_id, current_step, progress)
+        finally:
+            conn.close()
+
+    @staticmethod
+    def write_progress(conn: sqlite3.Connection, job_id: int, current_step: str, progress: int):
+        """진행 상황 갱신 (주어진 연결에서 실행, DatabaseWriter 쓰기 작업용)"""
+        conn.execute("""
+            UPDATE grading_jobs SET current_step = ?, progress = ?, updated_at = ?
+            WHERE id = ?
+        """, (current_step, progress, time.time(), job_id))
+
+    def complete(self, job_id: int, worker_id: str) -> bool:
+        """작업 완료 (lease 를 잃었으면 False)"""
+        conn = self._connect()
+        try:
+            return self.write_complete(conn, job_id, worker_id)
+        finally:
+            conn.close()
+
+    @staticmethod
+    def write_complete(conn: sqlite3.Connection, job_id: int, worker_id: str) -> bool:
+        """작업 완료 (주어진 연결에서 실행, lease 를 잃었으면 False)"""
+        now = time.time()
+        return conn.execute("""
+            UPDATE grading_jobs
+            SET state = 'done', current_step = '채점 완료!', progress = 100,
+                lease_until = NULL, updated_at = ?, finished_at = ?
+            WHERE id = ? AND worker_id = ? AND state IN ('leased', 'running')
+        """, (now, now, job_id, worker_id)).rowcount > 0
+
+    @staticmethod
+    def finish(conn: sqlite3.Connection, job_id: int, worker_id: str):
+        """
+        결과 저장 트랜잭션 안에서 lease 확인 및 완료 처리 (DatabaseWriter 쓰기 작업용)
+        lease 를 잃었으면 LeaseLost (같은 트랜잭션의 결과 저장도 롤백)
+        """
+        if not GradingJobStore.write_complete(conn, job_id, worker_id):
+            raise LeaseLost(f"Grading job {job_id} lease lost by {worker_id}")
+
+    def fail(self, job_id: int, worker_id: str, error: str) -> Optional[str]:
+        """
+        작업 실패 처리
+
+        Returns:
+            전환된 상태 ('queued': 재시도 예정, 'failed': 최종 실패)
+            lease 를 잃었으면 None (다른 워커가 처리 중이므로 상태를 바꾸지 않음)
+        """
+        now = time.time()
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute(
+                """
+                SELECT attempts, max_attempts FROM grading_jobs
+                WHERE id = ? AND worker_id = ? AND state IN ('leased', 'running')
+                """,
+                (job_id, worker_id)
+            ).fetchone()
+            if not row:
+                conn.execute("COMMIT")
+                return None
+
+            if row['attempts'] < row['max_attempts']:
+                state = 'queued'
+                conn.execute("""
+                    UPDATE grading_jobs
+                    SET state = 'queued', worker_id = NULL, lease_until = NULL,
+                        current_step = '재시도 대기 중...', progress = 0,
+                        last_error = ?, updated_at = ?
+                    WHERE id = ?
+                """, (error, now, job_id))
+            else:
+                state = 'failed'
+                conn.execute("""
+                    UPDATE grading_jobs
+                    SET state = 'failed', lease_until = NULL,
+                        current_step = ?, progress = 0,
+                        last_error = ?, updated_at = ?, finished_at = ?
+                    WHERE id = ?
+                """, (f'채점 오류: {error}', error, now, now, job_id))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+        return state
+
+    # ------------------------------------------------------------------
+    # 조회
+    # ------------------------------------------------------------------
+
+    def get_latest_for_submission(self, submission_id: int) -> Optional[Dict]:
+        """제출물의 가장 최근 작업"""
+        conn = self._connect()
+        row = conn.execute("""
+            SELECT * FROM grading_jobs
+            WHERE submission_id = ?
+            ORDER BY id DESC LIMIT 1
+        """, (submission_id,)).fetchone()
+        conn.close()
+        return dict(row) if row else None
+
+    def list_active(self) -> List[Dict]:
+        """대기/진행 중인 작업 목록"""
+        conn = self._connect()
+        rows = conn.execute(f"""
+            SELECT * FROM grading_jobs
+            WHERE state IN ({','.join('?' * len(ACTIVE_STATES))})
+            ORDER BY id
+        """, ACTIVE_STATES).fetchall()
+        conn.close()
+        return [dict(row) for row in rows]
+
+    def count_by_state(self) -> Dict[str, int]:
+        """상태별 작업 수"""
+        conn = self._connect()
+        rows = conn.execute(
+            "SELECT state, COUNT(*) AS count FROM grading_jobs GROUP BY state"
+        ).fetchall()
+        conn.close()
+        counts = {state: 0 for state in JOB_STATES}
+        counts.update({row['state']: row['count'] for row in rows})
+        return counts
+
+    # ------------------------------------------------------------------
+    # 워커 상태 (다른 프로세스에서 조회할 수 있도록 DB에 게시)
+    # ------------------------------------------------------------------
+
+    def publish_worker_status(self, worker_id: str, status: Dict):
+        """워커 상태 게시 (속도 제한 예산 등)"""
+        self._execute("""
+            INSERT INTO grading_workers (worker_id, status, updated_at)
+            VALUES (?, ?, ?)
+            ON CONFLICT(worker_id) DO UPDATE SET
+                status = excluded.status, updated_at = excluded.updated_at
+        """, (worker_id, json.dumps(status, ensure_ascii=False), time.time()))
+
+    def list_worker_status(self, max_age_seconds: float = 60.0) -> Dict[str, Dict]:
+        """최근 max_age_seconds 안에 상태를 게시한 워커 목록"""
+        conn = self._connect()
+        rows = conn.execute("""
+            SELECT worker_id, status, updated_at FROM grading_workers
+            WHERE updated_at >= ?
+            ORDER BY worker_id
+        """, (time.time() - max_age_seconds,)).fetchall()
+        conn.close()
+        return {
+            row['worker_id']: {'updated_at': row['updated_at'], **json.loads(row['status'])}
+            for row in rows
+        }
+
+    def _execute(self, sql: str, params: tuple) -> int:
+        """쓰기 1건 실행 (변경된 행 수 반환)"""
+        conn = self._connect()
+        try:
+            return conn.execute(sql, params).rowcount
+        finally:
+            conn.close()
+
+
+# ============================================================================
+# 워커 루프
+# ============================================================================
+
+async def run_worker_loop(
+    store: GradingJobStore,
+    handle_job: Callable[[Dict], Awaitable[Optional[bool]]],
+    worker_id: str,
+    concurrency: int = 4,
+    poll_interval: float = 1.0,
+    stop_event: Optional[asyncio.Event] = None
+):
+    """
+    작업 큐에서 채점 작업을 가져와 처리하는 워커 루프
+
+    Args:
+        store: 작업 저장소
+        handle_job: 작업 처리 코루틴 (실패 시 예외 발생)
+            결과 저장 트랜잭션에서 완료 처리(finish)했으면 True 반환
+        worker_id: 워커 식별자 (lease 소유자)
+        concurrency: 동시 처리 작업 수
+        poll_interval: 대기 작업이 없을 때 폴링 간격 (초)
+        stop_event: 설정되면 진행 중인 작업을 마치고 종료
+    """
+    stop_event = stop_event or asyncio.Event()
+
+    # SQLite 호출은 이벤트 루프를 막지 않도록 스레드 풀에서 실행
+    async def heartbeat(job_id: int):
+        while True:
+            await asyncio.sleep(store.lease_seconds / 3)
+            if not await run_blocking(store.heartbeat, job_id, worker_id):
+                # 결과 저장 시 LeaseLost 로 중단됨
+                print(f"⚠️  Grading job {job_id} lease lost, another worker took over")
+                return
+
+    async def slot():
+        while not stop_event.is_set():
+            job = await run_blocking(store.claim, worker_id)
+            if not job:
+                try:
+                    await asyncio.wait_for(stop_event.wait(), timeout=poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            if not await run_blocking(store.mark_running, job['id'], worker_id):
+                continue
+            beat = asyncio.create_task(heartbeat(job['id']))
+            try:
+                finished = await handle_job(job)
+                if not finished and not await run_blocking(store.complete, job['id'], worker_id):
+                    print(f"⚠️  Grading job {job['id']} lease lost before completion")
+            except asyncio.CancelledError:
+                # 종료 시 lease 만료 후 다른 워커가 이어서 처리
+                raise
+            except LeaseLost as e:
+                print(f"⚠️  {e}, result discarded")
+            except Exception as e:
+                state = await run_blocking(store.fail, job['id'], worker_id, str(e))
+                if state is None:
+                    print(f"⚠️  Grading job {job['id']} lease lost, failure not recorded: {e}")
+                else:
+                    print(f"❌ Grading job {job['id']} (submission {job['submission_id']}) "
+                          f"failed [{state}]: {e}")
+            finally:
+                beat.cancel()
+
+    await asyncio.gather(*[slot() for _ in range(concurrency)])
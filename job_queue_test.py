@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""
+채점 작업 큐 lease/소유자 상태 전이 테스트
+- lease 를 가진 워커만 running/heartbeat/done/실패로 전환
+- lease 가 만료되어 다른 워커가 가져간 작업은 이전 워커가 전환하거나 결과를 저장하지 못함
+- 결과 저장과 done 전환은 같은 트랜잭션 (finish)
+- 워커 루프는 handle_job 이 완료 처리한 작업을 다시 완료 처리하지 않음
+
+실행: python job_queue_test.py  (또는 pytest job_queue_test.py)
+"""
+
+import os
+import sqlite3
+import asyncio
+import tempfile
+from contextlib import contextmanager
+
+from db import connect
+from job_queue import GradingJobStore, LeaseLost, run_worker_loop
+from migrations import run_migrations
+
+
+@contextmanager
+def _store(max_attempts: int = 3):
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "jobs.db")
+        run_migrations(db_path)
+        conn = sqlite3.connect(db_path)
+        conn.execute("INSERT INTO tasks (id, title, input_data, golden_output) VALUES (1, 'T', 'i', 'g')")
+        conn.execute("INSERT INTO practitioners (id, name) VALUES (1, '김민준')")
+        conn.execute("INSERT INTO submissions (id, practitioner_id, task_id, prompt_text) VALUES (1, 1, 1, 'p')")
+        conn.commit()
+        conn.close()
+        yield GradingJobStore(db_path, lease_seconds=60, max_attempts=max_attempts)
+
+
+def _job(store: GradingJobStore, job_id: int) -> dict:
+    conn = sqlite3.connect(store.db_path)
+    conn.row_factory = sqlite3.Row
+    try:
+        return dict(conn.execute("SELECT * FROM grading_jobs WHERE id = ?", (job_id,)).fetchone())
+    finally:
+        conn.close()
+
+
+def _expire_lease(store: GradingJobStore, job_id: int):
+    conn = sqlite3.connect(store.db_path)
+    conn.execute("UPDATE grading_jobs SET lease_until = 0 WHERE id = ?", (job_id,))
+    conn.commit()
+    conn.close()
+
+
+def _finish_with_result(store: GradingJobStore, job_id: int, worker_id: str):
+    """워커의 결과 저장 트랜잭션 (finish + 결과 저장)"""
+    conn = connect(store.db_path)
+    try:
+        store.finish(conn, job_id, worker_id)
+        conn.execute("UPDATE submissions SET grading_result = ? WHERE id = 1", (f'{{"by": "{worker_id}"}}',))
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+
+def _grading_result(store: GradingJobStore):
+    conn = sqlite3.connect(store.db_path)
+    try:
+        return conn.execute("SELECT grading_result FROM submissions WHERE id = 1").fetchone()[0]
+    finally:
+        conn.close()
+
+
+def test_only_lease_owner_transitions_job():
+    with _store() as store:
+        job_id = store.enqueue(1)
+        assert store.enqueue(1) is None
+
+        job = store.claim("worker-a")
+        assert job["id"] == job_id and job["worker_id"] == "worker-a"
+        assert store.claim("worker-b") is None
+
+        assert not store.mark_running(job_id, "worker-b")
+        assert store.mark_running(job_id, "worker-a")
+        assert not store.heartbeat(job_id, "worker-b")
+        assert store.heartbeat(job_id, "worker-a")
+        assert store.fail(job_id, "worker-b", "boom") is None
+        assert not store.complete(job_id, "worker-b")
+        assert _job(store, job_id)["state"] == "running"
+
+        assert store.complete(job_id, "worker-a")
+        assert _job(store, job_id)["state"] == "done"
+        assert not store.complete(job_id, "worker-a")
+
+
+def test_expired_lease_moves_job_to_new_owner():
+    with _store() as store:
+        job_id = store.enqueue(1)
+        store.claim("worker-a")
+        store.mark_running(job_id, "worker-a")
+
+        _expire_lease(store, job_id)
+        job = store.claim("worker-b")
+        assert job["id"] == job_id and job["attempts"] == 2
+
+        # 이전 소유자는 더 이상 상태를 바꾸거나 결과를 저장하지 못함
+        assert not store.mark_running(job_id, "worker-a")
+        assert not store.heartbeat(job_id, "worker-a")
+        assert not store.complete(job_id, "worker-a")
+        assert store.fail(job_id, "worker-a", "late failure") is None
+        try:
+            _finish_with_result(store, job_id, "worker-a")
+        except LeaseLost:
+            pass
+        else:
+            raise AssertionError("lease 를 잃은 워커가 결과를 저장함")
+        assert _grading_result(store) is None
+
+        _finish_with_result(store, job_id, "worker-b")
+        job = _job(store, job_id)
+        assert job["state"] == "done" and job["worker_id"] == "worker-b"
+        assert _grading_result(store) == '{"by": "worker-b"}'
+
+
+def test_fail_requeues_until_max_attempts():
+    with _store(max_attempts=2) as store:
+        job_id = store.enqueue(1)
+        store.claim("worker-a")
+        assert store.fail(job_id, "worker-a", "first") == "queued"
+        job = _job(store, job_id)
+        assert job["worker_id"] is None and job["last_error"] == "first"
+
+        store.claim("worker-b")
+        assert store.fail(job_id, "worker-b", "second") == "failed"
+        assert _job(store, job_id)["state"] == "failed"
+        assert store.claim("worker-a") is None
+
+
+def test_expired_lease_without_attempts_left_fails():
+    with _store(max_attempts=1) as store:
+        job_id = store.enqueue(1)
+        store.claim("worker-a")
+        _expire_lease(store, job_id)
+        assert store.claim("worker-b") is None
+        job = _job(store, job_id)
+        assert job["state"] == "failed" and job["last_error"] == "Lease expired"
+
+
+def test_worker_loop_does_not_complete_finished_job_twice():
+    with _store() as store:
+        finished_id = store.enqueue(1)
+        handled = []
+        completed = []
+        store.complete = lambda job_id, worker_id: completed.append(job_id)
+
+        async def run():
+            stop = asyncio.Event()
+
+            async def handle_job(job):
+                handled.append(job["id"])
+                await asyncio.get_running_loop().run_in_executor(
+                    None, _finish_with_result, store, job["id"], job["worker_id"]
+                )
+                stop.set()
+                return True
+
+            await asyncio.wait_for(
+                run_worker_loop(store, handle_job, "worker-a", concurrency=1, poll_interval=0.01, stop_event=stop),
+                timeout=5
+            )
+
+        asyncio.run(run())
+        assert handled == [finished_id]
+        assert completed == []
+        job = _job(store, finished_id)
+        assert job["state"] == "done" and job["attempts"] == 1
+
+
+if __name__ == "__main__":
+    for test in (
+        test_only_lease_owner_transitions_job,
+        test_expired_lease_moves_job_to_new_owner,
+        test_fail_requeues_until_max_attempts,
+        test_expired_lease_without_attempts_left_fails,
+        test_worker_loop_does_not_complete_finished_job_twice,
+    ):
+        test()
+        print(f"✅ {test.__name__}")
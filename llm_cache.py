@@ -0,0 +1,206 @@
+"""
+LLM 호출 결과 캐시 (SQLite, 내용 주소 기반)
+- ExecutionCache: (모델, temperature, 프롬프트, 입력 데이터, 실행 번호) → 실행 결과
+- JudgeCache: (모델, temperature=0, 완성된 마스터 평가 프롬프트) → 평가 결과 JSON
+동일한 입력은 다시 호출하지 않고 저장된 결과를 재사용
+
+- 키: 입력값 전체의 SHA-256 해시
+- 용량 제한: 전체 크기가 max_bytes 를 넘으면 가장 오래 사용하지 않은 항목부터 삭제 (LRU)
+  전체 크기/항목 수는 cache_usage 테이블에 캐시별 합계로 유지 (저장/통계 조회마다 테이블 전체를 합산하지 않음)
+"""
+
+import os
+import json
+import time
+import hashlib
+import sqlite3
+import threading
+from typing import Dict, Optional
+
+from db import connect
+
+
+EXECUTION_CACHE_MAX_MB = float(os.environ.get("EXECUTION_CACHE_MAX_MB", "256"))
+JUDGE_CACHE_MAX_MB = float(os.environ.get("JUDGE_CACHE_MAX_MB", "64"))
+
+
+def make_cache_key(*parts) -> str:
+    """입력값 목록 → SHA-256 키"""
+    payload = json.dumps(parts, ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class LRUResultCache:
+    """SQLite 테이블 하나를 사용하는 크기 제한 LRU 캐시 (하위 클래스가 table/기본 용량 지정)"""
+
+    table = ""
+    default_max_mb = 64.0
+
+    def __init__(self, db_path: str, max_bytes: Optional[int] = None):
+        self.db_path = db_path
+        self.max_bytes = max_bytes if max_bytes is not None else int(self.default_max_mb * 1024 * 1024)
+
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        return connect(self.db_path)
+
+    @classmethod
+    def create_schema(cls, conn: sqlite3.Connection):
+        """캐시 테이블과 LRU 인덱스 (migrations.py 에서 실행)"""
+        conn.execute(f"""
+            CREATE TABLE IF NOT EXISTS {cls.table} (
+                cache_key TEXT PRIMARY KEY,
+                model TEXT,
+                value TEXT NOT NULL,
+                size_bytes INTEGER NOT NULL,
+                created_at REAL,
+                last_accessed REAL,
+                hit_count INTEGER DEFAULT 0
+            )
+        """)
+        conn.execute(f"""
+            CREATE INDEX IF NOT EXISTS idx_{cls.table}_lru
+            ON {cls.table} (last_accessed)
+        """)
+        # 캐시별 전체 크기/항목 수 합계 행 (put/삭제 시 갱신, stats 는 이 행만 읽음)
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS cache_usage (
+                cache_table TEXT PRIMARY KEY,
+                size_bytes INTEGER NOT NULL,
+                entries INTEGER NOT NULL DEFAULT 0
+            )
+        """)
+        conn.execute(f"""
+            INSERT OR REPLACE INTO cache_usage (cache_table, size_bytes, entries)
+            SELECT ?, COALESCE(SUM(size_bytes), 0), COUNT(*) FROM {cls.table}
+        """, (cls.table,))
+
+    def get(self, cache_key: str) -> Optional[str]:
+        """캐시 조회 (적중 시 last_accessed 갱신)"""
+        conn = self._connect()
+        row = conn.execute(
+            f"SELECT value FROM {self.table} WHERE cache_key = ?", (cache_key,)
+        ).fetchone()
+        if row:
+            conn.execute(f"""
+                UPDATE {self.table}
+                SET last_accessed = ?, hit_count = hit_count + 1
+                WHERE cache_key = ?
+            """, (time.time(), cache_key))
+            conn.commit()
+        conn.close()
+
+        with self._lock:
+            if row:
+                self.hits += 1
+            else:
+                self.misses += 1
+        return row["value"] if row else None
+
+    def put(self, cache_key: str, value: str, model: Optional[str] = None):
+        """캐시 저장 후 용량 초과분 LRU 삭제"""
+        now = time.time()
+        size = len(value.encode("utf-8"))
+
+        conn = self._connect()
+        # 같은 키를 덮어쓰면 기존 크기를 빼고 합계 갱신 (저장과 같은 트랜잭션)
+        conn.execute(f"""
+            UPDATE cache_usage
+            SET size_bytes = size_bytes + ? - COALESCE(
+                    (SELECT size_bytes FROM {self.table} WHERE cache_key = ?), 0),
+                entries = entries + 1 - EXISTS(
+                    SELECT 1 FROM {self.table} WHERE cache_key = ?)
+            WHERE cache_table = ?
+        """, (size, cache_key, cache_key, self.table))
+        conn.execute(f"""
+            INSERT OR REPLACE INTO {self.table}
+                (cache_key, model, value, size_bytes, created_at, last_accessed, hit_count)
+            VALUES (?, ?, ?, ?, ?, ?, 0)
+        """, (cache_key, model, value, size, now, now))
+        conn.commit()
+        self._evict(conn)
+        conn.close()
+
+    def _total_bytes(self, conn: sqlite3.Connection) -> int:
+        row = conn.execute(
+            "SELECT size_bytes FROM cache_usage WHERE cache_table = ?", (self.table,)
+        ).fetchone()
+        return row["size_bytes"] if row else 0
+
+    def _evict(self, conn: sqlite3.Connection):
+        total = self._total_bytes(conn)
+        if total <= self.max_bytes:
+            return
+
+        evicted = 0
+        while total > self.max_bytes:
+            rows = conn.execute(
+                f"SELECT cache_key, size_bytes FROM {self.table} ORDER BY last_accessed LIMIT 100"
+            ).fetchall()
+            if not rows:
+                break
+            for row in rows:
+                if total <= self.max_bytes:
+                    break
+                cur = conn.execute(f"DELETE FROM {self.table} WHERE cache_key = ?", (row["cache_key"],))
+                # 다른 프로세스가 먼저 삭제한 항목은 합계에서 다시 빼지 않음
+                if cur.rowcount:
+                    conn.execute(
+                        "UPDATE cache_usage SET size_bytes = size_bytes - ?, entries = entries - 1 WHERE cache_table = ?",
+                        (row["size_bytes"], self.table)
+                    )
+                    evicted += 1
+                total -= row["size_bytes"]
+        conn.commit()
+
+        with self._lock:
+            self.evictions += evicted
+
+    def stats(self) -> Dict:
+        """적중/미스 카운터 (이 프로세스 기준) + 저장 현황 (cache_usage 합계 행)"""
+        conn = self._connect()
+        row = conn.execute(
+            "SELECT entries, size_bytes FROM cache_usage WHERE cache_table = ?", (self.table,)
+        ).fetchone()
+        conn.close()
+
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "evictions": self.evictions,
+            "entries": row["entries"] if row else 0,
+            "size_bytes": row["size_bytes"] if row else 0,
+            "max_bytes": self.max_bytes,
+        }
+
+
+class ExecutionCache(LRUResultCache):
+    """참가자 프롬프트 실행 결과 캐시"""
+
+    table = "execution_cache"
+    default_max_mb = EXECUTION_CACHE_MAX_MB
+
+    @staticmethod
+    def key_for(model: str, temperature: float, prompt: str,
+                input_data: Optional[str], run_index: int,
+                max_tokens: Optional[int] = None) -> str:
+        """실행 캐시 키 (응답 토큰 상한이 다르면 잘리는 위치가 달라지므로 포함)"""
+        return make_cache_key("execution", model, temperature, prompt, input_data or "", run_index, max_tokens)
+
+
+class JudgeCache(LRUResultCache):
+    """마스터 평가(judge) 결과 캐시"""
+
+    table = "judge_cache"
+    default_max_mb = JUDGE_CACHE_MAX_MB
+
+    @staticmethod
+    def key_for(model: str, temperature: float, system_prompt: str, master_prompt: str) -> str:
+        """평가 캐시 키 (완성된 마스터 평가 프롬프트 전체 기준)"""
+        return make_cache_key("judge", model, temperature, system_prompt, master_prompt)
@@ -0,0 +1,94 @@
+"""
+프로세스 전역 LLM 클라이언트 / 채점 엔진 레지스트리
+시작 시 한 번 생성한 AsyncOpenAI 클라이언트(HTTP 연결 풀)를 모든 채점에서 재사용하여
+제출물마다 TLS 핸드셰이크와 연결 생성 비용을 내지 않도록 함
+
+- keep-alive 연결 재사용, h2 패키지가 있으면 HTTP/2 사용
+- 연결/읽기 타임아웃 명시
+- 프록시 환경변수는 os.environ 을 수정하지 않고 trust_env=False 로 무시
+"""
+
+import os
+from typing import Dict, Optional
+
+import httpx
+from openai import AsyncOpenAI
+
+from grading_engine import AsyncGradingEngine
+from llm_cache import ExecutionCache, JudgeCache
+
+LLM_CONNECT_TIMEOUT = float(os.environ.get("LLM_CONNECT_TIMEOUT", "10"))
+LLM_READ_TIMEOUT = float(os.environ.get("LLM_READ_TIMEOUT", "120"))
+LLM_MAX_CONNECTIONS = int(os.environ.get("LLM_MAX_CONNECTIONS", "100"))
+LLM_KEEPALIVE_CONNECTIONS = int(os.environ.get("LLM_KEEPALIVE_CONNECTIONS", "20"))
+LLM_KEEPALIVE_EXPIRY = float(os.environ.get("LLM_KEEPALIVE_EXPIRY", "60"))
+
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+
+def create_async_client(api_key: Optional[str]) -> AsyncOpenAI:
+    """연결 풀/타임아웃이 설정된 AsyncOpenAI 클라이언트 생성"""
+    timeout = httpx.Timeout(LLM_READ_TIMEOUT, connect=LLM_CONNECT_TIMEOUT)
+    http_client = httpx.AsyncClient(
+        http2=HTTP2_AVAILABLE,
+        timeout=timeout,
+        limits=httpx.Limits(
+            max_connections=LLM_MAX_CONNECTIONS,
+            max_keepalive_connections=LLM_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=LLM_KEEPALIVE_EXPIRY
+        ),
+        # Railway 환경의 프록시 설정 문제: 환경변수 프록시를 사용하지 않음
+        trust_env=False
+    )
+    # SDK 자체 재시도는 끄고 RateLimitScheduler 가 관리
+    return AsyncOpenAI(
+        api_key=api_key,
+        http_client=http_client,
+        timeout=timeout,
+        max_retries=0
+    )
+
+
+class EngineRegistry:
+    """모델별 AsyncGradingEngine 을 공유 클라이언트/캐시와 함께 보관"""
+
+    def __init__(
+        self,
+        api_key: Optional[str],
+        execution_cache: Optional[ExecutionCache] = None,
+        judge_cache: Optional[JudgeCache] = None
+    ):
+        self.api_key = api_key
+        self.execution_cache = execution_cache
+        self.judge_cache = judge_cache
+        self._client: Optional[AsyncOpenAI] = None
+        self._engines: Dict[str, AsyncGradingEngine] = {}
+
+    @property
+    def client(self) -> AsyncOpenAI:
+        if self._client is None:
+            self._client = create_async_client(self.api_key)
+        return self._client
+
+    def get(self, model: str = "gpt-3.5-turbo") -> AsyncGradingEngine:
+        """모델의 공유 채점 엔진"""
+        if model not in self._engines:
+            self._engines[model] = AsyncGradingEngine(
+                api_key=self.api_key,
+                model=model,
+                execution_cache=self.execution_cache,
+                judge_cache=self.judge_cache,
+                client=self.client
+            )
+        return self._engines[model]
+
+    async def aclose(self):
+        """연결 풀 종료"""
+        if self._client is not None:
+            await self._client.close()
+            self._client = None
+        self._engines.clear()
@@ -5,12 +5,12 @@
 
 import os
 import json
-import sqlite3
+import socket
 import asyncio
 import time
 from datetime import datetime
 from typing import List, Optional, Dict, Any
-from fastapi import FastAPI, HTTPException, BackgroundTasks, File, UploadFile, Form
+from fastapi import FastAPI, HTTPException, File, UploadFile, Form
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from fastapi.responses import FileResponse, JSONResponse
@@ -18,16 +18,52 @@ from pydantic import BaseModel
 import pandas as pd
 import io
 
-from grading_engine import GradingEngine
+from async_utils import EventLoopLagMonitor, run_blocking
+from db import get_pool, pool_stats
+from db_writer import DatabaseWriter
 from file_parser import FileParser
+from job_queue import GradingJobStore
+from grader_worker import GradingWorker
+from grading_engine import EXECUTION_MODES, GradingPrompts
+from llm_clients import EngineRegistry
+from batch_grading import (
+    BATCH_POLL_INTERVAL, BatchGradingPipeline, BatchRunLost, create_backend as create_batch_backend
+)
+from batch_runs import BatchRunConflict, BatchRunStore
+from grading_estimate import estimate_task
+from prescreen import prescreen_submission
+from llm_cache import ExecutionCache, JudgeCache
+from migrations import run_migrations
+from hedging import get_hedger
+from rate_limiter import get_scheduler
 
 # 환경변수
 DATA_DIR = os.environ.get("DATA_DIR", ".")
 DB_PATH = os.path.join(DATA_DIR, "competition_prd.db")
 OPENAI_API_KEY = os.environ.get("OPENAI_API_KEY")
+GRADING_MODEL = os.environ.get("GRADING_MODEL", "gpt-3.5-turbo")
+GRADER_CONCURRENCY = int(os.environ.get("GRADER_CONCURRENCY", "4"))
+GRADING_LEASE_SECONDS = float(os.environ.get("GRADING_LEASE_SECONDS", "300"))
+# inline: API 프로세스 안에서 채점 / external: python -m grader_worker 가 채점
+GRADING_WORKER_MODE = os.environ.get("GRADING_WORKER_MODE", "inline")
+
+# 채점 작업 큐 (DB에 영속 저장, 재시작 시 이어서 처리)
+job_store = GradingJobStore(DB_PATH, lease_seconds=GRADING_LEASE_SECONDS)
+worker_stop_event = asyncio.Event()
+worker_task = None
+loop_monitor = EventLoopLagMonitor()
+
+# 단일 쓰기 큐 (일괄 업로드, inline 워커의 결과 저장/진행 상황을 모아서 커밋)
+db_writer = DatabaseWriter(DB_PATH)
 
-# 채점 진행 상황 추적 (메모리에 저장)
-grading_progress = {}
+# 프로세스 전역 LLM 클라이언트/채점 엔진 (시작 시 1회 생성, 연결 풀 재사용)
+engines = EngineRegistry(OPENAI_API_KEY, ExecutionCache(DB_PATH), JudgeCache(DB_PATH))
+
+# 배치 채점 기록 (SQLite, 재시작 후 이어서 실행) / 이 프로세스에서 실행 중인 배치 작업
+batch_store = BatchRunStore(DB_PATH)
+BATCH_OWNER = f"api-{socket.gethostname()}-{os.getpid()}"
+batch_tasks = set()
+batch_resume_task = None
 
 app = FastAPI(title="Auto-Grader v3.0 - 엑셀 일괄 업로드")
 
@@ -77,58 +113,15 @@ class SubmissionUpdate(BaseModel):
 # ============================================================================
 
 def get_db():
-    """DB 연결"""
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    return conn
-
-def init_db():
-    """DB 초기화"""
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    
-    # practitioners 테이블
-    c.execute("""
-        CREATE TABLE IF NOT EXISTS practitioners (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            name TEXT NOT NULL,
-            email TEXT,
-            company TEXT,
-            created_at TEXT DEFAULT CURRENT_TIMESTAMP
-        )
-    """)
-    
-    # tasks 테이블
-    c.execute("""
-        CREATE TABLE IF NOT EXISTS tasks (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            title TEXT NOT NULL,
-            description TEXT,
-            input_data TEXT NOT NULL,
-            golden_output TEXT NOT NULL,
-            evaluation_notes TEXT,
-            created_at TEXT DEFAULT CURRENT_TIMESTAMP
-        )
-    """)
-    
-    # submissions 테이블
-    c.execute("""
-        CREATE TABLE IF NOT EXISTS submissions (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            practitioner_id INTEGER NOT NULL,
-            task_id INTEGER NOT NULL,
-            prompt_text TEXT NOT NULL,
-            created_at TEXT DEFAULT CURRENT_TIMESTAMP,
-            score REAL,
-            grading_result TEXT,
-            graded_at TEXT,
-            FOREIGN KEY (practitioner_id) REFERENCES practitioners (id),
-            FOREIGN KEY (task_id) REFERENCES tasks (id)
+    """DB 연결 (연결 풀에서 꺼냄, close() 하면 풀에 반환)"""
+    return get_pool(DB_PATH).acquire()
+
+def _validate_execution_mode(execution_mode: Optional[str]):
+    if execution_mode is not None and execution_mode not in EXECUTION_MODES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"execution_mode 는 {', '.join(EXECUTION_MODES)} 중 하나여야 합니다"
         )
-    """)
-    
-    conn.commit()
-    conn.close()
 
 # ============================================================================
 # 라우트
@@ -136,7 +129,37 @@ def init_db():
 
 @app.on_event("startup")
 async def startup():
-    init_db()
+    global worker_task, batch_resume_task
+    # 스키마 마이그레이션 (테이블/컬럼/인덱스, 워커 프로세스도 시작 시 실행)
+    run_migrations(DB_PATH)
+    loop_monitor.start()
+    db_writer.start()
+    
+    # 채점 워커 시작 (중단된 작업은 lease 만료 후 자동 재개)
+    if GRADING_WORKER_MODE == "inline":
+        worker = GradingWorker(job_store, DB_PATH, OPENAI_API_KEY, loop_monitor, engines, db_writer)
+        worker_task = asyncio.create_task(worker.run(
+            worker_id=f"api-{os.getpid()}",
+            concurrency=GRADER_CONCURRENCY,
+            stop_event=worker_stop_event
+        ))
+    
+    # 중단된 배치 채점 이어서 실행 (이미 제출된 배치는 결과만 수집)
+    batch_resume_task = asyncio.create_task(_resume_batch_runs())
+
+@app.on_event("shutdown")
+async def shutdown():
+    worker_stop_event.set()
+    if worker_task:
+        worker_task.cancel()
+    if batch_resume_task:
+        batch_resume_task.cancel()
+    for task in list(batch_tasks):
+        task.cancel()
+    batch_store.release(BATCH_OWNER)
+    await db_writer.stop()
+    loop_monitor.stop()
+    await engines.aclose()
 
 @app.get("/")
 async def read_root():
@@ -176,26 +199,29 @@ async def create_task_with_files(
     title: str = Form(...),
     description: str = Form(None),
     evaluation_notes: str = Form(None),
+    execution_mode: str = Form("auto"),
     input_file: UploadFile = File(...),
     output_file: UploadFile = File(...)
 ):
     """과제 생성 (파일 업로드)"""
     
+    _validate_execution_mode(execution_mode)
+    
     # 입력 데이터 파싱
     input_content = await input_file.read()
-    input_data = FileParser.parse_file(input_content, input_file.filename)
+    input_data = await run_blocking(FileParser.parse_file, input_content, input_file.filename)
     
     # 기대 출력 파싱
     output_content = await output_file.read()
-    golden_output = FileParser.parse_file(output_content, output_file.filename)
+    golden_output = await run_blocking(FileParser.parse_file, output_content, output_file.filename)
     
     # DB 저장
     conn = get_db()
     c = conn.cursor()
     c.execute("""
-        INSERT INTO tasks (title, description, input_data, golden_output, evaluation_notes)
-        VALUES (?, ?, ?, ?, ?)
-    """, (title, description, input_data, golden_output, evaluation_notes))
+        INSERT INTO tasks (title, description, input_data, golden_output, evaluation_notes, execution_mode)
+        VALUES (?, ?, ?, ?, ?, ?)
+    """, (title, description, input_data, golden_output, evaluation_notes, execution_mode))
     
     task_id = c.lastrowid
     conn.commit()
@@ -209,11 +235,14 @@ async def update_task_with_files(
     title: str = Form(None),
     description: str = Form(None),
     evaluation_notes: str = Form(None),
+    execution_mode: str = Form(None),
     input_file: UploadFile = File(None),
     output_file: UploadFile = File(None)
 ):
     """과제 수정 (파일 업로드)"""
     
+    _validate_execution_mode(execution_mode)
+    
     conn = get_db()
     c = conn.cursor()
     
@@ -232,15 +261,17 @@ async def update_task_with_files(
         updates['description'] = description
     if evaluation_notes is not None:
         updates['evaluation_notes'] = evaluation_notes
+    if execution_mode is not None:
+        updates['execution_mode'] = execution_mode
     
     # 파일이 업로드된 경우 파싱
     if input_file is not None:
         input_content = await input_file.read()
-        updates['input_data'] = FileParser.parse_file(input_content, input_file.filename)
+        updates['input_data'] = await run_blocking(FileParser.parse_file, input_content, input_file.filename)
     
     if output_file is not None:
         output_content = await output_file.read()
-        updates['golden_output'] = FileParser.parse_file(output_content, output_file.filename)
+        updates['golden_output'] = await run_blocking(FileParser.parse_file, output_content, output_file.filename)
     
     # 업데이트 쿼리 생성
     if updates:
@@ -297,14 +328,14 @@ async def bulk_upload_submissions(
     c = conn.cursor()
     c.execute("SELECT * FROM tasks WHERE id = ?", (task_id,))
     task = c.fetchone()
+    conn.close()
     if not task:
-        conn.close()
         raise HTTPException(status_code=404, detail="과제를 찾을 수 없습니다")
     
     # 엑셀 파일 읽기
     try:
         content = await excel_file.read()
-        df = pd.read_excel(io.BytesIO(content))
+        df = await run_blocking(pd.read_excel, io.BytesIO(content))
         
         # 컬럼명 확인 (1행: 이름, 프롬프트)
         if len(df.columns) < 2:
@@ -321,18 +352,32 @@ async def bulk_upload_submissions(
             raise HTTPException(status_code=400, detail="업로드할 데이터가 없습니다")
         
     except Exception as e:
-        conn.close()
         raise HTTPException(status_code=400, detail=f"엑셀 파일 읽기 실패: {str(e)}")
     
-    # 일괄 등록
+    # 일괄 등록 (쓰기 큐에서 한 트랜잭션으로 커밋)
+    rows = [(idx, row['이름'], row['프롬프트']) for idx, row in df.iterrows()]
+    created_count, skipped_count, errors = await db_writer.write(
+        lambda conn: _insert_bulk_rows(conn, task_id, rows)
+    )
+    
+    return {
+        "message": "일괄 업로드 완료",
+        "created": created_count,
+        "skipped": skipped_count,
+        "errors": errors if errors else None
+    }
+
+def _insert_bulk_rows(conn, task_id: int, rows: List[tuple]):
+    """일괄 업로드 행 등록 (DatabaseWriter 쓰기 작업, 커밋은 쓰기 큐가 담당)"""
     created_count = 0
     skipped_count = 0
     errors = []
+    c = conn.cursor()
     
-    for idx, row in df.iterrows():
+    for idx, name, prompt in rows:
         try:
-            name = str(row['이름']).strip()
-            prompt = str(row['프롬프트']).strip()
+            name = str(name).strip()
+            prompt = str(prompt).strip()
             
             if not name or not prompt:
                 skipped_count += 1
@@ -360,15 +405,7 @@ async def bulk_upload_submissions(
             errors.append(f"행 {idx+2}: {str(e)}")
             skipped_count += 1
     
-    conn.commit()
-    conn.close()
-    
-    return {
-        "message": "일괄 업로드 완료",
-        "created": created_count,
-        "skipped": skipped_count,
-        "errors": errors if errors else None
-    }
+    return created_count, skipped_count, errors
 
 # ============================================================================
 # 참가자(Practitioner) API
@@ -403,6 +440,13 @@ async def create_practitioner(practitioner: PractitionerCreate):
     """참가자 생성"""
     conn = get_db()
     c = conn.cursor()
+    
+    # 이름 중복 확인 (practitioners.name unique 인덱스)
+    c.execute("SELECT id FROM practitioners WHERE name = ?", (practitioner.name,))
+    if c.fetchone():
+        conn.close()
+        raise HTTPException(status_code=400, detail="이미 등록된 참가자 이름입니다")
+    
     c.execute("""
         INSERT INTO practitioners (name, email, company)
         VALUES (?, ?, ?)
@@ -428,6 +472,11 @@ async def update_practitioner(practitioner_id: int, practitioner: PractitionerUp
     
     # 수정
     if practitioner.name is not None:
+        c.execute("SELECT id FROM practitioners WHERE name = ? AND id != ?",
+                 (practitioner.name, practitioner_id))
+        if c.fetchone():
+            conn.close()
+            raise HTTPException(status_code=400, detail="이미 등록된 참가자 이름입니다")
         c.execute("UPDATE practitioners SET name = ? WHERE id = ?",
                  (practitioner.name, practitioner_id))
     
@@ -466,8 +515,8 @@ async def delete_practitioner(practitioner_id: int):
 @app.get("/submissions")
 async def get_submissions(task_id: Optional[int] = None):
     """제출물 목록 조회"""
+    conn = get_db()
     try:
-        conn = get_db()
         c = conn.cursor()
         
         if task_id:
@@ -489,13 +538,14 @@ async def get_submissions(task_id: Optional[int] = None):
             """)
         
         submissions = [dict(row) for row in c.fetchall()]
-        conn.close()
         return submissions
     except Exception as e:
         import traceback
         print(f"❌ submissions API 오류: {e}")
         print(traceback.format_exc())
         raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        conn.close()
 
 @app.get("/submissions/{submission_id}")
 async def get_submission(submission_id: int):
@@ -607,149 +657,283 @@ async def delete_submission(submission_id: int):
 
 @app.post("/grade/{submission_id}")
 @app.post("/submissions/{submission_id}/grade")
-async def grade_submission(submission_id: int, background_tasks: BackgroundTasks):
-    """제출물 채점 시작 (백그라운드)"""
+async def grade_submission(submission_id: int, force: bool = False):
+    """
+    제출물 채점 시작 (작업 큐에 등록)
+    
+    force=true: 평가 캐시를 무시하고 다시 평가
+    """
     
-    # 제출물 조회
+    # 제출물 확인
     conn = get_db()
     c = conn.cursor()
-    c.execute("""
-        SELECT s.*, t.input_data, t.golden_output, t.evaluation_notes
-        FROM submissions s
-        JOIN tasks t ON s.task_id = t.id
-        WHERE s.id = ?
-    """, (submission_id,))
-    
+    c.execute("SELECT id FROM submissions WHERE id = ?", (submission_id,))
     submission = c.fetchone()
     conn.close()
     
     if not submission:
         raise HTTPException(status_code=404, detail="제출물을 찾을 수 없습니다")
     
-    # 이미 채점 중인지 확인
-    if submission_id in grading_progress:
-        status = grading_progress[submission_id].get('status')
-        if status in ['starting', 'step1', 'step2']:
-            raise HTTPException(status_code=400, detail="이미 채점 중입니다")
-    
-    # 진행 상황 초기화
-    grading_progress[submission_id] = {
-        'status': 'starting',
-        'current_step': '채점 준비 중...',
-        'progress': 0,
-        'details': None,
-        'execution_count': 0
-    }
-    
-    # 백그라운드 채점 시작
-    background_tasks.add_task(
-        grade_submission_task,
-        submission_id,
-        dict(submission)
+    # 이미 채점 중이거나 과제가 배치 채점 중이면 등록되지 않음
+    job_id = await run_blocking(
+        job_store.enqueue, submission_id, {'force': True} if force else None
     )
+    if job_id is None:
+        raise HTTPException(status_code=400, detail="이미 채점 중입니다 (작업 큐 또는 배치 채점)")
     
-    return {"message": "채점이 시작되었습니다", "submission_id": submission_id}
+    return {"message": "채점이 시작되었습니다", "submission_id": submission_id, "job_id": job_id}
 
-async def grade_submission_task(submission_id: int, submission: dict):
-    """백그라운드 채점 작업"""
+@app.post("/tasks/{task_id}/grade_all")
+async def grade_all_submissions(task_id: int, mode: str = "interactive"):
+    """
+    과제의 미채점 제출물 전체 채점
     
-    try:
-        # 1단계: 프롬프트 실행 (3회)
-        grading_progress[submission_id].update({
-            'status': 'step1',
-            'current_step': '프롬프트 실행 중 (1/3)...',
-            'progress': 10
-        })
-        
-        engine = GradingEngine(api_key=OPENAI_API_KEY)
-        
-        execution_results = []
-        for i in range(3):
-            grading_progress[submission_id].update({
-                'current_step': f'프롬프트 실행 중 ({i+1}/3)...',
-                'progress': 10 + (i * 20),
-                'execution_count': i + 1
-            })
-            
-            success, result, error = engine.execute_prompt(
-                submission['prompt_text'],
-                submission['input_data']
-            )
-            
-            execution_results.append({
-                'execution_number': i + 1,
-                'success': success,
-                'output': result if success else None,
-                'error': error
-            })
-        
-        # 2단계: 마스터 평가 프롬프트
-        grading_progress[submission_id].update({
-            'status': 'step2',
-            'current_step': '종합 평가 중...',
-            'progress': 70
-        })
-        
-        success, result, error = engine.evaluate_outputs(
-            submission['prompt_text'],
-            submission['input_data'],
-            submission['golden_output'],
-            execution_results,
-            submission.get('evaluation_notes')
-        )
-        
-        if not success:
-            raise Exception(f"평가 실패: {error}")
-        
-        # 채점 결과 저장
-        grading_result = {
-            'execution_results': execution_results,
-            **result
-        }
-        
-        conn = get_db()
-        c = conn.cursor()
-        c.execute("""
-            UPDATE submissions 
-            SET grading_result = ?, graded_at = ?
-            WHERE id = ?
-        """, (
-            json.dumps(grading_result, ensure_ascii=False),
-            datetime.now().isoformat(),
-            submission_id
-        ))
-        conn.commit()
+    mode=interactive: 작업 큐에 등록 (제출물별 즉시 채점)
+    mode=batch: 배치 파이프라인으로 일괄 채점 (저비용, 완료까지 최대 24시간)
+    """
+    if mode not in ('interactive', 'batch'):
+        raise HTTPException(status_code=400, detail="mode 는 interactive 또는 batch 여야 합니다")
+    
+    conn = get_db()
+    c = conn.cursor()
+    
+    c.execute("SELECT id FROM tasks WHERE id = ?", (task_id,))
+    if not c.fetchone():
         conn.close()
-        
-        # 완료 상태
-        grading_progress[submission_id].update({
-            'status': 'completed',
-            'current_step': '채점 완료!',
-            'progress': 100,
-            'details': result
-        })
-        
+        raise HTTPException(status_code=404, detail="과제를 찾을 수 없습니다")
+    
+    c.execute("""
+        SELECT id FROM submissions
+        WHERE task_id = ? AND grading_result IS NULL
+        ORDER BY created_at, id
+    """, (task_id,))
+    pending_ids = [row['id'] for row in c.fetchall()]
+    conn.close()
+    
+    if mode == 'batch':
+        try:
+            run_id = await run_blocking(batch_store.create, task_id, BATCH_OWNER, len(pending_ids))
+        except BatchRunConflict as e:
+            raise HTTPException(status_code=400, detail=f"배치 채점을 시작할 수 없습니다: {e}")
+        _start_batch_grading(run_id)
+        return {
+            "message": f"{len(pending_ids)}개 제출물 배치 채점이 시작되었습니다",
+            "mode": "batch",
+            "run_id": run_id,
+            "submission_ids": pending_ids
+        }
+    
+    # 진행 중인 작업이 있거나 배치 채점 중인 과제의 제출물은 등록되지 않음
+    job_ids = await run_blocking(job_store.enqueue_many, pending_ids)
+    
+    return {
+        "message": f"{len(job_ids)}개 제출물 채점이 시작되었습니다",
+        "submission_ids": pending_ids,
+        "job_ids": job_ids
+    }
+
+async def _run_batch_grading(run_id: int):
+    """
+    배치 채점 실행 (API 프로세스에서 배치 완료를 기다림)
+    진행 단계/결과/오류는 파이프라인이 batch_runs 테이블에 기록
+    """
+    try:
+        engine = engines.get(GRADING_MODEL)
+        pipeline = BatchGradingPipeline(DB_PATH, engine, create_batch_backend(engine), owner=BATCH_OWNER)
+        summary = await pipeline.run(run_id)
+        print(f"✅ Batch run {run_id} completed: {summary['graded']} graded, {len(summary['failed'])} failed")
+    except BatchRunLost as e:
+        print(f"⚠️  {e}")
     except Exception as e:
-        # 오류 상태
-        grading_progress[submission_id].update({
-            'status': 'error',
-            'current_step': f'채점 오류: {str(e)}',
-            'progress': 0,
-            'error': str(e)
-        })
+        print(f"❌ Batch run {run_id} failed: {e}")
+
+def _start_batch_grading(run_id: int):
+    task = asyncio.create_task(_run_batch_grading(run_id))
+    batch_tasks.add(task)
+    task.add_done_callback(batch_tasks.discard)
+
+async def _resume_batch_runs():
+    """소유 프로세스가 중단된(lease 만료) 배치 채점을 주기적으로 찾아 이어서 실행"""
+    while True:
+        try:
+            for run in await run_blocking(batch_store.list_resumable):
+                if await run_blocking(batch_store.claim, run['id'], BATCH_OWNER):
+                    print(f"🔁 Resuming batch run {run['id']} (task {run['task_id']}, stage {run['stage']})")
+                    _start_batch_grading(run['id'])
+        except Exception as e:
+            print(f"⚠️  Batch resume check failed: {e}")
+        await asyncio.sleep(BATCH_POLL_INTERVAL)
+
+@app.get("/tasks/{task_id}/batch-status")
+async def get_batch_status(task_id: int):
+    """과제의 가장 최근 배치 채점 상태"""
+    run = await run_blocking(batch_store.latest_for_task, task_id)
+    if run is None:
+        return {"status": "not_started"}
+    return BatchRunStore.status_view(run)
+
+@app.get("/tasks/{task_id}/grading-estimate")
+async def get_grading_estimate(task_id: int, concurrency: Optional[int] = None):
+    """
+    미채점 제출물 일괄 채점 예상 토큰/비용/소요 시간 (grade_all 실행 전 확인용)
+    
+    concurrency: 동시 채점 수 (기본: GRADER_CONCURRENCY)
+    """
+    estimate = await run_blocking(
+        estimate_task, DB_PATH, GradingPrompts(GRADING_MODEL), task_id,
+        concurrency or GRADER_CONCURRENCY
+    )
+    if estimate is None:
+        raise HTTPException(status_code=404, detail="과제를 찾을 수 없습니다")
+    return estimate
+
+def _prescreen_stats(task_id: int) -> Optional[dict]:
+    """과제의 사전 검사 결과 집계 (저장된 결과 + 미채점 제출물 미리보기)"""
+    conn = get_db()
+    c = conn.cursor()
+    c.execute("SELECT golden_output, description FROM tasks WHERE id = ?", (task_id,))
+    task = c.fetchone()
+    if not task:
+        conn.close()
+        return None
+    c.execute("SELECT prompt_text, grading_result FROM submissions WHERE task_id = ?", (task_id,))
+    rows = c.fetchall()
+    conn.close()
+    
+    recorded = {}
+    pending = {}
+    for row in rows:
+        if row['grading_result'] is None:
+            screen = prescreen_submission(row['prompt_text'], task['golden_output'], task['description'])
+            counts = pending
+        else:
+            try:
+                screen = json.loads(row['grading_result']).get('prescreen')
+            except (ValueError, AttributeError):
+                screen = None
+            counts = recorded
+        if screen:
+            by_verdict = counts.setdefault(screen['verdict'], {})
+            by_verdict[screen['reason']] = by_verdict.get(screen['reason'], 0) + 1
+    
+    return {"task_id": task_id, "recorded": recorded, "pending": pending}
+
+@app.get("/tasks/{task_id}/prescreen-stats")
+async def get_prescreen_stats(task_id: int):
+    """
+    과제별 사전 검사 집계 (verdict → reason → 건수)
+    recorded: 사전 검사로 처리된 제출물 / pending: 미채점 제출물 중 채점 시 걸러질 제출물
+    """
+    stats = await run_blocking(_prescreen_stats, task_id)
+    if stats is None:
+        raise HTTPException(status_code=404, detail="과제를 찾을 수 없습니다")
+    return stats
+
+def _job_progress(job: dict) -> dict:
+    """작업 레코드 → 진행 상황 응답"""
+    status = {
+        'queued': 'starting',
+        'leased': 'starting',
+        'running': 'step2' if (job.get('progress') or 0) >= 70 else 'step1',
+        'done': 'completed',
+        'failed': 'error',
+    }[job['state']]
+    
+    return {
+        'status': status,
+        'job_state': job['state'],
+        'current_step': job['current_step'],
+        'progress': job['progress'] or 0,
+        'details': job['last_error'] if job['state'] == 'failed' else job['current_step'],
+        'execution_count': 3 if (job.get('progress') or 0) >= 70 else 0,
+        'attempts': job['attempts'],
+        'error': job['last_error'],
+        'started_at': job['started_at'],
+        'updated_at': job['updated_at'],
+    }
 
 @app.get("/grading/progress")
 async def get_all_grading_progress():
-    """모든 채점 진행 상황 조회"""
-    return grading_progress
+    """대기/진행 중인 모든 채점 진행 상황 조회"""
+    active_jobs = await run_blocking(job_store.list_active)
+    return {
+        "active_gradings": len(active_jobs),
+        "jobs": await run_blocking(job_store.count_by_state),
+        "details": {job['submission_id']: _job_progress(job) for job in active_jobs}
+    }
 
 @app.get("/grading/progress/{submission_id}")
 async def get_grading_progress(submission_id: int):
     """특정 제출물 채점 진행 상황 조회"""
-    if submission_id not in grading_progress:
+    job = await run_blocking(job_store.get_latest_for_submission, submission_id)
+    if not job:
         return {"status": "not_started", "message": "채점이 시작되지 않았습니다"}
     
-    return grading_progress[submission_id]
+    return _job_progress(job)
+
+@app.get("/grading/rate-limits")
+async def get_rate_limits():
+    """LLM 호출 속도 제한 예산 (API 프로세스 + 실행 중인 워커 프로세스)"""
+    workers = await run_blocking(job_store.list_worker_status)
+    return {
+        "api": get_scheduler().snapshot(),
+        "workers": {
+            worker_id: status.get('rate_limits')
+            for worker_id, status in workers.items()
+        }
+    }
+
+@app.get("/grading/hedging")
+async def get_hedging_stats():
+    """LLM 요청 헤징 지표 (발행/승리 수, 모델별 p95 지연 시간)"""
+    workers = await run_blocking(job_store.list_worker_status)
+    return {
+        "api": get_hedger().stats(),
+        "workers": {
+            worker_id: status.get('hedging')
+            for worker_id, status in workers.items()
+        }
+    }
+
+@app.get("/grading/db-pool")
+async def get_db_pool_stats():
+    """SQLite 연결 풀 사용량/대기 통계 (API 프로세스)"""
+    return {"pools": pool_stats()}
+
+@app.get("/grading/db-writer")
+async def get_db_writer_stats():
+    """SQLite 쓰기 큐 통계 (대기 작업 수, backpressure, 배치 크기)"""
+    workers = await run_blocking(job_store.list_worker_status)
+    return {
+        "api": db_writer.stats(),
+        "workers": {
+            worker_id: status.get('db_writer')
+            for worker_id, status in workers.items()
+        }
+    }
+
+@app.get("/grading/cache-stats")
+async def get_cache_stats():
+    """LLM 결과 캐시 적중/미스 통계 (워커 프로세스별)"""
+    workers = await run_blocking(job_store.list_worker_status)
+    return {
+        "workers": {
+            worker_id: status.get('cache')
+            for worker_id, status in workers.items()
+        }
+    }
+
+@app.get("/grading/event-loop")
+async def get_event_loop_stats():
+    """이벤트 루프 지연 통계 (API 프로세스 + 실행 중인 워커 프로세스)"""
+    workers = await run_blocking(job_store.list_worker_status)
+    return {
+        "api": loop_monitor.stats(),
+        "workers": {
+            worker_id: status.get('event_loop')
+            for worker_id, status in workers.items()
+        }
+    }
 
 # ============================================================================
 # 대시보드 및 통계 API
@@ -774,7 +958,7 @@ async def get_dashboard_stats():
     c.execute("SELECT COUNT(*) as count FROM submissions WHERE grading_result IS NOT NULL")
     graded_count = c.fetchone()['count']
     
-    c.execute("SELECT AVG(score) as avg_score FROM submissions WHERE score IS NOT NULL")
+    c.execute("SELECT AVG(total_score) as avg_score FROM submissions WHERE total_score IS NOT NULL")
     avg_score = c.fetchone()['avg_score'] or 0
     
     # 과제별 통계
@@ -784,7 +968,7 @@ async def get_dashboard_stats():
             t.title,
             COUNT(s.id) as submission_count,
             COUNT(CASE WHEN s.grading_result IS NOT NULL THEN 1 END) as graded_count,
-            AVG(s.score) as avg_score
+            AVG(s.total_score) as avg_score
         FROM tasks t
         LEFT JOIN submissions s ON t.id = s.task_id
         GROUP BY t.id
@@ -805,7 +989,7 @@ async def get_dashboard_stats():
 
 @app.get("/leaderboard")
 async def get_leaderboard(task_id: Optional[int] = None):
-    """리더보드"""
+    """리더보드 (total_score 인덱스 순서로 조회, JSON 파싱 없음)"""
     conn = get_db()
     c = conn.cursor()
     
@@ -814,28 +998,34 @@ async def get_leaderboard(task_id: Optional[int] = None):
             SELECT 
                 p.name as practitioner_name,
                 t.title as task_title,
-                s.score,
+                s.total_score as score,
+                s.accuracy_score,
+                s.clarity_score,
+                s.consistency_score,
                 s.graded_at,
                 s.id as submission_id
             FROM submissions s
             JOIN practitioners p ON s.practitioner_id = p.id
             JOIN tasks t ON s.task_id = t.id
-            WHERE s.score IS NOT NULL AND s.task_id = ?
-            ORDER BY s.score DESC, s.graded_at ASC
+            WHERE s.task_id = ? AND s.total_score IS NOT NULL
+            ORDER BY s.total_score DESC, s.graded_at ASC
         """, (task_id,))
     else:
         c.execute("""
             SELECT 
                 p.name as practitioner_name,
                 t.title as task_title,
-                s.score,
+                s.total_score as score,
+                s.accuracy_score,
+                s.clarity_score,
+                s.consistency_score,
                 s.graded_at,
                 s.id as submission_id
             FROM submissions s
             JOIN practitioners p ON s.practitioner_id = p.id
             JOIN tasks t ON s.task_id = t.id
-            WHERE s.score IS NOT NULL
-            ORDER BY s.score DESC, s.graded_at ASC
+            WHERE s.total_score IS NOT NULL
+            ORDER BY s.total_score DESC, s.graded_at ASC
         """)
     
     leaderboard = [dict(row) for row in c.fetchall()]
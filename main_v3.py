@@ -16,6 +16,7 @@ from fastapi.responses import FileResponse
 from pydantic import BaseModel
 
 from grading_engine import GradingEngine
+from migrations import add_column_if_missing, run_migrations
 
 # 환경변수
 DATA_DIR = os.environ.get("DATA_DIR", ".")
@@ -83,56 +84,22 @@ def get_db():
     conn.row_factory = sqlite3.Row
     return conn
 
+# main_v3 에서만 쓰는 컬럼 (공용 스키마는 migrations.py 가 생성)
+V3_COLUMNS = (
+    ("practitioners", "department", "TEXT"),
+    ("practitioners", "position", "TEXT"),
+    ("practitioners", "years_of_experience", "INTEGER"),
+    ("submissions", "execution_output_1", "TEXT"),
+    ("submissions", "execution_output_2", "TEXT"),
+    ("submissions", "execution_output_3", "TEXT"),
+)
+
 def init_db():
-    """DB 초기화"""
+    """DB 초기화 (마이그레이션 적용 후 v3 전용 컬럼만 추가)"""
+    run_migrations(DB_PATH)
     conn = get_db()
-    c = conn.cursor()
-    
-    # practitioners 테이블
-    c.execute("""
-    CREATE TABLE IF NOT EXISTS practitioners (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        name TEXT NOT NULL,
-        email TEXT UNIQUE NOT NULL,
-        department TEXT,
-        position TEXT,
-        years_of_experience INTEGER,
-        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-    )
-    """)
-    
-    # tasks 테이블
-    c.execute("""
-    CREATE TABLE IF NOT EXISTS tasks (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        title TEXT NOT NULL,
-        description TEXT,
-        input_data TEXT,
-        golden_output TEXT,
-        evaluation_notes TEXT,
-        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-    )
-    """)
-    
-    # submissions 테이블
-    c.execute("""
-    CREATE TABLE IF NOT EXISTS submissions (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        task_id INTEGER NOT NULL,
-        practitioner_id INTEGER NOT NULL,
-        prompt_text TEXT NOT NULL,
-        status TEXT DEFAULT 'submitted',
-        execution_output_1 TEXT,
-        execution_output_2 TEXT,
-        execution_output_3 TEXT,
-        grading_result TEXT,
-        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-        graded_at TIMESTAMP,
-        FOREIGN KEY (task_id) REFERENCES tasks(id),
-        FOREIGN KEY (practitioner_id) REFERENCES practitioners(id)
-    )
-    """)
-    
+    for table, column, definition in V3_COLUMNS:
+        add_column_if_missing(conn, table, column, definition)
     conn.commit()
     conn.close()
 
@@ -0,0 +1,307 @@
+"""
+DB 스키마 마이그레이션
+main.py init_db, schema.sql, main_v3.py, create_demo_data.py 가 서로 다른 submissions/practitioners
+컬럼으로 DB 를 만들어 왔으므로 (배포된 competition_prd.db 도 그중 하나와 일치하지 않음)
+순서가 있는 마이그레이션 목록으로 모든 DB 를 같은 스키마로 맞춤
+(main_v3.py, create_demo_data.py 도 테이블을 직접 만들지 않고 run_migrations 사용)
+
+- schema_version 테이블에 적용한 버전/이름/시각/소요 시간 기록
+- 서버와 워커 시작 시 실행, 미적용 마이그레이션 전체를 한 트랜잭션(BEGIN IMMEDIATE)으로 적용
+  여러 프로세스가 동시에 시작해도 한 프로세스만 적용
+- schema_version 이 없는 기존 DB 도 처음부터 적용하므로 마이그레이션은 재실행해도 안전하게 작성
+  (CREATE ... IF NOT EXISTS, 없는 컬럼만 추가)
+- 이전 스키마에만 있는 컬럼(execution_output_1~3 등)은 삭제하지 않음
+- 데이터를 지워야 하는 마이그레이션은 기본적으로 중단하고 보고 (MigrationError)
+"""
+
+import os
+import time
+import sqlite3
+from datetime import datetime
+from typing import Callable, Dict, List, Tuple
+
+from batch_runs import BatchRunStore
+from db import connect
+from grading_checkpoints import GradingCheckpointStore
+from grading_results import RESULT_COLUMNS, RESULT_INDEXES, backfill_result_columns
+from job_queue import GradingJobStore
+from llm_cache import ExecutionCache, JudgeCache
+
+# 1 이면 마이그레이션 009 에서 같은 이름의 참가자를 병합 (병합 전 행은 practitioners_merged 에 보관)
+MERGE_DUPLICATE_PRACTITIONERS = os.environ.get("MERGE_DUPLICATE_PRACTITIONERS", "0") == "1"
+
+
+class MigrationError(Exception):
+    """운영자 확인이 필요해 적용하지 않은 마이그레이션 (전체 롤백)"""
+
+
+def add_column_if_missing(conn: sqlite3.Connection, table: str, column: str, definition: str):
+    """기존 DB에 없는 컬럼 추가"""
+    columns = [row[1] for row in conn.execute(f"PRAGMA table_info({table})")]
+    if column not in columns:
+        conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+
+
+# ============================================================================
+# 마이그레이션 (추가만 하고 기존 항목은 수정하지 않음)
+# ============================================================================
+
+def _base_tables(conn: sqlite3.Connection):
+    """practitioners / tasks / submissions (main.py 초기 스키마)"""
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS practitioners (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            email TEXT,
+            company TEXT,
+            created_at TEXT DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS tasks (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            title TEXT NOT NULL,
+            description TEXT,
+            input_data TEXT NOT NULL,
+            golden_output TEXT NOT NULL,
+            evaluation_notes TEXT,
+            created_at TEXT DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS submissions (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            practitioner_id INTEGER NOT NULL,
+            task_id INTEGER NOT NULL,
+            prompt_text TEXT NOT NULL,
+            created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+            score REAL,
+            grading_result TEXT,
+            graded_at TEXT,
+            FOREIGN KEY (practitioner_id) REFERENCES practitioners (id),
+            FOREIGN KEY (task_id) REFERENCES tasks (id)
+        )
+    """)
+
+
+def _legacy_columns(conn: sqlite3.Connection):
+    """다른 스키마로 만든 DB 에 빠진 컬럼 (create_demo_data.py/main_v3.py 로 만든 DB 는 email/company 가 없음)"""
+    add_column_if_missing(conn, "practitioners", "email", "TEXT")
+    add_column_if_missing(conn, "practitioners", "company", "TEXT")
+
+
+def _task_execution_settings(conn: sqlite3.Connection):
+    """과제별 실행 방식, 실행 응답 토큰 상한 캐시"""
+    add_column_if_missing(conn, "tasks", "execution_mode", "TEXT DEFAULT 'auto'")
+    add_column_if_missing(conn, "tasks", "execution_max_tokens", "INTEGER")
+    add_column_if_missing(conn, "tasks", "golden_output_hash", "TEXT")
+
+
+def _grading_jobs(conn: sqlite3.Connection):
+    GradingJobStore.create_schema(conn)
+
+
+def _result_caches(conn: sqlite3.Connection):
+    ExecutionCache.create_schema(conn)
+    JudgeCache.create_schema(conn)
+
+
+def _grading_checkpoints(conn: sqlite3.Connection):
+    GradingCheckpointStore.create_schema(conn)
+
+
+def _score_columns(conn: sqlite3.Connection):
+    """채점 결과 점수/상태 컬럼, 리더보드 인덱스, 기존 결과 backfill"""
+    for column, definition in RESULT_COLUMNS:
+        add_column_if_missing(conn, "submissions", column, definition)
+    for statement in RESULT_INDEXES:
+        conn.execute(statement)
+    backfilled = backfill_result_columns(conn)
+    if backfilled:
+        print(f"   Backfilled score columns for {backfilled} graded submissions")
+
+
+# 엔드포인트 조회용 인덱스 (query_plan_test.py 가 EXPLAIN QUERY PLAN 으로 사용 여부 확인)
+# - 과제별 제출물 목록/삭제/일괄 채점/사전 검사: task_id, created_at 순
+# - 전체 제출물 목록: created_at 순
+# - 참가자 삭제, 참가자별 제출 이력: practitioner_id (외래 키 검사도 사용)
+# - 일괄 업로드 행마다, /participants/check 의 이름 조회 (이름 중복 불가)
+QUERY_INDEXES = (
+    "CREATE INDEX IF NOT EXISTS idx_submissions_task_created "
+    "ON submissions (task_id, created_at)",
+    "CREATE INDEX IF NOT EXISTS idx_submissions_created_at "
+    "ON submissions (created_at)",
+    "CREATE INDEX IF NOT EXISTS idx_submissions_practitioner_task "
+    "ON submissions (practitioner_id, task_id)",
+    "CREATE UNIQUE INDEX IF NOT EXISTS idx_practitioners_name "
+    "ON practitioners (name)",
+)
+
+
+def duplicate_practitioners(conn: sqlite3.Connection) -> List[Dict]:
+    """같은 이름으로 여러 번 등록된 참가자 (이름, id 목록, 제출물 수)"""
+    rows = conn.execute("""
+        SELECT p.name, GROUP_CONCAT(p.id) AS ids,
+               (SELECT COUNT(*) FROM submissions s
+                WHERE s.practitioner_id IN (SELECT id FROM practitioners WHERE name = p.name)) AS submissions
+        FROM practitioners p
+        GROUP BY p.name
+        HAVING COUNT(*) > 1
+        ORDER BY p.name
+    """).fetchall()
+    return [
+        {"name": row[0], "ids": sorted(int(i) for i in row[1].split(",")), "submissions": row[2]}
+        for row in rows
+    ]
+
+
+def _merge_duplicate_practitioners(conn: sqlite3.Connection) -> int:
+    """
+    같은 이름의 참가자를 가장 먼저 만든(id 가 가장 작은) 참가자로 합침 (커밋은 호출자)
+    삭제하는 참가자 행과 원래 제출물 소유 관계는 practitioners_merged 에 보관
+
+    Returns:
+        삭제한 중복 참가자 수
+    """
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS practitioners_merged (
+            id INTEGER PRIMARY KEY,
+            name TEXT NOT NULL,
+            email TEXT,
+            company TEXT,
+            created_at TEXT,
+            merged_into INTEGER NOT NULL,
+            submission_ids TEXT,
+            merged_at TEXT NOT NULL
+        )
+    """)
+    conn.execute("""
+        INSERT INTO practitioners_merged
+            (id, name, email, company, created_at, merged_into, submission_ids, merged_at)
+        SELECT p.id, p.name, p.email, p.company, p.created_at,
+               (SELECT MIN(keep.id) FROM practitioners keep WHERE keep.name = p.name),
+               (SELECT GROUP_CONCAT(s.id) FROM submissions s WHERE s.practitioner_id = p.id),
+               ?
+        FROM practitioners p
+        WHERE p.id > (SELECT MIN(id) FROM practitioners WHERE name = p.name)
+    """, (datetime.now().isoformat(),))
+    conn.execute("""
+        UPDATE submissions
+        SET practitioner_id = (
+            SELECT merged_into FROM practitioners_merged WHERE id = submissions.practitioner_id
+        )
+        WHERE practitioner_id IN (SELECT id FROM practitioners_merged)
+    """)
+    return conn.execute("""
+        DELETE FROM practitioners
+        WHERE id > (SELECT MIN(p.id) FROM practitioners p WHERE p.name = practitioners.name)
+    """).rowcount
+
+
+def _query_indexes(conn: sqlite3.Connection):
+    """
+    제출물/참가자 조회 인덱스, 참가자 이름 unique
+    이름이 같은 참가자가 있으면 중단하고 목록을 보고 (동명이인일 수 있으므로 자동으로 합치지 않음)
+    MERGE_DUPLICATE_PRACTITIONERS=1 이면 병합 후 진행
+    """
+    duplicates = duplicate_practitioners(conn)
+    if duplicates and not MERGE_DUPLICATE_PRACTITIONERS:
+        lines = "\n".join(
+            f"   - {dup['name']}: ids {dup['ids']} ({dup['submissions']} submissions)"
+            for dup in duplicates
+        )
+        raise MigrationError(
+            f"{len(duplicates)} practitioner names are registered more than once; "
+            f"the unique name index was not created:\n{lines}\n"
+            "   Rename or merge them, or back up the DB and set MERGE_DUPLICATE_PRACTITIONERS=1 "
+            "to merge each name into its lowest id (removed rows are kept in practitioners_merged)."
+        )
+    if duplicates:
+        merged = _merge_duplicate_practitioners(conn)
+        print(f"   Merged {merged} duplicate practitioners (kept in practitioners_merged)")
+    for statement in QUERY_INDEXES:
+        conn.execute(statement)
+
+
+def _batch_runs(conn: sqlite3.Connection):
+    """batch_runs (사전 검사/응답 토큰 상한 도입 전에 만든 테이블에는 컬럼 추가)"""
+    BatchRunStore.create_schema(conn)
+    add_column_if_missing(conn, "batch_runs", "prescreened", "INTEGER DEFAULT 0")
+    add_column_if_missing(conn, "batch_runs", "max_tokens", "INTEGER")
+
+
+# (버전, 이름, 함수) - 버전 순서대로 적용
+MIGRATIONS: List[Tuple[int, str, Callable[[sqlite3.Connection], None]]] = [
+    (1, "base_tables", _base_tables),
+    (2, "legacy_columns", _legacy_columns),
+    (3, "task_execution_settings", _task_execution_settings),
+    (4, "grading_jobs", _grading_jobs),
+    (5, "result_caches", _result_caches),
+    (6, "grading_checkpoints", _grading_checkpoints),
+    (7, "score_columns", _score_columns),
+    (8, "batch_runs", _batch_runs),
+    (9, "query_indexes", _query_indexes),
+]
+
+
+# ============================================================================
+# 실행
+# ============================================================================
+
+def _ensure_version_table(conn: sqlite3.Connection):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS schema_version (
+            version INTEGER PRIMARY KEY,
+            name TEXT NOT NULL,
+            applied_at TEXT NOT NULL,
+            duration_ms REAL
+        )
+    """)
+
+
+def current_version(conn: sqlite3.Connection) -> int:
+    """적용된 마지막 마이그레이션 버전 (없으면 0)"""
+    _ensure_version_table(conn)
+    row = conn.execute("SELECT MAX(version) FROM schema_version").fetchone()
+    return row[0] or 0
+
+
+def run_migrations(db_path: str) -> List[int]:
+    """
+    미적용 마이그레이션을 한 트랜잭션으로 적용 (하나라도 실패하면 전체 롤백)
+
+    Returns:
+        이번에 적용한 버전 목록
+    """
+    started = time.monotonic()
+    conn = connect(db_path, isolation_level=None)
+    applied = []
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        version = current_version(conn)
+        for target, name, migrate in MIGRATIONS:
+            if target <= version:
+                continue
+            step_started = time.monotonic()
+            migrate(conn)
+            duration_ms = (time.monotonic() - step_started) * 1000
+            conn.execute(
+                "INSERT INTO schema_version (version, name, applied_at, duration_ms) VALUES (?, ?, ?, ?)",
+                (target, name, datetime.now().isoformat(), round(duration_ms, 2))
+            )
+            print(f"🗄️  Migration {target:03d} {name} applied ({duration_ms:.1f}ms)")
+            applied.append(target)
+        conn.execute("COMMIT")
+    except Exception:
+        if conn.in_transaction:
+            conn.execute("ROLLBACK")
+        raise
+    finally:
+        conn.close()
+
+    total_ms = (time.monotonic() - started) * 1000
+    if applied:
+        print(f"✅ Schema migrated to version {applied[-1]} ({len(applied)} migrations, {total_ms:.1f}ms)")
+    else:
+        print(f"✅ Schema up to date (version {version}, {total_ms:.1f}ms)")
+    return applied
@@ -0,0 +1,199 @@
+"""
+실행 결과 유사도 비교 및 마스터 평가 프롬프트 압축
+T=0.1 의 실행 결과는 대부분 같거나 거의 같으므로
+- 동일한 결과는 한 번만 보여주고 몇 번 반복되었는지 표시
+- 거의 같은 결과는 첫 번째 결과 대비 unified diff 로 표시
+- 결과 간 유사도 수치를 함께 전달
+
+일관성 점수(20점)도 여기서 결정적으로 계산하여 평가 모델에 맡기지 않음
+"""
+
+import re
+import difflib
+from itertools import combinations
+from typing import Dict, FrozenSet, List, Tuple
+
+# 이 유사도 이상이면 전체 대신 diff 로 표시
+NEAR_IDENTICAL_THRESHOLD = 0.8
+DIFF_CONTEXT_LINES = 1
+
+# 일관성 점수
+CONSISTENCY_MAX_SCORE = 20
+NGRAM_SIZE = 3
+
+
+def _words(text: str) -> List[str]:
+    return re.findall(r"\S+|\s+", text or "")
+
+
+def similarity(a: str, b: str) -> float:
+    """단어 단위 SequenceMatcher 유사도 (0~1)"""
+    if a == b:
+        return 1.0
+    matcher = difflib.SequenceMatcher(None, _words(a), _words(b), autojunk=False)
+    return matcher.ratio()
+
+
+def pairwise_similarity(outputs: List[str]) -> Dict[Tuple[int, int], float]:
+    """모든 결과 쌍의 유사도 {(i, j): ratio}"""
+    return {
+        (i, j): similarity(outputs[i], outputs[j])
+        for i, j in combinations(range(len(outputs)), 2)
+    }
+
+
+def unified_diff(base: str, other: str, base_label: str, other_label: str) -> str:
+    """줄 단위 unified diff (변경 주변 DIFF_CONTEXT_LINES 줄만 포함)"""
+    lines = difflib.unified_diff(
+        (base or "").splitlines(),
+        (other or "").splitlines(),
+        fromfile=base_label,
+        tofile=other_label,
+        n=DIFF_CONTEXT_LINES,
+        lineterm=""
+    )
+    return "\n".join(lines)
+
+
+def compact_outputs(outputs: List[str]) -> Dict:
+    """
+    실행 결과 목록 → 평가 프롬프트용 구간 목록
+
+    Returns:
+        {
+            'sections': [{'title', 'text', 'kind': 'full' | 'diff'}],
+            'similarity': {'1-2': 0.97, ...},
+            'identical_groups': [[1, 3], [2]]   # 동일한 결과끼리 묶은 실행 번호
+        }
+    """
+    groups: List[Tuple[str, List[int]]] = []
+    for number, output in enumerate(outputs, 1):
+        for text, members in groups:
+            if text == output:
+                members.append(number)
+                break
+        else:
+            groups.append((output, [number]))
+
+    ratios = pairwise_similarity(outputs)
+
+    def label(members: List[int]) -> str:
+        return " = ".join(f"Output {number}" for number in members)
+
+    base_text, base_members = groups[0]
+    title = label(base_members)
+    if len(base_members) > 1:
+        title += f" (identical x{len(base_members)}, shown once)"
+    sections = [{'title': title, 'text': base_text, 'kind': 'full'}]
+
+    for text, members in groups[1:]:
+        title = label(members)
+        if len(members) > 1:
+            title += f" (identical x{len(members)}, shown once)"
+
+        ratio = ratios[(base_members[0] - 1, members[0] - 1)]
+        if ratio >= NEAR_IDENTICAL_THRESHOLD:
+            diff = unified_diff(base_text, text, f"Output {base_members[0]}", f"Output {members[0]}")
+            # diff 가 원문보다 짧을 때만 diff 로 대체
+            if len(diff) < len(text):
+                sections.append({
+                    'title': f"{title} (unified diff against Output {base_members[0]})",
+                    'text': diff,
+                    'kind': 'diff'
+                })
+                continue
+        sections.append({'title': title, 'text': text, 'kind': 'full'})
+
+    return {
+        'sections': sections,
+        'similarity': {f"{i + 1}-{j + 1}": round(ratio, 3) for (i, j), ratio in ratios.items()},
+        'identical_groups': [members for _, members in groups],
+    }
+
+
+# ============================================================================
+# 로컬 일관성 점수
+# ============================================================================
+
+def char_ngrams(text: str, n: int = NGRAM_SIZE) -> FrozenSet[str]:
+    """공백을 정규화한 글자 n-gram 집합"""
+    text = re.sub(r"\s+", " ", text or "").strip()
+    if len(text) < n:
+        return frozenset([text]) if text else frozenset()
+    return frozenset(text[i:i + n] for i in range(len(text) - n + 1))
+
+
+def jaccard(a: FrozenSet[str], b: FrozenSet[str]) -> float:
+    if not a and not b:
+        return 1.0
+    return len(a & b) / len(a | b)
+
+
+def consistency_score(outputs: List[str]) -> Dict:
+    """
+    실행 결과 간 일관성 점수 (0~20, 결정적)
+    모든 결과 쌍의 글자 3-gram Jaccard 와 단어 단위 편집 유사도 평균을 20점 만점으로 환산
+
+    Returns:
+        {'consistency_score', 'consistency_feedback', 'consistency_metrics'}
+    """
+    return batch_consistency_scores([outputs])[0]
+
+
+def batch_consistency_scores(output_sets: List[List[str]]) -> List[Dict]:
+    """
+    여러 제출물의 일관성 점수 일괄 계산
+    같은 결과 문자열의 n-gram 과 같은 결과 쌍의 유사도는 한 번만 계산
+    (T=0.1 결과는 대부분 동일하므로 수천 건도 빠르게 처리)
+    """
+    ngram_cache: Dict[str, FrozenSet[str]] = {}
+    pair_cache: Dict[Tuple[str, str], Tuple[float, float]] = {}
+
+    def pair_metrics(a: str, b: str) -> Tuple[float, float]:
+        if a == b:
+            return 1.0, 1.0
+        key = (a, b) if a <= b else (b, a)
+        if key not in pair_cache:
+            for text in key:
+                if text not in ngram_cache:
+                    ngram_cache[text] = char_ngrams(text)
+            pair_cache[key] = (
+                jaccard(ngram_cache[key[0]], ngram_cache[key[1]]),
+                similarity(a, b)
+            )
+        return pair_cache[key]
+
+    results = []
+    for outputs in output_sets:
+        pairs = [pair_metrics(outputs[i], outputs[j]) for i, j in combinations(range(len(outputs)), 2)]
+        if pairs:
+            ngram_jaccard = sum(pair[0] for pair in pairs) / len(pairs)
+            edit_ratio = sum(pair[1] for pair in pairs) / len(pairs)
+        else:
+            ngram_jaccard = edit_ratio = 1.0
+        combined = (ngram_jaccard + edit_ratio) / 2
+        score = round(CONSISTENCY_MAX_SCORE * combined)
+        identical = len(set(outputs)) == 1
+
+        if identical:
+            feedback = f"{len(outputs)}회 실행 결과가 모두 동일합니다."
+        elif score >= CONSISTENCY_MAX_SCORE // 2:
+            feedback = "실행 결과 간 경미한 편차가 있으나 핵심 내용은 유지됩니다."
+        else:
+            feedback = "실행마다 결과가 크게 달라 일관성이 낮습니다."
+        feedback += (
+            f" (자동 계산: 평균 유사도 {combined:.3f}, "
+            f"{NGRAM_SIZE}-gram Jaccard {ngram_jaccard:.3f}, 편집 유사도 {edit_ratio:.3f})"
+        )
+
+        results.append({
+            'consistency_score': score,
+            'consistency_feedback': feedback,
+            'consistency_metrics': {
+                'ngram_jaccard': round(ngram_jaccard, 4),
+                'edit_ratio': round(edit_ratio, 4),
+                'combined': round(combined, 4),
+                'identical': identical,
+            },
+        })
+    return results
@@ -0,0 +1,155 @@
+"""
+제출물 사전 검사 (LLM 호출 전 로컬 규칙)
+엑셀 일괄 업로드에 섞인 빈 프롬프트, "test" 같은 자리표시자, 과제 설명/정답 복사본은
+LLM 호출 4회를 쓰지 않고 즉시 처리
+
+- reject: 규칙 기반 0점 결과 즉시 저장 (빈 값, 자리표시자, 반복 문자)
+- manual_review: 수동 검토 상태로 저장 (너무 짧음, 문자 없음, 정답 산출물/과제 설명 복사)
+  짧은 분류 프롬프트나 JSON 템플릿처럼 정상 제출물일 수 있는 경우는 0점 처리하지 않음
+  관리자가 강제 재채점(force)하면 사전 검사 없이 채점
+"""
+
+import re
+import math
+import string
+from collections import Counter
+from typing import Dict, Optional
+
+from output_similarity import char_ngrams
+
+PRESCREEN_MIN_CHARS = 5               # 영문 등
+PRESCREEN_MIN_HANGUL_CHARS = 2        # 한글이 있으면 ("요약해줘" 같은 짧은 지시문 허용)
+PRESCREEN_MIN_ENTROPY = 2.5           # bits/char, 이 값 미만이면 반복 문자
+PRESCREEN_ENTROPY_MIN_LENGTH = 20     # 이 길이 이상일 때만 엔트로피 검사
+PRESCREEN_MIN_LETTER_RATIO = 0.3      # 공백/문장부호 제외 글자 중 한글/영문 비율
+PRESCREEN_GOLDEN_OVERLAP = 0.8        # 정답 산출물 3-gram 중 프롬프트에 포함된 비율
+PRESCREEN_DESCRIPTION_OVERLAP = 0.9   # 프롬프트 3-gram 중 과제 설명에 포함된 비율
+# 복사 검사 대상(정답 산출물/프롬프트)의 최소 3-gram 수
+# "긍정적" 같은 짧은 정답은 정상 프롬프트에도 그대로 들어가므로 검사하지 않음
+PRESCREEN_COPY_MIN_NGRAMS = 20
+
+PLACEHOLDERS = {
+    "test", "testing", "테스트", "asdf", "qwer", "1234", "none", "null",
+    "n/a", "na", "-", ".", "ㅇㅇ", "ㅋㅋ", "없음", "미제출",
+}
+
+VERDICT_REJECT = "reject"
+VERDICT_MANUAL_REVIEW = "manual_review"
+
+
+def _normalize(text: Optional[str]) -> str:
+    return re.sub(r"\s+", " ", text or "").strip()
+
+
+def char_entropy(text: str) -> float:
+    """글자 단위 Shannon 엔트로피 (bits/char)"""
+    if not text:
+        return 0.0
+    counts = Counter(text)
+    total = len(text)
+    return max(0.0, -sum(count / total * math.log2(count / total) for count in counts.values()))
+
+
+_PUNCTUATION = set(string.punctuation) | set("“”‘’「」『』《》〈〉【】·…")
+
+
+def letter_ratio(text: str) -> float:
+    """공백/문장부호 제외 글자 중 한글/영문 비율 (JSON 템플릿의 괄호, 따옴표는 제외)"""
+    chars = [ch for ch in text if not ch.isspace() and ch not in _PUNCTUATION]
+    if not chars:
+        return 0.0
+    letters = sum(1 for ch in chars if re.match(r"[A-Za-z가-힣ㄱ-ㅎㅏ-ㅣ]", ch))
+    return letters / len(chars)
+
+
+def min_length(text: str) -> int:
+    """최소 글자 수 (한글은 글자당 정보량이 많아 기준이 낮음)"""
+    if re.search(r"[가-힣]", text):
+        return PRESCREEN_MIN_HANGUL_CHARS
+    return PRESCREEN_MIN_CHARS
+
+
+def containment(part: str, whole: str) -> Optional[float]:
+    """part 의 글자 3-gram 중 whole 에도 있는 비율 (part 가 너무 짧으면 None)"""
+    part_ngrams = char_ngrams(part)
+    if len(part_ngrams) < PRESCREEN_COPY_MIN_NGRAMS:
+        return None
+    return len(part_ngrams & char_ngrams(whole)) / len(part_ngrams)
+
+
+def prescreen_submission(
+    prompt_text: Optional[str],
+    golden_output: Optional[str] = None,
+    task_description: Optional[str] = None
+) -> Optional[Dict]:
+    """
+    제출물 사전 검사
+
+    Returns:
+        통과하면 None, 아니면 {'verdict', 'reason', 'detail', 'metrics'}
+    """
+    text = _normalize(prompt_text)
+    metrics = {"length": len(text)}
+
+    def verdict(kind: str, reason: str, detail: str) -> Dict:
+        return {"verdict": kind, "reason": reason, "detail": detail, "metrics": metrics}
+
+    if not text:
+        return verdict(VERDICT_REJECT, "empty", "프롬프트가 비어 있습니다")
+    if text.lower() in PLACEHOLDERS:
+        return verdict(VERDICT_REJECT, "placeholder", f"자리표시자 텍스트입니다: '{text}'")
+    if len(text) < min_length(text):
+        return verdict(VERDICT_MANUAL_REVIEW, "too_short", f"프롬프트가 너무 짧습니다 ({len(text)}자)")
+
+    metrics["letter_ratio"] = round(letter_ratio(text), 3)
+    if metrics["letter_ratio"] < PRESCREEN_MIN_LETTER_RATIO:
+        return verdict(VERDICT_MANUAL_REVIEW, "no_language", "한글/영문 문장이 거의 없습니다")
+
+    if len(text) >= PRESCREEN_ENTROPY_MIN_LENGTH:
+        metrics["entropy"] = round(char_entropy(text), 3)
+        if metrics["entropy"] < PRESCREEN_MIN_ENTROPY:
+            return verdict(VERDICT_REJECT, "low_entropy", "같은 문자/단어가 반복된 텍스트입니다")
+
+    golden = _normalize(golden_output)
+    overlap = containment(golden, text) if golden else None
+    if overlap is not None:
+        metrics["golden_overlap"] = round(overlap, 3)
+        if overlap >= PRESCREEN_GOLDEN_OVERLAP:
+            return verdict(VERDICT_MANUAL_REVIEW, "golden_copy", "프롬프트에 정답 산출물이 그대로 포함되어 있습니다")
+
+    description = _normalize(task_description)
+    overlap = containment(text, description) if description else None
+    if overlap is not None:
+        metrics["description_overlap"] = round(overlap, 3)
+        if overlap >= PRESCREEN_DESCRIPTION_OVERLAP:
+            return verdict(VERDICT_MANUAL_REVIEW, "description_copy", "과제 설명을 그대로 복사한 프롬프트입니다")
+
+    return None
+
+
+def prescreen_result(screen: Dict) -> Dict:
+    """
+    사전 검사 결과 → 저장할 grading_result
+    reject 는 0점 평가 결과, manual_review 는 점수 없이 수동 검토 상태
+    """
+    if screen["verdict"] == VERDICT_REJECT:
+        feedback = f"사전 검사: {screen['detail']}"
+        return {
+            "execution_results": [],
+            "accuracy_score": 0,
+            "accuracy_feedback": feedback,
+            "clarity_score": 0,
+            "clarity_feedback": feedback,
+            "consistency_score": 0,
+            "consistency_feedback": feedback,
+            "total_score": 0,
+            "overall_feedback": f"{feedback}. LLM 채점 없이 0점 처리되었습니다.",
+            "prescreen": screen,
+        }
+
+    return {
+        "execution_results": [],
+        "status": "manual_review",
+        "overall_feedback": f"사전 검사: {screen['detail']}. 관리자 검토가 필요합니다.",
+        "prescreen": screen,
+    }
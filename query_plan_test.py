@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+"""
+엔드포인트 쿼리 실행 계획 테스트
+main.py 와 auth_api.py(참가자 API 코드)의 SQL 을 모두 꺼내 마이그레이션한 빈 DB 에서
+EXPLAIN QUERY PLAN 으로 확인
+
+- submissions / practitioners 를 인덱스 없이 전체 스캔하지 않음 (전체 목록/집계는 예외)
+- submissions 조회가 정렬용 임시 B-tree 를 만들지 않음 (인덱스 순서로 조회)
+- 마이그레이션으로 만든 조회 인덱스가 모두 한 번 이상 사용됨
+
+실행: python query_plan_test.py  (또는 pytest query_plan_test.py)
+"""
+
+import os
+import re
+import ast
+import sqlite3
+import tempfile
+from typing import Dict, List, Tuple
+
+from auth_api import AUTH_API_CODE
+from grading_results import RESULT_INDEXES
+import migrations
+from migrations import QUERY_INDEXES, MigrationError, run_migrations
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# 테이블 전체가 필요한 쿼리 (대시보드 집계, 참가자 전체 목록)
+FULL_SCAN_ALLOWED = (
+    "SELECT * FROM practitioners ORDER BY id",
+    "SELECT COUNT(*) as count FROM submissions WHERE grading_result IS NOT NULL",
+)
+
+# 검사 대상 테이블 (쿼리에서 쓰는 별칭 포함)
+CHECKED_TABLES = {"submissions", "s", "practitioners", "p"}
+
+
+def _normalize(sql: str) -> str:
+    return " ".join(sql.split())
+
+
+def extract_queries(source: str) -> List[Tuple[int, str]]:
+    """소스 코드의 execute("...") 문자열 상수 (INSERT 와 f-string 은 제외)"""
+    queries = []
+    for node in ast.walk(ast.parse(source)):
+        if not (isinstance(node, ast.Call) and isinstance(node.func, ast.Attribute)):
+            continue
+        if node.func.attr != "execute" or not node.args:
+            continue
+        arg = node.args[0]
+        if not (isinstance(arg, ast.Constant) and isinstance(arg.value, str)):
+            continue
+        sql = _normalize(arg.value)
+        if sql.upper().startswith(("SELECT", "UPDATE", "DELETE")):
+            queries.append((node.lineno, sql))
+    return sorted(queries)
+
+
+def endpoint_queries() -> List[Tuple[str, str]]:
+    """(위치, SQL) 목록"""
+    with open(os.path.join(BASE_DIR, "main.py"), encoding="utf-8") as f:
+        main_source = f.read()
+    queries = [(f"main.py:{line}", sql) for line, sql in extract_queries(main_source)]
+    queries += [(f"auth_api.py AUTH_API_CODE:{line}", sql) for line, sql in extract_queries(AUTH_API_CODE)]
+    return queries
+
+
+def index_names(statements) -> List[str]:
+    return [re.search(r"INDEX IF NOT EXISTS (\w+)", statement).group(1) for statement in statements]
+
+
+def query_plan(conn: sqlite3.Connection, sql: str) -> List[str]:
+    rows = conn.execute(f"EXPLAIN QUERY PLAN {sql}", [1] * sql.count("?")).fetchall()
+    return [row[3] for row in rows]
+
+
+def plan_problems(sql: str, plan: List[str]) -> List[str]:
+    """실행 계획에서 문제가 되는 단계"""
+    problems = []
+    for step in plan:
+        match = re.match(r"SCAN (\w+)$", step)
+        if match and match.group(1) in CHECKED_TABLES and sql not in FULL_SCAN_ALLOWED:
+            problems.append(step)
+        if step.startswith("USE TEMP B-TREE") and re.search(r"\bFROM submissions\b", sql):
+            problems.append(step)
+    return problems
+
+
+def _plans() -> Dict[Tuple[str, str], List[str]]:
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "query_plan.db")
+        run_migrations(db_path)
+        conn = sqlite3.connect(db_path)
+        try:
+            return {(where, sql): query_plan(conn, sql) for where, sql in endpoint_queries()}
+        finally:
+            conn.close()
+
+
+def test_endpoint_queries_use_indexes():
+    failures = []
+    for (where, sql), plan in _plans().items():
+        problems = plan_problems(sql, plan)
+        if problems:
+            failures.append(f"{where}: {sql}\n    {problems}")
+    assert not failures, "인덱스를 사용하지 않는 쿼리:\n" + "\n".join(failures)
+
+
+def test_query_indexes_are_used():
+    used = " ".join(step for plan in _plans().values() for step in plan)
+    unused = [
+        name for name in index_names(QUERY_INDEXES + RESULT_INDEXES)
+        if not re.search(rf"\b{name}\b", used)
+    ]
+    assert not unused, f"어떤 엔드포인트 쿼리도 사용하지 않는 인덱스: {unused}"
+
+
+def test_practitioner_name_is_unique():
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "query_plan.db")
+        run_migrations(db_path)
+        conn = sqlite3.connect(db_path)
+        try:
+            conn.execute("INSERT INTO practitioners (name) VALUES ('김민준')")
+            try:
+                conn.execute("INSERT INTO practitioners (name) VALUES ('김민준')")
+            except sqlite3.IntegrityError:
+                return
+            raise AssertionError("같은 이름의 참가자가 중복 등록됨")
+        finally:
+            conn.close()
+
+
+def _legacy_db_with_duplicates(db_path: str):
+    """마이그레이션 009 이전 상태로 되돌린 뒤 같은 이름의 참가자 등록"""
+    run_migrations(db_path)
+    conn = sqlite3.connect(db_path)
+    try:
+        conn.execute("DROP INDEX idx_practitioners_name")
+        conn.execute("DELETE FROM schema_version WHERE version >= 9")
+        conn.executemany("INSERT INTO practitioners (id, name, email) VALUES (?, ?, ?)",
+                         [(1, "김민준", "a@example.com"), (2, "이서윤", None), (3, "김민준", "b@example.com")])
+        conn.executemany("INSERT INTO submissions (practitioner_id, task_id, prompt_text) VALUES (?, 1, ?)",
+                         [(1, "a"), (2, "b"), (3, "c")])
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def test_duplicate_practitioners_stop_migration():
+    """같은 이름의 참가자가 있으면 기본적으로 아무것도 지우지 않고 중단"""
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "query_plan.db")
+        _legacy_db_with_duplicates(db_path)
+        try:
+            run_migrations(db_path)
+        except MigrationError as e:
+            assert "김민준: ids [1, 3]" in str(e)
+        else:
+            raise AssertionError("중복 이름이 있는데 마이그레이션이 적용됨")
+
+        conn = sqlite3.connect(db_path)
+        try:
+            practitioners = conn.execute("SELECT id FROM practitioners ORDER BY id").fetchall()
+            version = conn.execute("SELECT MAX(version) FROM schema_version").fetchone()[0]
+        finally:
+            conn.close()
+        assert practitioners == [(1,), (2,), (3,)]
+        assert version == 8
+
+
+def test_duplicate_practitioners_merged_on_opt_in():
+    """MERGE_DUPLICATE_PRACTITIONERS 설정 시 가장 작은 id 로 합치고 삭제한 행은 보관"""
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "query_plan.db")
+        _legacy_db_with_duplicates(db_path)
+        migrations.MERGE_DUPLICATE_PRACTITIONERS = True
+        try:
+            run_migrations(db_path)
+        finally:
+            migrations.MERGE_DUPLICATE_PRACTITIONERS = False
+
+        conn = sqlite3.connect(db_path)
+        try:
+            practitioners = conn.execute("SELECT id, name FROM practitioners ORDER BY id").fetchall()
+            owners = conn.execute("SELECT prompt_text, practitioner_id FROM submissions ORDER BY id").fetchall()
+            merged = conn.execute(
+                "SELECT id, email, merged_into, submission_ids FROM practitioners_merged"
+            ).fetchall()
+        finally:
+            conn.close()
+        assert practitioners == [(1, "김민준"), (2, "이서윤")]
+        assert owners == [("a", 1), ("b", 2), ("c", 1)]
+        assert merged == [(3, "b@example.com", 1, "3")]
+
+
+if __name__ == "__main__":
+    plans = _plans()
+    for (where, sql), plan in plans.items():
+        mark = "❌" if plan_problems(sql, plan) else "✅"
+        print(f"{mark} {where}: {sql[:80]}")
+        for step in plan:
+            print(f"      {step}")
+
+    for test in (
+        test_endpoint_queries_use_indexes,
+        test_query_indexes_are_used,
+        test_practitioner_name_is_unique,
+        test_duplicate_practitioners_stop_migration,
+        test_duplicate_practitioners_merged_on_opt_in,
+    ):
+        test()
+        print(f"✅ {test.__name__}")
@@ -0,0 +1,268 @@
+"""
+LLM 호출 속도 제한 스케줄러 (프로세스 전역)
+모델별 RPM(분당 요청 수) / TPM(분당 토큰 수) 토큰 버킷으로
+요청을 보내기 전에 대기시켜 429 응답을 미리 방지
+
+- 응답 헤더(x-ratelimit-*)로 서버 측 잔여량과 동기화
+- 429 발생 시 retry-after 동안 해당 모델의 모든 호출을 함께 대기
+"""
+
+import os
+import re
+import time
+import asyncio
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Dict, Mapping, Optional, Tuple
+
+
+# 모델별 기본 한도 (RPM, TPM) - 환경변수 LLM_RPM_LIMIT / LLM_TPM_LIMIT 로 덮어씀
+DEFAULT_LIMITS: Dict[str, Tuple[int, int]] = {
+    "gpt-3.5-turbo": (3500, 200000),
+    "gpt-4o-mini": (5000, 2000000),
+    "gpt-4o": (5000, 800000),
+}
+FALLBACK_LIMITS = (500, 200000)
+
+
+def estimate_tokens(text: str) -> int:
+    """토크나이저 없이 토큰 수 근사 (한글은 글자당 1토큰 이상이므로 보수적으로 계산)"""
+    if not text:
+        return 0
+    non_ascii = sum(1 for ch in text if ord(ch) > 127)
+    return non_ascii + (len(text) - non_ascii) // 4 + 1
+
+
+def parse_reset_duration(value: Optional[str]) -> Optional[float]:
+    """'1s', '6m0s', '20ms', '1h2m3.5s' 형식의 리셋 시간을 초 단위로 변환"""
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+
+    total = 0.0
+    matched = False
+    for amount, unit in re.findall(r"([\d.]+)(ms|h|m|s)", value):
+        matched = True
+        amount = float(amount)
+        if unit == "ms":
+            total += amount / 1000
+        elif unit == "s":
+            total += amount
+        elif unit == "m":
+            total += amount * 60
+        elif unit == "h":
+            total += amount * 3600
+    return total if matched else None
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Retry-After 헤더(초 또는 HTTP-date)를 대기 시간(초)으로 변환 (해석할 수 없으면 None)"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError, IndexError):
+        return None
+    if retry_at is None:
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+
+class TokenBucket:
+    """분당 한도를 초당 균등하게 채우는 토큰 버킷"""
+
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.tokens = float(per_minute)
+        self.updated = time.monotonic()
+
+    @property
+    def refill_per_second(self) -> float:
+        return self.capacity / 60.0
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.refill_per_second)
+        self.updated = now
+
+    def wait_time(self, amount: float) -> float:
+        """amount 만큼 소비할 수 있을 때까지 남은 시간 (초)"""
+        self._refill()
+        # 한도보다 큰 요청은 버킷이 가득 찼을 때 보내도록 허용
+        amount = min(amount, self.capacity)
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) / self.refill_per_second
+
+    def consume(self, amount: float):
+        self._refill()
+        self.tokens -= amount
+
+    def sync(self, limit: Optional[float], remaining: Optional[float]):
+        """서버가 알려준 한도/잔여량으로 보정 (더 보수적인 값 사용)"""
+        self._refill()
+        if limit:
+            self.capacity = float(limit)
+        if remaining is not None:
+            self.tokens = min(self.tokens, float(remaining))
+
+
+class ModelBudget:
+    """모델 하나의 RPM/TPM 버킷과 통계"""
+
+    def __init__(self, rpm: float, tpm: float):
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        self.blocked_until = 0.0
+        self.lock = asyncio.Lock()
+
+        self.sent = 0
+        self.queued = 0
+        self.rate_limited = 0
+        self.total_wait_seconds = 0.0
+
+
+class RateLimitScheduler:
+    """
+    프로세스 전역 LLM 호출 스케줄러
+
+    Args:
+        default_limits: 모델별 (RPM, TPM)
+        share: 이 프로세스가 사용할 한도 비율 (워커 프로세스 N개면 1/N)
+    """
+
+    def __init__(
+        self,
+        default_limits: Optional[Dict[str, Tuple[int, int]]] = None,
+        share: float = 1.0,
+        rpm_override: Optional[int] = None,
+        tpm_override: Optional[int] = None
+    ):
+        self.default_limits = dict(default_limits or DEFAULT_LIMITS)
+        self.share = share
+        self.rpm_override = rpm_override
+        self.tpm_override = tpm_override
+        self._budgets: Dict[str, ModelBudget] = {}
+
+    def _budget(self, model: str) -> ModelBudget:
+        if model not in self._budgets:
+            rpm, tpm = self.default_limits.get(model, FALLBACK_LIMITS)
+            rpm = self.rpm_override or rpm
+            tpm = self.tpm_override or tpm
+            self._budgets[model] = ModelBudget(rpm * self.share, tpm * self.share)
+        return self._budgets[model]
+
+    async def acquire(self, model: str, estimated_tokens: int):
+        """
+        요청 전송 전 예산 확보 (부족하면 대기)
+        모델별 lock 으로 요청 순서(FIFO)를 보장
+        """
+        budget = self._budget(model)
+        budget.queued += 1
+        started = time.monotonic()
+        try:
+            async with budget.lock:
+                while True:
+                    now = time.monotonic()
+                    wait = max(
+                        budget.blocked_until - now,
+                        budget.requests.wait_time(1),
+                        budget.tokens.wait_time(estimated_tokens)
+                    )
+                    if wait <= 0:
+                        break
+                    await asyncio.sleep(wait)
+
+                budget.requests.consume(1)
+                budget.tokens.consume(estimated_tokens)
+                budget.sent += 1
+        finally:
+            budget.queued -= 1
+            budget.total_wait_seconds += time.monotonic() - started
+
+    def record_usage(self, model: str, estimated_tokens: int, actual_tokens: int):
+        """실제 사용 토큰으로 예상치 보정"""
+        self._budget(model).tokens.consume(actual_tokens - estimated_tokens)
+
+    def update_from_headers(self, model: str, headers: Optional[Mapping[str, str]]):
+        """x-ratelimit-* 응답 헤더로 버킷 동기화"""
+        if not headers:
+            return
+        budget = self._budget(model)
+
+        def number(name: str) -> Optional[float]:
+            value = headers.get(name)
+            try:
+                return float(value) if value is not None else None
+            except ValueError:
+                return None
+
+        for kind, bucket in (("requests", budget.requests), ("tokens", budget.tokens)):
+            limit = number(f"x-ratelimit-limit-{kind}")
+            remaining = number(f"x-ratelimit-remaining-{kind}")
+            bucket.sync(
+                limit * self.share if limit else None,
+                remaining * self.share if remaining is not None else None
+            )
+
+            # 잔여량이 0이면 리셋 시각까지 전체 대기
+            reset = parse_reset_duration(headers.get(f"x-ratelimit-reset-{kind}"))
+            if remaining == 0 and reset:
+                budget.blocked_until = max(budget.blocked_until, time.monotonic() + reset)
+
+    def penalize(self, model: str, retry_after: Optional[float] = None):
+        """429 응답: retry-after (없으면 1초) 동안 모델 전체 호출 중지"""
+        budget = self._budget(model)
+        budget.rate_limited += 1
+        budget.blocked_until = max(budget.blocked_until, time.monotonic() + (retry_after or 1.0))
+
+    def account_limits(self, model: str) -> Tuple[float, float]:
+        """모델의 계정 전체 한도 (RPM, TPM) - 헤더로 동기화된 값 우선"""
+        budget = self._budget(model)
+        return budget.requests.capacity / self.share, budget.tokens.capacity / self.share
+
+    def snapshot(self) -> Dict:
+        """모델별 현재 예산 및 통계"""
+        now = time.monotonic()
+        result = {}
+        for model, budget in self._budgets.items():
+            budget.requests._refill()
+            budget.tokens._refill()
+            result[model] = {
+                "rpm_limit": round(budget.requests.capacity),
+                "rpm_available": round(budget.requests.tokens, 1),
+                "tpm_limit": round(budget.tokens.capacity),
+                "tpm_available": round(budget.tokens.tokens),
+                "blocked_for_seconds": round(max(0.0, budget.blocked_until - now), 2),
+                "queued": budget.queued,
+                "sent": budget.sent,
+                "rate_limited": budget.rate_limited,
+                "total_wait_seconds": round(budget.total_wait_seconds, 2),
+            }
+        return {"share": self.share, "models": result}
+
+
+_scheduler: Optional[RateLimitScheduler] = None
+
+
+def get_scheduler() -> RateLimitScheduler:
+    """프로세스 전역 스케줄러"""
+    global _scheduler
+    if _scheduler is None:
+        rpm = os.environ.get("LLM_RPM_LIMIT")
+        tpm = os.environ.get("LLM_TPM_LIMIT")
+        _scheduler = RateLimitScheduler(
+            share=float(os.environ.get("LLM_BUDGET_SHARE", "1.0")),
+            rpm_override=int(rpm) if rpm else None,
+            tpm_override=int(tpm) if tpm else None
+        )
+    return _scheduler
@@ -0,0 +1,258 @@
+"""
+토큰 계산 및 프롬프트 예산 배분
+- tiktoken 으로 모델별 정확한 토큰 수 계산 (미설치 시 근사치)
+- 프롬프트 구간(입력 데이터, 실행 결과, 정답 등)에 토큰 예산을 배분하고
+  토큰 경계에서 압축/절단
+- 과제별 실행 응답 토큰 상한 (정답 산출물 길이 기준, tasks 테이블에 캐시)
+- 호출별 토큰 사용량 기록 (contextvars, 채점 1건 단위)
+"""
+
+import os
+import re
+import math
+import hashlib
+import threading
+import contextvars
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+from db import connect
+from rate_limiter import estimate_tokens
+
+try:
+    import tiktoken
+except ImportError:  # pragma: no cover - 토크나이저 없이 근사치 사용
+    tiktoken = None
+
+
+# 모델별 컨텍스트 길이 (토큰)
+MODEL_CONTEXT_WINDOWS: Dict[str, int] = {
+    "gpt-3.5-turbo": 16385,
+    "gpt-4o-mini": 128000,
+    "gpt-4o": 128000,
+    "gpt-4.1-mini": 1047576,
+    "gpt-4.1": 1047576,
+}
+DEFAULT_CONTEXT_WINDOW = 16385
+
+# 채팅 메시지 형식 오버헤드 (메시지당 / 응답 시작)
+TOKENS_PER_MESSAGE = 3
+TOKENS_PER_REPLY = 3
+
+TRUNCATION_MARKER = "\n...(truncated)"
+
+# 실행 응답 토큰 상한 = 정답 산출물 토큰 수 × headroom (floor ~ ceiling 범위)
+EXECUTION_MAX_TOKENS_HEADROOM = float(os.environ.get("EXECUTION_MAX_TOKENS_HEADROOM", "1.5"))
+EXECUTION_MAX_TOKENS_FLOOR = int(os.environ.get("EXECUTION_MAX_TOKENS_FLOOR", "256"))
+EXECUTION_MAX_TOKENS_CEILING = int(os.environ.get("EXECUTION_MAX_TOKENS_CEILING", "4096"))
+
+# 토큰 수 캐시 항목 수 (텍스트 대신 해시/길이를 키로 저장하므로 입력 데이터를 메모리에 붙잡지 않음)
+TOKEN_COUNT_CACHE_SIZE = int(os.environ.get("TOKEN_COUNT_CACHE_SIZE", "2048"))
+
+
+def context_window(model: str) -> int:
+    """모델 컨텍스트 길이 (접두사 일치, 없으면 기본값)"""
+    for name in sorted(MODEL_CONTEXT_WINDOWS, key=len, reverse=True):
+        if model.startswith(name):
+            return MODEL_CONTEXT_WINDOWS[name]
+    return DEFAULT_CONTEXT_WINDOW
+
+
+@lru_cache(maxsize=16)
+def _encoding(model: str):
+    if tiktoken is None:
+        return None
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        return tiktoken.get_encoding("o200k_base")
+
+
+def is_exact() -> bool:
+    """정확한 토큰 계산 가능 여부"""
+    return tiktoken is not None
+
+
+_token_counts: "OrderedDict[Tuple[bytes, int, str], int]" = OrderedDict()
+_token_counts_lock = threading.Lock()
+
+
+def count_tokens(text: Optional[str], model: str) -> int:
+    """텍스트 토큰 수 (동일 텍스트는 (SHA-1, 길이, 모델) 기준 LRU 캐시)"""
+    if not text:
+        return 0
+    key = (hashlib.sha1(text.encode("utf-8", "surrogatepass")).digest(), len(text), model)
+    with _token_counts_lock:
+        if key in _token_counts:
+            _token_counts.move_to_end(key)
+            return _token_counts[key]
+
+    encoding = _encoding(model)
+    if encoding is None:
+        count = estimate_tokens(text)
+    else:
+        count = len(encoding.encode(text, disallowed_special=()))
+
+    with _token_counts_lock:
+        _token_counts[key] = count
+        while len(_token_counts) > TOKEN_COUNT_CACHE_SIZE:
+            _token_counts.popitem(last=False)
+    return count
+
+
+def count_chat_tokens(messages: List[Dict], model: str) -> int:
+    """chat completion 요청의 프롬프트 토큰 수"""
+    return TOKENS_PER_REPLY + sum(
+        TOKENS_PER_MESSAGE + count_tokens(message["content"], model)
+        for message in messages
+    )
+
+
+def truncate_to_tokens(text: Optional[str], max_tokens: int, model: str) -> str:
+    """토큰 경계에서 max_tokens 이하로 자름 (잘린 경우 표시 추가)"""
+    if not text or count_tokens(text, model) <= max_tokens:
+        return text or ""
+
+    budget = max(0, max_tokens - count_tokens(TRUNCATION_MARKER, model))
+    encoding = _encoding(model)
+    if encoding is not None:
+        tokens = encoding.encode(text, disallowed_special=())
+        return encoding.decode(tokens[:budget], errors="ignore") + TRUNCATION_MARKER
+
+    # 근사치: 이진 탐색으로 예산에 맞는 길이 찾기
+    low, high = 0, len(text)
+    while low < high:
+        mid = (low + high + 1) // 2
+        if estimate_tokens(text[:mid]) <= budget:
+            low = mid
+        else:
+            high = mid - 1
+    return text[:low] + TRUNCATION_MARKER
+
+
+def compact_text(text: Optional[str]) -> str:
+    """
+    의미 없는 공백 압축
+    Excel → Markdown 표 변환 시 열 정렬용 공백이 토큰을 크게 차지하므로 제거
+    """
+    if not text:
+        return text or ""
+    text = re.sub(r"[ \t]{2,}", " ", text)
+    text = re.sub(r"[ \t]+\n", "\n", text)
+    text = re.sub(r"-{4,}", "---", text)
+    text = re.sub(r"\n{3,}", "\n\n", text)
+    return text
+
+
+def fit_to_tokens(text: Optional[str], max_tokens: int, model: str) -> str:
+    """예산을 넘으면 먼저 공백을 압축하고, 그래도 넘으면 절단"""
+    if not text or count_tokens(text, model) <= max_tokens:
+        return text or ""
+    compacted = compact_text(text)
+    return truncate_to_tokens(compacted, max_tokens, model)
+
+
+def allocate_budget(sizes: Dict[str, int], total: int) -> Dict[str, int]:
+    """
+    구간별 토큰 수(sizes)를 총 예산(total) 안에서 배분
+    작은 구간은 전부 받고, 남은 예산을 큰 구간끼리 균등하게 나눔 (water-filling)
+    """
+    allocation: Dict[str, int] = {}
+    remaining = max(0, total)
+    pending = sorted(sizes.items(), key=lambda item: item[1])
+
+    while pending:
+        share = remaining // len(pending)
+        name, size = pending[0]
+        if size <= share:
+            allocation[name] = size
+            remaining -= size
+            pending.pop(0)
+        else:
+            for name, _ in pending:
+                allocation[name] = share
+            break
+
+    return allocation
+
+
+def execution_token_cap(golden_output: Optional[str], model: str) -> int:
+    """정답 산출물 길이로 정한 실행 응답 토큰 상한"""
+    cap = math.ceil(count_tokens(golden_output, model) * EXECUTION_MAX_TOKENS_HEADROOM)
+    return min(max(cap, EXECUTION_MAX_TOKENS_FLOOR), EXECUTION_MAX_TOKENS_CEILING)
+
+
+def golden_output_fingerprint(golden_output: Optional[str], model: str) -> str:
+    """상한 재계산 판단용 해시 (정답 산출물 + 모델 + 상한 설정)"""
+    payload = "\x00".join([
+        model,
+        str(EXECUTION_MAX_TOKENS_HEADROOM),
+        str(EXECUTION_MAX_TOKENS_FLOOR),
+        str(EXECUTION_MAX_TOKENS_CEILING),
+        golden_output or "",
+    ])
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def resolve_execution_max_tokens(
+    db_path: str,
+    task_id: int,
+    golden_output: Optional[str],
+    model: str,
+    cached_max_tokens: Optional[int] = None,
+    cached_hash: Optional[str] = None
+) -> int:
+    """
+    과제의 실행 응답 토큰 상한 (블로킹)
+    tasks.execution_max_tokens 에 캐시하고 정답 산출물이 바뀐 경우에만 다시 계산
+    """
+    fingerprint = golden_output_fingerprint(golden_output, model)
+    if cached_max_tokens and cached_hash == fingerprint:
+        return cached_max_tokens
+
+    cap = execution_token_cap(golden_output, model)
+    conn = connect(db_path)
+    conn.execute("""
+        UPDATE tasks SET execution_max_tokens = ?, golden_output_hash = ?
+        WHERE id = ?
+    """, (cap, fingerprint, task_id))
+    conn.commit()
+    conn.close()
+    return cap
+
+
+# ============================================================================
+# 호출별 토큰 사용량 기록
+# ============================================================================
+
+_usage_log: contextvars.ContextVar[Optional[List[Dict]]] = contextvars.ContextVar(
+    "token_usage_log", default=None
+)
+
+
+def start_usage_log() -> List[Dict]:
+    """
+    현재 컨텍스트(채점 1건)의 사용량 기록 시작
+    asyncio.gather 로 만든 하위 작업도 같은 리스트에 기록됨
+    """
+    log: List[Dict] = []
+    _usage_log.set(log)
+    return log
+
+
+def record_usage(entry: Dict):
+    """호출 1건의 토큰 사용량 기록 (기록 중이 아니면 무시)"""
+    log = _usage_log.get()
+    if log is not None:
+        log.append(entry)
+
+
+def summarize_usage(log: List[Dict]) -> Dict:
+    """사용량 합계"""
+    return {
+        "calls": len(log),
+        "prompt_tokens": sum(entry.get("prompt_tokens") or 0 for entry in log),
+        "completion_tokens": sum(entry.get("completion_tokens") or 0 for entry in log),
+        "by_call": log,
+    }